@@ -0,0 +1,333 @@
+"""
+Движок ценовых оповещений.
+
+Для каждого символа пороги хранятся в двух отсортированных массивах:
+"выше" (срабатывает при росте цены до порога) и "ниже" (при падении до порога).
+При обновлении цены сработавшие оповещения находятся бинарным поиском
+между предыдущей и текущей ценой, поэтому стоимость тика не зависит от числа пользователей.
+Строка порога хранит поколение оповещения (уникальное для каждой регистрации): после удаления
+или изменения оповещения его старые пороги снимаются и при срабатывании не учитываются.
+
+Запуск опроса цен:
+    python3 alert_engine.py resources/alert.json [интервал_сек]
+где alert.json - файл уведомлений сервера ({"alerts": [{"id", "userId", "message", ...}]}).
+Из сигналов стратегий ("📈 БЫЧИЙ | BTC | ... | TP: ... | SL: ...") берутся пороги TP и SL.
+Сработавшие оповещения печатаются построчно в JSON.
+"""
+import itertools
+import json
+import re
+import sys
+import time
+
+import numpy as np
+
+from timestamps import now_ms
+
+ALERT_DIRECTIONS = ('above', 'below', 'cross')
+
+# Направление сигнала в тексте уведомления (см. AnalyzeController.go)
+SIGNAL_DIRECTIONS = {'БЫЧИЙ': 'BULLISH', 'МЕДВЕЖИЙ': 'BEARISH'}
+SIGNAL_FIELD = re.compile(r'^(ЦЕНА|TP|SL):\s*(\S+)$')
+
+
+def format_symbol(symbol):
+    """Приводит символ к формату Bybit (BTC -> BTCUSDT)"""
+    symbol = symbol.upper().replace('-', '')
+    if not symbol.endswith('USDT'):
+        symbol += 'USDT'
+    return symbol
+
+
+def parse_signal_message(text):
+    """
+    Разбирает текст уведомления о сигнале: "📈 БЫЧИЙ | BTC | Вероятность: 84 | ЦЕНА: 89650.7 | TP: 89738 | SL: 89516".
+
+    Returns:
+        dict (direction, symbol, price, take_profit, stop_loss) или None, если это не сигнал
+    """
+    parts = [part.strip() for part in (text or '').split('|')]
+    direction = next((value for label, value in SIGNAL_DIRECTIONS.items() if label in parts[0]), None)
+    if direction is None or len(parts) < 2:
+        return None
+
+    fields = {}
+    for part in parts[2:]:
+        match = SIGNAL_FIELD.match(part)
+        if match:
+            try:
+                fields[match.group(1)] = float(match.group(2))
+            except ValueError:
+                return None
+    return {
+        'direction': direction,
+        'symbol': parts[1],
+        'price': fields.get('ЦЕНА'),
+        'take_profit': fields.get('TP'),
+        'stop_loss': fields.get('SL')
+    }
+
+
+class ThresholdBook:
+    """Отсортированный массив порогов одного направления для одного символа"""
+
+    def __init__(self):
+        self.prices = np.empty(0, dtype=np.float64)
+        self.generations = np.empty(0, dtype=np.int64)
+        self.active = np.empty(0, dtype=bool)
+        self.inactive_count = 0
+        self._pending_prices = []
+        self._pending_generations = []
+
+    def __len__(self):
+        return len(self.prices) - self.inactive_count + len(self._pending_prices)
+
+    def add(self, price, generation):
+        """Добавляет порог; слияние с основным массивом откладывается до следующей проверки"""
+        self._pending_prices.append(price)
+        self._pending_generations.append(generation)
+
+    def discard(self, price, generation):
+        """Снимает порог с ценой price, зарегистрированный с поколением generation"""
+        if generation in self._pending_generations:
+            i = self._pending_generations.index(generation)
+            del self._pending_prices[i], self._pending_generations[i]
+            return
+
+        start = np.searchsorted(self.prices, price, side='left')
+        end = np.searchsorted(self.prices, price, side='right')
+        match = np.flatnonzero(self.active[start:end] & (self.generations[start:end] == generation))
+        if len(match):
+            self.active[start + match] = False
+            self.inactive_count += len(match)
+            self._compact()
+
+    def _merge_pending(self):
+        """
+        Вставляет добавленные пороги в отсортированные массивы: пакет сортируется отдельно
+        и вставляется по позициям бинарного поиска, без пересортировки всего массива.
+        """
+        if not self._pending_prices:
+            return
+
+        pending_prices = np.asarray(self._pending_prices, dtype=np.float64)
+        order = np.argsort(pending_prices, kind='stable')
+        pending_prices = pending_prices[order]
+        positions = np.searchsorted(self.prices, pending_prices, side='right')
+
+        self.prices = np.insert(self.prices, positions, pending_prices)
+        self.generations = np.insert(self.generations, positions,
+                                     np.asarray(self._pending_generations, dtype=np.int64)[order])
+        self.active = np.insert(self.active, positions, True)
+        self._pending_prices = []
+        self._pending_generations = []
+
+    def _compact(self):
+        """Удаляет снятые и сработавшие пороги, когда их становится больше половины"""
+        if self.inactive_count * 2 <= len(self.prices):
+            return
+        keep = self.active
+        self.prices = self.prices[keep]
+        self.generations = self.generations[keep]
+        self.active = np.ones(len(self.prices), dtype=bool)
+        self.inactive_count = 0
+
+    def take_range(self, low, high, include_low, include_high):
+        """
+        Возвращает поколения активных порогов в диапазоне цен и помечает их неактивными.
+        """
+        self._merge_pending()
+
+        start = np.searchsorted(self.prices, low, side='left' if include_low else 'right')
+        end = np.searchsorted(self.prices, high, side='right' if include_high else 'left')
+        if start >= end:
+            return np.empty(0, dtype=np.int64)
+
+        window = self.active[start:end]
+        hit_generations = self.generations[start:end][window]
+        self.inactive_count += len(hit_generations)
+        window[:] = False
+
+        self._compact()
+        return hit_generations
+
+
+class PriceAlertEngine:
+    """Проверка ценовых оповещений всех пользователей на каждом обновлении цены"""
+
+    def __init__(self):
+        self.alerts = {}
+        self.last_prices = {}
+        self._above = {}
+        self._below = {}
+        self._generations = {}
+        self._alert_ids = {}
+        self._next_generation = itertools.count()
+
+    def _books(self, alert):
+        """Массивы порогов, в которых лежит оповещение"""
+        books = []
+        if alert['direction'] in ('above', 'cross'):
+            books.append(self._above.setdefault(alert['symbol'], ThresholdBook()))
+        if alert['direction'] in ('below', 'cross'):
+            books.append(self._below.setdefault(alert['symbol'], ThresholdBook()))
+        return books
+
+    def _discard(self, alert_id):
+        """Снимает оповещение и его пороги. Возвращает снятое оповещение или None"""
+        alert = self.alerts.pop(alert_id, None)
+        generation = self._generations.pop(alert_id, None)
+        if alert is not None:
+            del self._alert_ids[generation]
+            for book in self._books(alert):
+                book.discard(alert['price'], generation)
+        return alert
+
+    def add_alert(self, alert_id, symbol, price, direction='cross', user_id=None, message=None):
+        """
+        Регистрирует оповещение. Оповещение с уже известным id заменяется.
+
+        Args:
+            alert_id: идентификатор оповещения (число или строка)
+            symbol: символ (BTC, BTCUSDT)
+            price: пороговая цена
+            direction: 'above' - рост до порога, 'below' - падение до порога,
+                       'cross' - пересечение в любую сторону
+        """
+        if direction not in ALERT_DIRECTIONS:
+            raise ValueError(f"Unknown alert direction: {direction}")
+
+        self._discard(alert_id)
+
+        alert = {
+            'id': alert_id,
+            'user_id': user_id,
+            'symbol': format_symbol(symbol),
+            'price': float(price),
+            'direction': direction,
+            'message': message
+        }
+        generation = next(self._next_generation)
+        self.alerts[alert_id] = alert
+        self._generations[alert_id] = generation
+        self._alert_ids[generation] = alert_id
+        for book in self._books(alert):
+            book.add(alert['price'], generation)
+
+    def remove_alert(self, alert_id):
+        """Удаляет оповещение вместе с его порогами"""
+        return self._discard(alert_id) is not None
+
+    def on_price(self, symbol, price, timestamp=None):
+        """
+        Обрабатывает новую цену символа.
+        Возвращает список сработавших оповещений (каждое срабатывает один раз).
+        """
+        symbol = format_symbol(symbol)
+        price = float(price)
+        previous = self.last_prices.get(symbol)
+        self.last_prices[symbol] = price
+
+        if previous is None or price == previous:
+            return []
+
+        if price > previous:
+            book = self._above.get(symbol)
+            hits = book.take_range(previous, price, False, True) if book else np.empty(0, dtype=np.int64)
+        else:
+            book = self._below.get(symbol)
+            hits = book.take_range(price, previous, True, False) if book else np.empty(0, dtype=np.int64)
+
+        timestamp = now_ms() if timestamp is None else timestamp
+        triggered = []
+        for generation in hits.tolist():
+            alert_id = self._alert_ids.get(generation)
+            if alert_id is None:
+                # Порог прежней версии оповещения (удаленного или измененного)
+                continue
+            # Порог 'cross' в другом массиве снимается вместе с оповещением
+            alert = self._discard(alert_id)
+            triggered.append({**alert, 'triggered_price': price, 'timestamp': timestamp})
+
+        return triggered
+
+    def poll(self, fetcher, symbols=None):
+        """
+        Запрашивает текущие цены через fetcher.get_current_price и проверяет оповещения.
+
+        Args:
+            fetcher: объект с методом get_current_price(symbol) -> (price, datetime, error)
+            symbols: символы для опроса, по умолчанию - все символы с активными оповещениями
+        """
+        if symbols is None:
+            symbols = sorted({alert['symbol'] for alert in self.alerts.values()})
+
+        triggered = []
+        for symbol in symbols:
+            price, _, error = fetcher.get_current_price(symbol)
+            if error:
+                sys.stderr.write(f"Error getting price for {symbol}: {error}\n")
+                continue
+            triggered.extend(self.on_price(symbol, price))
+        return triggered
+
+    def load_alerts(self, path):
+        """
+        Загружает пороги из файла уведомлений (resources/alert.json, {"alerts": [...]} или список).
+
+        Для каждого уведомления о сигнале регистрируются два оповещения: '<id>:tp' и '<id>:sl'.
+        Поля - как в alert.json (userId, message) или в модели Alert (username, text, currency).
+        Уведомления без символа или уровней (системные, пустые сигналы) пропускаются.
+
+        Returns:
+            число загруженных сигналов
+        """
+        with open(path, encoding='utf-8') as f:
+            alerts = json.load(f)
+        if isinstance(alerts, dict):
+            alerts = alerts.get('alerts') or []
+
+        loaded = 0
+        for alert in alerts:
+            text = alert.get('message', alert.get('text'))
+            signal = parse_signal_message(text)
+            if signal is None:
+                continue
+            symbol = alert.get('currency') or signal['symbol']
+            take_profit, stop_loss = signal['take_profit'], signal['stop_loss']
+            if not symbol or not take_profit or not stop_loss:
+                continue
+
+            bullish = signal['direction'] == 'BULLISH'
+            user_id = alert.get('userId', alert.get('username'))
+            self.add_alert(f"{alert['id']}:tp", symbol, take_profit, 'above' if bullish else 'below',
+                           user_id, text)
+            self.add_alert(f"{alert['id']}:sl", symbol, stop_loss, 'below' if bullish else 'above',
+                           user_id, text)
+            loaded += 1
+        return loaded
+
+
+def main():
+    """Опрос текущих цен и вывод сработавших оповещений"""
+    if len(sys.argv) < 2:
+        print("Usage: python alert_engine.py <alerts.json> [interval_seconds]")
+        sys.exit(1)
+
+    from get_csv_file import CryptoDataFetcher
+
+    engine = PriceAlertEngine()
+    if not engine.load_alerts(sys.argv[1]):
+        print("No signal alerts with TP/SL levels found")
+        sys.exit(1)
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    fetcher = CryptoDataFetcher()
+
+    while engine.alerts:
+        for alert in engine.poll(fetcher):
+            print(json.dumps(alert), flush=True)
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    main()
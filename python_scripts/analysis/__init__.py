@@ -0,0 +1,28 @@
+"""
+Общий пакет анализа для analyze_script.py и csv_file_analysis.py.
+
+Собирает в одном пространстве имен все, что нужно для анализа свечей:
+    TradingStrategyAnalyzer    - расчет индикаторов и сигналов стратегий (analysis.analyzer)
+    compute_indicators         - индикаторы по группам для DataFrame или сырых массивов (analysis.indicators)
+    adx, average_true_range, parabolic_sar - рекурсивные ядра (indicator_kernels)
+    nearest_levels_per_bar, current_levels, SwingLevelTracker - уровни поддержки и сопротивления
+    load_strategy, strategy_keys, ...       - реестр стратегий (strategies)
+
+Точки входа отличаются только источником данных и представлением результата:
+analyze_script печатает JSON, csv_file_analysis - отчет на русском.
+"""
+from analysis.analyzer import SIGNAL_CONFIDENCES, SIGNAL_DIRECTIONS, TradingStrategyAnalyzer
+from analysis.indicators import (COMPACT_FLOAT32_COLUMNS, INDICATOR_GROUPS, INTERMEDIATE_COLUMNS, REQUIRED_COLUMNS,
+                                 compute_indicators, set_indicator, to_candle_frame)
+from strategies import load_strategy, required_indicators, resolve_strategy_key, strategy_keys, strategy_weight
+from support_resistance import SwingLevelTracker, current_levels, nearest_levels_per_bar
+
+_KERNELS = ('adx', 'average_true_range', 'parabolic_sar')
+
+
+def __getattr__(name):
+    """Ядра indicator_kernels загружаются при первом обращении: импорт numba занимает заметное время"""
+    if name in _KERNELS:
+        import indicator_kernels
+        return getattr(indicator_kernels, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
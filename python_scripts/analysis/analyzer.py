@@ -0,0 +1,353 @@
+"""
+Общее ядро анализа стратегий для analyze_script (JSON для Go) и csv_file_analysis (интерактивный вывод).
+
+TradingStrategyAnalyzer считает индикаторы, запрашиваемые стратегиями реестра strategies,
+и возвращает результаты с английскими ключами и значениями (BULLISH, HIGH, ...);
+локализация и печать - задача вызывающей стороны.
+"""
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analysis.indicators import REQUIRED_COLUMNS, SUPPORT_RESISTANCE_WINDOW, compute_indicators, to_candle_frame
+from strategies import load_strategy, required_indicators, resolve_strategy_key, strategy_keys, strategy_weight
+from support_resistance import current_levels
+
+# candle_patterns, monte_carlo, regime и trade_tape импортируются в методах, которые их используют:
+# запуски без сравнения стратегий, симуляции и профиля объема не платят за их загрузку
+
+SIGNAL_DIRECTIONS = ['BULLISH', 'BEARISH', 'NEUTRAL']
+SIGNAL_CONFIDENCES = ['HIGH', 'MEDIUM', 'LOW']
+
+
+class TradingStrategyAnalyzer:
+    def __init__(self, data, compact=False, orderbook=None, trade_tape=None):
+        """
+        Args:
+            data: свечи - DataFrame или сырые массивы (см. to_candle_frame)
+            compact: экономный режим памяти - осцилляторы хранятся в float32,
+                     расчет идет без копии всей таблицы, промежуточные колонки не сохраняются
+            orderbook: стакан заявок (orderbook.OrderBook) для признаков стакана
+            trade_tape: лента сделок (trade_tape.TradeTape) для VWAP последних сделок и профиля объема
+        """
+        self.data = to_candle_frame(data)
+        self.compact = compact
+        self.orderbook = orderbook
+        self.trade_tape = trade_tape
+        self.memory_report = None
+        # Трассировку памяти останавливает только тот, кто ее запустил
+        self._started_tracing = False
+        # Детектор режима рынка (regime.RegimeDetector): заполняется при первом запросе режима
+        self.regime_detector = None
+        # Пути Монте-Карло по методу - общие для уровней всех стратегий
+        self._simulated_paths = {}
+
+    def prepare_data(self):
+        """Подготовка данных для анализа"""
+        try:
+            for col in REQUIRED_COLUMNS:
+                if col not in self.data.columns:
+                    return False
+
+            # В экономном режиме уже упорядоченные данные не копируются
+            if not (self.compact and self.data['Timestamp'].is_monotonic_increasing):
+                self.data = self.data.sort_values('Timestamp')
+            # Новый объект таблицы: изменения ниже не затрагивают DataFrame вызывающей стороны
+            self.data = self.data.reset_index(drop=True)
+
+            if self.compact:
+                self.data['Volume'] = self.data['Volume'].astype(np.float32)
+            return True
+        except Exception as e:
+            sys.stderr.write(f"Error preparing data: {str(e)}\n")
+            return False
+
+    def calculate_technical_indicators(self, indicators=None):
+        """
+        Расчет технических индикаторов
+
+        Args:
+            indicators: группы индикаторов из INDICATOR_GROUPS, по умолчанию - все
+        """
+        df = self.data if self.compact else self.data.copy()
+        self.data = compute_indicators(df, indicators, self.compact)
+
+    def support_resistance_levels(self, window=SUPPORT_RESISTANCE_WINDOW):
+        """Кластеры уровней свингов и профиля объема относительно текущей цены"""
+        profile = self.volume_profile()
+        extra = [profile['poc'], profile['value_area_high'], profile['value_area_low']]
+        extra = [level for level in extra + profile['high_volume_nodes'] if level is not None]
+        df = self.data
+        return current_levels(df['High'], df['Low'], df['Close'], window, extra_levels=extra)
+
+    def _start_memory_tracking(self):
+        """Начинает замер пиковой памяти для экономного режима"""
+        if not self.compact:
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def _finish_memory_tracking(self):
+        """Сохраняет пиковую память запуска и размер таблицы с индикаторами"""
+        if not self.compact or not tracemalloc.is_tracing():
+            return None
+
+        _, peak = tracemalloc.get_traced_memory()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.memory_report = {
+            'peak_mb': round(peak / 1024 / 1024, 3),
+            'frame_mb': round(float(self.data.memory_usage(deep=True).sum()) / 1024 / 1024, 3),
+            'rows': len(self.data)
+        }
+        return self.memory_report
+
+    def signal_matrix(self):
+        """
+        Сигналы всех стратегий для каждой свечи за один векторный проход.
+        Для каждой стратегии - направление, уверенность, TP и SL,
+        плюс взвешенные вероятности как в compare_strategies.
+        """
+        from regime import REGIMES, regime_series
+
+        keys = strategy_keys()
+        self.calculate_technical_indicators(required_indicators(keys) | {'adx', 'atr'})
+        df = self.data
+        regimes, _ = regime_series(df['Close'], df['atr'], df['adx'])
+
+        matrix = pd.DataFrame({'Timestamp': df['Timestamp'].to_numpy(), 'Close': df['Close'].to_numpy()})
+        matrix['regime'] = pd.Categorical(regimes, categories=REGIMES)
+        bullish_weight = np.zeros(len(df))
+        bearish_weight = np.zeros(len(df))
+        total_weight = np.zeros(len(df))
+
+        for key in keys:
+            strategy = load_strategy(key)
+            bullish, bearish, confidence, tp, sl = strategy.signals(df)
+            direction = np.select([bullish, bearish], ['BULLISH', 'BEARISH'], 'NEUTRAL')
+
+            matrix[f'{key}_direction'] = pd.Categorical(direction, categories=SIGNAL_DIRECTIONS)
+            matrix[f'{key}_confidence'] = pd.Categorical(confidence, categories=SIGNAL_CONFIDENCES)
+            matrix[f'{key}_tp'] = tp
+            matrix[f'{key}_sl'] = sl
+
+            # Вес стратегии в режиме рынка каждой свечи
+            weight = np.select([regimes == regime for regime in REGIMES],
+                               [strategy_weight(strategy, regime) for regime in REGIMES], strategy.WEIGHT)
+            bullish_weight += weight * bullish
+            bearish_weight += weight * bearish
+            total_weight += weight
+
+        bullish_probability = bullish_weight / total_weight * 100
+        bearish_probability = bearish_weight / total_weight * 100
+        neutral_probability = 100 - bullish_probability - bearish_probability
+
+        matrix['bullish_probability'] = bullish_probability.round(1)
+        matrix['bearish_probability'] = bearish_probability.round(1)
+        matrix['neutral_probability'] = neutral_probability.round(1)
+        matrix['overall_direction'] = pd.Categorical(np.select(
+            [(bullish_probability > bearish_probability) & (bullish_probability > neutral_probability),
+             (bearish_probability > bullish_probability) & (bearish_probability > neutral_probability)],
+            ['BULLISH', 'BEARISH'], 'NEUTRAL'), categories=SIGNAL_DIRECTIONS)
+
+        return matrix
+
+    def analyze_strategy(self, strategy_key):
+        """Анализ выбранной стратегии"""
+        strategy_key = resolve_strategy_key(strategy_key)
+        if strategy_key is None:
+            return None
+
+        strategy = load_strategy(strategy_key)
+        self._start_memory_tracking()
+
+        # Расчет только нужных стратегии индикаторов
+        self.calculate_technical_indicators(strategy.REQUIRED_INDICATORS)
+
+        # Получение сигналов от стратегии
+        result = strategy.analyze(self.data)
+        if 'support_resistance' in strategy.REQUIRED_INDICATORS:
+            result['levels'] = self.support_resistance_levels()
+
+        orderbook = self.orderbook_features()
+        if orderbook:
+            result['orderbook'] = orderbook
+        if self.trade_tape is not None:
+            result['trade_tape'] = self.trade_tape.features()
+
+        if self._finish_memory_tracking():
+            result['memory'] = self.memory_report
+        return result
+
+    def compare_strategies(self):
+        """Сравнение всех стратегий и расчет общей вероятности"""
+        from candle_patterns import latest_patterns
+
+        keys = strategy_keys()
+        self._start_memory_tracking()
+        self.calculate_technical_indicators(required_indicators(keys) | {'patterns'})
+        current_price = self.data['Close'].iloc[-1]
+        regime = self.market_regime()
+
+        results = []
+        bullish_count = 0
+        bearish_count = 0
+        neutral_count = 0
+        total_weight = 0
+        total_tp = 0
+        total_sl = 0
+
+        # Собираем результаты всех стратегий
+        for key in keys:
+            strategy = load_strategy(key)
+            result = strategy.analyze(self.data)
+            results.append(result)
+
+            # Подсчет сигналов с учетом веса
+            weight = strategy_weight(strategy, regime['regime'])
+            if result['direction'] == "BULLISH":
+                bullish_count += weight
+            elif result['direction'] == "BEARISH":
+                bearish_count += weight
+            else:
+                neutral_count += weight
+
+            total_weight += weight
+
+            # Суммируем TP и SL для усреднения
+            if result['take_profit'] > 0:
+                total_tp += result['take_profit'] * weight
+                total_sl += result['stop_loss'] * weight
+
+        # Расчет общей вероятности
+        total_signals = bullish_count + bearish_count + neutral_count
+        if total_signals > 0:
+            bullish_probability = (bullish_count / total_signals) * 100
+            bearish_probability = (bearish_count / total_signals) * 100
+            neutral_probability = (neutral_count / total_signals) * 100
+        else:
+            bullish_probability = bearish_probability = neutral_probability = 33.33
+
+        # Определение общего направления
+        if bullish_probability > bearish_probability and bullish_probability > neutral_probability:
+            overall_direction = "BULLISH"
+            overall_confidence = "HIGH" if bullish_probability > 60 else "MEDIUM" if bullish_probability > 40 else "LOW"
+        elif bearish_probability > bullish_probability and bearish_probability > neutral_probability:
+            overall_direction = "BEARISH"
+            overall_confidence = "HIGH" if bearish_probability > 60 else "MEDIUM" if bearish_probability > 40 else "LOW"
+        else:
+            overall_direction = "NEUTRAL"
+            overall_confidence = "MEDIUM" if neutral_probability > 50 else "LOW"
+
+        # Усредненные TP/SL
+        avg_tp = round(total_tp / total_weight, 6) if total_weight > 0 else current_price
+        avg_sl = round(total_sl / total_weight, 6) if total_weight > 0 else current_price
+
+        # Создаем словарь с результатами всех стратегий
+        strategy_results = {}
+        for result in results:
+            strategy_results[result['strategy']] = {
+                'direction': result['direction'],
+                'confidence': result['confidence'],
+                'take_profit': result['take_profit'],
+                'stop_loss': result['stop_loss']
+            }
+
+        overall_result = {
+            'overall': {
+                'direction': overall_direction,
+                'confidence': overall_confidence,
+                'take_profit': avg_tp,
+                'stop_loss': avg_sl,
+                'current_price': round(current_price, 6),
+                'probabilities': {
+                    'bullish': round(bullish_probability, 1),
+                    'bearish': round(bearish_probability, 1),
+                    'neutral': round(neutral_probability, 1)
+                },
+                'regime': regime
+            },
+            'strategies': strategy_results,
+            'patterns': latest_patterns(self.data)
+        }
+
+        orderbook = self.orderbook_features()
+        if orderbook:
+            overall_result['orderbook'] = orderbook
+        if self.trade_tape is not None:
+            overall_result['trade_tape'] = self.trade_tape.features()
+
+        if self._finish_memory_tracking():
+            overall_result['memory'] = self.memory_report
+
+        return overall_result
+
+    def orderbook_features(self, levels=10):
+        """Дисбаланс, микроцена и глубина стакана или None, если стакан не передан"""
+        if self.orderbook is None:
+            return None
+        return self.orderbook.features(levels)
+
+    def market_regime(self):
+        """
+        Режим рынка последней свечи (TREND, RANGE, HIGH_VOLATILITY) и его показатели.
+        Детектор заполняется хвостом истории один раз; новые свечи - regime_detector.update.
+        """
+        if self.regime_detector is None:
+            from regime import RegimeDetector
+
+            df = self.data
+            self.regime_detector = RegimeDetector.from_candles(df['High'], df['Low'], df['Close'])
+        return self.regime_detector.to_dict()
+
+    def volume_profile(self):
+        """
+        Профиль объема по свечам: POC, зона стоимости и узлы высокого объема.
+        Если передана лента сделок, узлы ее профиля добавляются к узлам свечей.
+        """
+        from trade_tape import candle_volume_profile
+
+        df = self.data
+        levels = candle_volume_profile(df['High'], df['Low'], df['Volume']).levels()
+        if self.trade_tape is not None and self.trade_tape.profile is not None:
+            tape_levels = self.trade_tape.profile.levels()
+            extra = [tape_levels['poc']] + tape_levels['high_volume_nodes']
+            levels['high_volume_nodes'] += [level for level in extra if level is not None]
+        return levels
+
+    def simulate_levels(self, take_profit, stop_loss, method='bootstrap'):
+        """Монте-Карло оценка исхода сделки с уровнями TP/SL от текущей цены"""
+        if method not in self._simulated_paths:
+            from monte_carlo import simulate_paths
+
+            if 'atr' not in self.data.columns:
+                self.calculate_technical_indicators(['atr'])
+
+            df = self.data
+            self._simulated_paths[method] = simulate_paths(
+                df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(),
+                method=method, atr=float(df['atr'].iloc[-1]))
+
+        simulated = self._simulated_paths[method]
+        return simulated.exit_stats(take_profit, stop_loss) if simulated is not None else None
+
+    def simulate_outcomes(self, result, method='bootstrap'):
+        """
+        Добавляет к результату analyze_strategy или compare_strategies блок 'simulation'
+        с вероятностью достижения TP раньше SL и временем до выхода для каждой стратегии.
+        """
+        if 'strategies' in result:
+            for strategy_result in result['strategies'].values():
+                strategy_result['simulation'] = self.simulate_levels(
+                    strategy_result['take_profit'], strategy_result['stop_loss'], method)
+            overall = result['overall']
+            overall['simulation'] = self.simulate_levels(overall['take_profit'], overall['stop_loss'], method)
+        else:
+            result['simulation'] = self.simulate_levels(result['take_profit'], result['stop_loss'], method)
+        return result
@@ -0,0 +1,149 @@
+"""
+Расчет индикаторов стратегий по таблице свечей.
+
+Индикаторы считаются группами (INDICATOR_GROUPS), стратегии запрашивают нужные группы
+через REQUIRED_INDICATORS. Входные данные - DataFrame или сырые массивы (см. to_candle_frame).
+"""
+import numpy as np
+import pandas as pd
+import ta
+
+from support_resistance import nearest_levels_per_bar
+
+# indicator_kernels (numba), candle_patterns и trade_tape импортируются только для запрошенных групп
+
+REQUIRED_COLUMNS = ['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+# Индикаторы, для которых хватает точности float32 в экономном режиме: объем и осцилляторы,
+# которые сравниваются только с порогами и друг с другом. Ценовые уровни (скользящие средние,
+# полосы, SAR, уровни поддержки и сопротивления) и ATR (от него считаются TP/SL) остаются float64
+COMPACT_FLOAT32_COLUMNS = {'Volume', 'rsi', 'macd', 'macd_signal', 'stoch_k', 'stoch_d', 'adx'}
+
+# Промежуточные колонки, которые не читает ни одна стратегия
+INTERMEDIATE_COLUMNS = {'macd_histogram'}
+
+# Группы индикаторов, которые могут запросить стратегии (REQUIRED_INDICATORS)
+INDICATOR_GROUPS = [
+    'rsi', 'macd', 'sma', 'ema', 'bollinger', 'stochastic',
+    'parabolic_sar', 'adx', 'atr', 'support_resistance', 'vwap', 'patterns'
+]
+
+SUPPORT_RESISTANCE_WINDOW = 20
+
+
+def to_candle_frame(data):
+    """
+    Таблица свечей с колонками REQUIRED_COLUMNS.
+
+    Args:
+        data: DataFrame (колонки в любом регистре, как у get_kline_data),
+              dict колонка -> массив или двумерный массив с колонками в порядке REQUIRED_COLUMNS
+    """
+    if isinstance(data, pd.DataFrame):
+        frame = data
+    elif isinstance(data, np.ndarray) and data.ndim == 2:
+        frame = pd.DataFrame(data[:, :len(REQUIRED_COLUMNS)], columns=REQUIRED_COLUMNS)
+        frame['Timestamp'] = frame['Timestamp'].astype(np.int64)
+    else:
+        frame = pd.DataFrame(dict(data))
+
+    renames = {column: column.capitalize() for column in frame.columns
+               if column.capitalize() in REQUIRED_COLUMNS and column not in REQUIRED_COLUMNS}
+    return frame.rename(columns=renames) if renames else frame
+
+
+def set_indicator(df, column, values, compact=False):
+    """Сохраняет колонку индикатора с учетом экономного режима"""
+    if not compact:
+        df[column] = values
+    elif column in COMPACT_FLOAT32_COLUMNS:
+        df[column] = values.astype(np.float32)
+    elif column not in INTERMEDIATE_COLUMNS:
+        df[column] = values
+
+
+def compute_indicators(df, indicators=None, compact=False):
+    """
+    Добавляет в df колонки индикаторов.
+
+    Args:
+        indicators: группы индикаторов из INDICATOR_GROUPS, по умолчанию - все
+        compact: экономный режим - индикаторы в float32, без промежуточных колонок
+
+    Returns:
+        df с колонками индикаторов
+    """
+    indicators = set(INDICATOR_GROUPS if indicators is None else indicators)
+
+    # RSI
+    if 'rsi' in indicators:
+        set_indicator(df, 'rsi', ta.momentum.RSIIndicator(df['Close'], window=14).rsi(), compact)
+
+    # MACD
+    if 'macd' in indicators:
+        macd = ta.trend.MACD(df['Close'])
+        set_indicator(df, 'macd', macd.macd(), compact)
+        set_indicator(df, 'macd_signal', macd.macd_signal(), compact)
+        set_indicator(df, 'macd_histogram', macd.macd_diff(), compact)
+
+    # Скользящие средние
+    if 'sma' in indicators:
+        set_indicator(df, 'sma_20', ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator(), compact)
+        set_indicator(df, 'sma_50', ta.trend.SMAIndicator(df['Close'], window=50).sma_indicator(), compact)
+    if 'ema' in indicators:
+        set_indicator(df, 'ema_12', ta.trend.EMAIndicator(df['Close'], window=12).ema_indicator(), compact)
+        set_indicator(df, 'ema_26', ta.trend.EMAIndicator(df['Close'], window=26).ema_indicator(), compact)
+
+    # Bollinger Bands
+    if 'bollinger' in indicators:
+        bollinger = ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2)
+        set_indicator(df, 'bb_upper', bollinger.bollinger_hband(), compact)
+        set_indicator(df, 'bb_lower', bollinger.bollinger_lband(), compact)
+        set_indicator(df, 'bb_middle', bollinger.bollinger_mavg(), compact)
+
+    # Stochastic
+    if 'stochastic' in indicators:
+        stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'], window=14, smooth_window=3)
+        set_indicator(df, 'stoch_k', stoch.stoch(), compact)
+        set_indicator(df, 'stoch_d', stoch.stoch_signal(), compact)
+
+    # Parabolic SAR, ADX и ATR - рекурсивные ядра из indicator_kernels (numba при наличии)
+    if indicators & {'parabolic_sar', 'adx', 'atr'}:
+        from indicator_kernels import adx, average_true_range, parabolic_sar
+
+    if 'parabolic_sar' in indicators:
+        set_indicator(df, 'parabolic_sar', parabolic_sar(df['High'], df['Low'], df['Close']), compact)
+
+    # ADX
+    if 'adx' in indicators:
+        set_indicator(df, 'adx', adx(df['High'], df['Low'], df['Close'], window=14), compact)
+
+    # ATR
+    if 'atr' in indicators:
+        set_indicator(df, 'atr', average_true_range(df['High'], df['Low'], df['Close'], window=14), compact)
+
+    # VWAP от начала суточной сессии
+    if 'vwap' in indicators:
+        from trade_tape import session_vwap
+
+        set_indicator(df, 'vwap', session_vwap(df['Timestamp'], df['High'], df['Low'],
+                                               df['Close'], df['Volume']), compact)
+
+    # Свечные паттерны: колонка pattern_<имя> на каждый паттерн и суммарная оценка
+    if 'patterns' in indicators:
+        from candle_patterns import detect_patterns, pattern_score
+
+        patterns = detect_patterns(df['Open'], df['High'], df['Low'], df['Close'])
+        for name, values in patterns.items():
+            df[f'pattern_{name}'] = values
+        df['pattern_score'] = pattern_score(patterns)
+
+    # Уровни поддержки и сопротивления: ближайшие подтвержденные свинги
+    # выше и ниже предыдущего закрытия для каждой свечи
+    if 'support_resistance' in indicators and len(df):
+        resistance, support = nearest_levels_per_bar(df['High'], df['Low'], df['Close'],
+                                                     SUPPORT_RESISTANCE_WINDOW)
+        set_indicator(df, 'nearest_resistance', resistance, compact)
+        set_indicator(df, 'nearest_support', support, compact)
+
+    return df
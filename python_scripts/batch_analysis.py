@@ -0,0 +1,226 @@
+"""
+Пакетный анализ CSV-файлов свечей: сравнение стратегий по каждому файлу каталога или маски.
+
+Файлы обрабатываются в пуле процессов (не больше workers одновременно). Общий лимит памяти
+делится между процессами поровну: каждому процессу ставится RLIMIT_DATA (Linux/macOS),
+а файл, полная загрузка которого по оценке не помещается в долю процесса,
+читается порциями (TradingStrategyAnalyzer(chunk_rows=...)).
+Если процесс аварийно завершился, в отчет попадает ошибка только по файлам,
+которые он обрабатывал, а пул пересоздается для оставшихся.
+
+Итог - таблица, ранжированная по силе консенсуса стратегий, с временем обработки файлов,
+в <out>.csv и <out>.json.
+
+Запуск:
+    python3 batch_analysis.py <каталог или маска> [--workers 4] [--memory-mb 4096] [--out batch_report]
+"""
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_WORKERS = 4
+DEFAULT_MEMORY_MB = 4096
+DEFAULT_REPORT = 'batch_report'
+
+# Пиковая память полной загрузки с индикаторами - примерно столько размеров CSV
+FULL_LOAD_MEMORY_FACTOR = 8
+
+
+def collect_files(pattern):
+    """CSV-файлы каталога или файлы по маске glob"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.csv')
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def _limit_memory(limit_bytes):
+    """Инициализатор процесса пула: ограничение памяти данных процесса"""
+    if resource is None or not limit_bytes:
+        return
+    try:
+        resource.setrlimit(resource.RLIMIT_DATA, (limit_bytes, limit_bytes))
+    except (ValueError, OSError):
+        pass
+
+
+def analyze_file(path, memory_limit_bytes=None):
+    """
+    Сравнение стратегий по одному файлу (выполняется в процессе пула).
+
+    Returns:
+        dict строки отчета: консенсус, сигналы стратегий, время и память процесса
+    """
+    from csv_file_analysis import DEFAULT_CHUNK_ROWS, TradingStrategyAnalyzer
+
+    started = time.perf_counter()
+    row = {'file': path, 'size_mb': round(os.path.getsize(path) / 1024 / 1024, 3)}
+    chunked = bool(memory_limit_bytes) and os.path.getsize(path) * FULL_LOAD_MEMORY_FACTOR > memory_limit_bytes
+    row['chunked'] = chunked
+
+    output = io.StringIO()
+    try:
+        # Анализатор печатает отчет для интерактивного режима - в пакетном режиме он не нужен
+        with contextlib.redirect_stdout(output):
+            # Без бинарного кеша: пакетный запуск не должен оставлять каталоги <csv>.cache рядом с файлами
+            analyzer = TradingStrategyAnalyzer(path, chunk_rows=DEFAULT_CHUNK_ROWS if chunked else None,
+                                               use_cache=False)
+            if analyzer.data is None:
+                errors = [line for line in output.getvalue().splitlines() if line.startswith('❌')]
+                raise ValueError(errors[-1].lstrip('❌ ') if errors else "не удалось загрузить данные")
+            load_seconds = time.perf_counter() - started
+            results = analyzer.compare_strategies()
+    except MemoryError:
+        row.update({'error': 'превышен лимит памяти', 'seconds': round(time.perf_counter() - started, 3)})
+        return row
+    except Exception as e:
+        row.update({'error': str(e), 'seconds': round(time.perf_counter() - started, 3)})
+        return row
+
+    bullish = sum(1 for result in results if result['Направление'] == 'ВВЕРХ')
+    bearish = sum(1 for result in results if result['Направление'] == 'ВНИЗ')
+    if bullish > bearish:
+        consensus = 'ВВЕРХ'
+    elif bearish > bullish:
+        consensus = 'ВНИЗ'
+    else:
+        consensus = 'НЕОПРЕДЕЛЕННО'
+
+    row.update({
+        'rows': len(analyzer.data),
+        'price': float(analyzer.data['Close'].iloc[-1]),
+        'consensus': consensus,
+        'bullish': bullish,
+        'bearish': bearish,
+        'strength': abs(bullish - bearish),
+        'high_confidence': sum(1 for result in results if result['Уверенность'] == 'ВЫСОКАЯ'),
+        'strategies': {result['Стратегия']: result['Направление'] for result in results},
+        'load_seconds': round(load_seconds, 3),
+        'seconds': round(time.perf_counter() - started, 3)
+    })
+    if resource is not None:
+        row['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return row
+
+
+def _report_row(rows, row):
+    """Добавляет строку в отчет и печатает итог по файлу"""
+    rows.append(row)
+    if 'error' in row:
+        print(f"❌ {row['file']}: {row['error']}", flush=True)
+    else:
+        print(f"✅ {row['file']}: {row['consensus']} ({row['seconds']} с)", flush=True)
+
+
+def run_batch(files, workers=DEFAULT_WORKERS, memory_mb=DEFAULT_MEMORY_MB):
+    """
+    Анализ файлов в пуле процессов. В работе одновременно не больше workers файлов.
+
+    Returns:
+        список строк отчета в порядке завершения
+    """
+    workers = max(1, min(workers, len(files) or 1))
+    limit_bytes = (memory_mb << 20) // workers if memory_mb else None
+    pending = list(files)
+    rows = []
+
+    while pending:
+        running = {}
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_limit_memory,
+                                     initargs=(limit_bytes,)) as executor:
+                while pending or running:
+                    while pending and len(running) < workers:
+                        path = pending.pop(0)
+                        running[executor.submit(analyze_file, path, limit_bytes)] = path
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _report_row(rows, future.result())
+                        running.pop(future)
+        except BrokenProcessPool:
+            # Процесс пула аварийно завершился (например, при нехватке памяти в нативном коде).
+            # Файлы, успевшие завершиться до сбоя, сохраняют свой результат
+            for future, path in running.items():
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    _report_row(rows, future.result())
+                else:
+                    _report_row(rows, {'file': path, 'error': 'процесс анализа аварийно завершился',
+                                       'seconds': None})
+
+    return rows
+
+
+def rank_report(rows):
+    """Таблица отчета: сначала файлы с самым сильным консенсусом, файлы с ошибками - в конце"""
+    report = pd.DataFrame(rows)
+    if 'strength' not in report.columns:
+        return report
+    for column in ['rows', 'bullish', 'bearish', 'strength', 'high_confidence']:
+        report[column] = report[column].astype('Int64')
+    report = report.sort_values(['strength', 'high_confidence'], ascending=False, na_position='last')
+    report.insert(0, 'rank', range(1, len(report) + 1))
+    return report.reset_index(drop=True)
+
+
+def save_report(report, path=DEFAULT_REPORT):
+    """Сохраняет отчет в <path>.csv и <path>.json"""
+    flat = report.copy()
+    if 'strategies' in flat.columns:
+        flat['strategies'] = flat['strategies'].map(
+            lambda value: json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else value)
+    flat.to_csv(f"{path}.csv", index=False)
+    with open(f"{path}.json", 'w', encoding='utf-8') as f:
+        json.dump(json.loads(report.to_json(orient='records', force_ascii=False)), f,
+                  indent=2, ensure_ascii=False)
+    return f"{path}.csv", f"{path}.json"
+
+
+def main():
+    """Пакетный анализ из командной строки"""
+    args = sys.argv[1:]
+    options = {'--workers': str(DEFAULT_WORKERS), '--memory-mb': str(DEFAULT_MEMORY_MB), '--out': DEFAULT_REPORT}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+
+    if len(args) != 1:
+        print("Usage: python batch_analysis.py <directory|glob> [--workers 4] [--memory-mb 4096] "
+              "[--out batch_report]")
+        sys.exit(1)
+
+    files = collect_files(args[0])
+    if not files:
+        print(f"❌ Файлы не найдены: {args[0]}")
+        sys.exit(1)
+
+    print(f"🚀 Пакетный анализ: {len(files)} файлов, процессов: {options['--workers']}, "
+          f"лимит памяти: {options['--memory-mb']} МБ")
+    started = time.perf_counter()
+    report = rank_report(run_batch(files, int(options['--workers']), int(options['--memory-mb'])))
+
+    columns = [column for column in ['rank', 'file', 'consensus', 'bullish', 'bearish', 'seconds', 'error']
+               if column in report.columns]
+    print("\n📊 ИТОГОВЫЙ РЕЙТИНГ")
+    print(report[columns].to_string(index=False))
+
+    csv_path, json_path = save_report(report, options['--out'])
+    print(f"\n💾 Отчет сохранен: {csv_path}, {json_path} "
+          f"(общее время {time.perf_counter() - started:.2f} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Локальная заглушка Bybit REST с задержками - для проверки таймаутов, дублирующих запросов
+и перехода на кешированные свечи без обращения к бирже.
+
+Отдает синтетические свечи (/v5/market/kline, от новых к старым, как Bybit), тикер
+(/v5/market/tickers), стакан (/v5/market/orderbook) и ленту сделок (/v5/market/recent-trade).
+Свечи детерминированы: случайное блуждание с зерном от символа и интервала.
+Задержки задаются детерминированно: каждый slow_every-й запрос отвечает через slow_ms,
+каждый fail_every-й - ошибкой 503, остальные - через delay_ms.
+
+Запуск:
+    python3 bybit_stub.py [--port 8099] [--delay-ms 20] [--slow-every 5] [--slow-ms 3000] [--fail-every 0]
+    BYBIT_REST_URL=http://127.0.0.1:8099 python3 analyze_script.py BTC 5 ALL --deadline=1
+"""
+import json
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from timestamps import interval_ms, now_ms
+
+DEFAULT_PORT = 8099
+
+
+class StubConfig:
+    """Задержки заглушки (мс) и счетчики запросов"""
+
+    def __init__(self, delay_ms=20, slow_every=0, slow_ms=3000, fail_every=0):
+        self.delay_ms = delay_ms
+        self.slow_every = slow_every
+        self.slow_ms = slow_ms
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.slow = 0
+        self.failed = 0
+
+    def next_request(self):
+        """Задержка в секундах и признак ошибки для очередного запроса"""
+        with self.lock:
+            self.requests += 1
+            number = self.requests
+            if self.fail_every and number % self.fail_every == 0:
+                self.failed += 1
+                return self.delay_ms / 1000, True
+            if self.slow_every and number % self.slow_every == 0:
+                self.slow += 1
+                return self.slow_ms / 1000, False
+            return self.delay_ms / 1000, False
+
+
+def synthetic_klines(symbol, interval, limit, end_ms=None):
+    """Свечи в формате Bybit: списки строк от новых к старым"""
+    step = interval_ms(interval)
+    end_ms = now_ms() if end_ms is None else int(end_ms)
+    last = end_ms // step * step
+    timestamps = last - np.arange(limit, dtype=np.int64)[::-1] * step
+
+    rng = np.random.default_rng(zlib.crc32(f"{symbol}:{interval}".encode()) + int(last // step))
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, limit)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, limit))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, limit))
+    volume = rng.uniform(1, 100, limit)
+
+    rows = zip(timestamps, open_, high, low, close, volume, volume * close)
+    return [[str(int(row[0]))] + [f"{value:.6f}" for value in row[1:]] for row in rows][::-1]
+
+
+def synthetic_orderbook(symbol, limit):
+    """Снимок стакана в формате Bybit вокруг последней цены синтетических свечей"""
+    price = float(synthetic_klines(symbol, '1', 1)[0][4])
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    tick = price * 1e-5
+    steps = np.arange(1, limit + 1)
+    bids = [[f"{price - step * tick:.6f}", f"{size:.4f}"] for step, size in zip(steps, rng.uniform(0.01, 5, limit))]
+    asks = [[f"{price + step * tick:.6f}", f"{size:.4f}"] for step, size in zip(steps, rng.uniform(0.01, 5, limit))]
+    return {'s': symbol, 'b': bids, 'a': asks, 'u': 1, 'ts': now_ms()}
+
+
+def synthetic_trades(symbol, limit):
+    """Последние сделки в формате Bybit (новые первыми) внутри последней синтетической свечи"""
+    timestamp, _, high, low = (float(value) for value in synthetic_klines(symbol, '1', 1)[0][:4])
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    times = np.sort(rng.integers(timestamp, timestamp + 60_000, limit))[::-1]
+    prices = rng.uniform(low, high, limit)
+    sizes = rng.uniform(0.001, 2, limit)
+    sides = rng.choice(['Buy', 'Sell'], limit)
+    return [{'execId': f"{symbol}-{index}", 'symbol': symbol, 'price': f"{price:.6f}", 'size': f"{size:.4f}",
+             'side': side, 'time': str(int(time_ms))}
+            for index, (time_ms, price, size, side) in enumerate(zip(times, prices, sizes, sides))]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент уже получил ответ на дублирующий запрос или исчерпал бюджет
+            pass
+
+    def do_GET(self):
+        delay, failed = self.server.config.next_request()
+        time.sleep(delay)
+        if failed:
+            self._send(503, {'retCode': 10006, 'retMsg': 'Injected failure'})
+            return
+
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        symbol = params.get('symbol', 'BTCUSDT')
+
+        if url.path == '/v5/market/kline':
+            klines = synthetic_klines(symbol, params.get('interval', '5'), int(params.get('limit', 200)),
+                                      params.get('end'))
+            self._send(200, {'retCode': 0, 'retMsg': 'OK',
+                             'result': {'symbol': symbol, 'category': 'spot', 'list': klines}})
+        elif url.path == '/v5/market/orderbook':
+            self._send(200, {'retCode': 0, 'retMsg': 'OK',
+                             'result': synthetic_orderbook(symbol, int(params.get('limit', 200)))})
+        elif url.path == '/v5/market/recent-trade':
+            self._send(200, {'retCode': 0, 'retMsg': 'OK',
+                             'result': {'category': 'spot', 'list': synthetic_trades(symbol, int(params.get('limit', 60)))}})
+        elif url.path == '/v5/market/tickers':
+            price = synthetic_klines(symbol, '1', 1)[0][4]
+            self._send(200, {'retCode': 0, 'retMsg': 'OK',
+                             'result': {'category': 'spot', 'list': [{'symbol': symbol, 'lastPrice': price}]}})
+        else:
+            self._send(404, {'retCode': 10001, 'retMsg': f"Unknown path {url.path}"})
+
+
+def start_stub(port=0, **config):
+    """Запускает заглушку в фоновом потоке. Адрес - server.url, счетчики - server.config"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(**config)
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Запуск заглушки из командной строки"""
+    args = sys.argv[1:]
+    options = {'--port': str(DEFAULT_PORT), '--delay-ms': '20', '--slow-every': '0', '--slow-ms': '3000',
+               '--fail-every': '0'}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+
+    server = ThreadingHTTPServer(('127.0.0.1', int(options['--port'])), StubHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(int(options['--delay-ms']), int(options['--slow-every']),
+                               int(options['--slow-ms']), int(options['--fail-every']))
+    print(f"🧪 Заглушка Bybit: http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Заглушка остановлена")
+
+
+if __name__ == "__main__":
+    main()
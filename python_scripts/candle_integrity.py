@@ -0,0 +1,281 @@
+"""
+Проверка целостности истории свечей в наборе Parquet (dataset_export) и догрузка пропусков.
+
+Bybit иногда отдает укороченные или сдвинутые окна, а после простоя в истории остаются дыры -
+индикаторы, посчитанные через пропуск, молча искажаются. Пропуски и дубликаты ищутся векторно:
+время каждой свечи переводится в номер слота интервала, разность соседних номеров больше 1 -
+пропуск, 0 - дубликат.
+
+Результат проверки каждого раздела (месяца) хранится в <root>/_integrity.json вместе с размером
+и временем изменения файла раздела. Повторная проверка читает только новые и измененные разделы,
+пропуски на стыках месяцев считаются по сохраненным первой и последней свече раздела.
+
+Догрузка запрашивает у биржи только недостающие диапазоны (get_kline_range) и записывает их
+в разделы через write_partition, которая заодно убирает дубликаты. Диапазоны, за которые биржа
+не вернула ни одной свечи (простой биржи), отмечаются в индексе и больше не запрашиваются.
+
+Запуск:
+    python3 candle_integrity.py check BTC ETH --intervals 5,60 [--root dataset]
+    python3 candle_integrity.py backfill BTC --intervals 5 [--root dataset]
+"""
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dataset_export import (COLUMNS, DEFAULT_ROOT, PARTITION_FILE, PYARROW_AVAILABLE, _require_pyarrow,
+                            month_ranges, partition_path, to_dataset_frame, write_partition)
+from timestamps import interval_ms
+
+if PYARROW_AVAILABLE:
+    import pyarrow.parquet as pq
+
+INDEX_FILE = '_integrity.json'
+
+# 1970-01-01 - четверг, недельные свечи Bybit начинаются с понедельника
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def candle_slots(timestamps, interval):
+    """Номер слота интервала для каждой свечи (для 'M' - календарный месяц)"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    interval = str(interval)
+    if interval == 'M':
+        return timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+    if interval == 'W':
+        return (timestamps - WEEK_OFFSET_MS) // interval_ms('W')
+    return timestamps // interval_ms(interval)
+
+
+def slot_start_ms(slots, interval):
+    """Время открытия свечи слота в мс (обратное к candle_slots)"""
+    slots = np.asarray(slots, dtype=np.int64)
+    interval = str(interval)
+    if interval == 'M':
+        return slots.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    if interval == 'W':
+        return slots * interval_ms('W') + WEEK_OFFSET_MS
+    return slots * interval_ms(interval)
+
+
+def find_gaps(timestamps, interval):
+    """
+    Пропуски и дубликаты в упорядоченном по времени ряду свечей.
+
+    Returns:
+        dict: gaps - список {'start', 'end', 'missing'} (время первой и последней недостающей свечи
+              в мс, число свечей), duplicates - повторов времени, unordered - нарушений порядка,
+              misaligned - свечей не на границе интервала
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    slots = candle_slots(timestamps, interval)
+    steps = np.diff(slots)
+
+    positions = np.flatnonzero(steps > 1)
+    starts = slot_start_ms(slots[positions] + 1, interval)
+    ends = slot_start_ms(slots[positions + 1] - 1, interval)
+    missing = steps[positions] - 1
+
+    return {
+        'gaps': [{'start': int(start), 'end': int(end), 'missing': int(count)}
+                 for start, end, count in zip(starts, ends, missing)],
+        'duplicates': int(np.count_nonzero(steps == 0)),
+        'unordered': int(np.count_nonzero(steps < 0)),
+        'misaligned': int(np.count_nonzero(slot_start_ms(slots, interval) != timestamps))
+    }
+
+
+def series_months(root, symbol, interval):
+    """Месяцы, для которых в наборе есть раздел символа и таймфрейма"""
+    directory = os.path.dirname(os.path.dirname(partition_path(root, symbol, interval, '')))
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name.split('=', 1)[1] for name in os.listdir(directory)
+                  if name.startswith('month=') and os.path.exists(os.path.join(directory, name, PARTITION_FILE)))
+
+
+class IntegrityIndex:
+    """Результаты проверки разделов и неустранимые пропуски в JSON-файле (ключ symbol/interval)"""
+
+    def __init__(self, root):
+        self.path = os.path.join(root, INDEX_FILE)
+        self.lock = threading.Lock()
+        self.series = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                self.series = json.load(f)
+
+    def entry(self, symbol, interval):
+        """Запись ряда: partitions - проверка по месяцам, unfillable - диапазоны [начало, конец]"""
+        with self.lock:
+            return self.series.setdefault(f"{symbol}/{interval}", {'partitions': {}, 'unfillable': []})
+
+    def save(self):
+        """Атомарно сохраняет индекс"""
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(self.series, f, indent=1, sort_keys=True)
+            os.replace(temporary, self.path)
+
+
+def check_series(root, symbol, interval, index=None):
+    """
+    Проверка ряда символа и таймфрейма. Читаются только разделы, изменившиеся с прошлой проверки.
+
+    Returns:
+        dict: rows, gaps (без неустранимых), known_gaps (неустранимые), missing, duplicates,
+              unordered, misaligned, rescanned - число перечитанных разделов
+    """
+    _require_pyarrow()
+    index = index or IntegrityIndex(root)
+    interval = str(interval)
+    entry = index.entry(symbol, interval)
+    partitions = entry['partitions']
+    months = series_months(root, symbol, interval)
+
+    for month in set(partitions) - set(months):
+        del partitions[month]
+
+    rescanned = 0
+    for month in months:
+        path = partition_path(root, symbol, interval, month)
+        stat = os.stat(path)
+        checked = partitions.get(month)
+        if checked and checked['size'] == stat.st_size and checked['mtime_ns'] == stat.st_mtime_ns:
+            continue
+
+        timestamps = pq.read_table(path, columns=['Timestamp']).column('Timestamp').to_numpy()
+        partitions[month] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'rows': len(timestamps),
+            'first': int(timestamps[0]) if len(timestamps) else None,
+            'last': int(timestamps[-1]) if len(timestamps) else None,
+            **find_gaps(timestamps, interval)
+        }
+        rescanned += 1
+
+    # Пропуски внутри разделов и на стыках соседних месяцев
+    gaps = []
+    previous = None
+    for month in months:
+        checked = partitions[month]
+        if not checked['rows']:
+            continue
+        if previous is not None:
+            gaps += find_gaps([previous['last'], checked['first']], interval)['gaps']
+        gaps += checked['gaps']
+        previous = checked
+
+    unfillable = {tuple(bounds) for bounds in entry['unfillable']}
+    known_gaps = [gap for gap in gaps if (gap['start'], gap['end']) in unfillable]
+    gaps = [gap for gap in gaps if (gap['start'], gap['end']) not in unfillable]
+    index.save()
+
+    checked = [partitions[month] for month in months]
+    return {
+        'symbol': symbol,
+        'interval': interval,
+        'rows': sum(part['rows'] for part in checked),
+        'gaps': gaps,
+        'known_gaps': known_gaps,
+        'missing': sum(gap['missing'] for gap in gaps),
+        'duplicates': sum(part['duplicates'] for part in checked),
+        'unordered': sum(part['unordered'] for part in checked),
+        'misaligned': sum(part['misaligned'] for part in checked),
+        'rescanned': rescanned
+    }
+
+
+def backfill_series(root, symbol, interval, fetcher=None, index=None):
+    """
+    Догружает недостающие диапазоны ряда и убирает дубликаты.
+
+    Returns:
+        dict: filled - догружено свечей, requested - запрошено диапазонов, unfillable - диапазонов
+              без свечей на бирже, deduplicated - перезаписано разделов, failed - ошибки загрузки,
+              check - результат проверки после догрузки
+    """
+    if fetcher is None:
+        from get_csv_file import CryptoDataFetcher
+        fetcher = CryptoDataFetcher()
+    index = index or IntegrityIndex(root)
+    interval = str(interval)
+    report = check_series(root, symbol, interval, index)
+    entry = index.entry(symbol, interval)
+    summary = {'filled': 0, 'requested': len(report['gaps']), 'unfillable': 0, 'deduplicated': 0, 'failed': []}
+
+    for gap in report['gaps']:
+        klines = fetcher.get_kline_range(symbol, interval, gap['start'], gap['end'])
+        if klines is None:
+            summary['failed'].append(gap)
+            continue
+        if klines.empty:
+            entry['unfillable'].append([gap['start'], gap['end']])
+            summary['unfillable'] += 1
+            continue
+
+        frame = to_dataset_frame(klines)
+        for month, month_start, month_end in month_ranges(gap['start'], gap['end']):
+            part = frame[(frame['Timestamp'] >= month_start) & (frame['Timestamp'] <= month_end)]
+            if len(part):
+                write_partition(root, symbol, interval, month, part)
+        summary['filled'] += len(frame)
+
+    # write_partition оставляет одну свечу на каждое время - перезапись раздела убирает дубликаты
+    empty = pd.DataFrame({column: np.array([], dtype=np.int64 if column == 'Timestamp' else np.float64)
+                          for column in COLUMNS})
+    for month, checked in list(entry['partitions'].items()):
+        if checked['duplicates'] or checked['unordered']:
+            write_partition(root, symbol, interval, month, empty)
+            summary['deduplicated'] += 1
+
+    summary['check'] = check_series(root, symbol, interval, index)
+    return summary
+
+
+def main():
+    """Проверка и догрузка из командной строки"""
+    args = sys.argv[1:]
+    options = {'--intervals': '5', '--root': DEFAULT_ROOT}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+
+    if len(args) < 2 or args[0] not in ('check', 'backfill'):
+        print("Usage: python candle_integrity.py check|backfill <symbol> [...] [--intervals 5,60] [--root dataset]")
+        sys.exit(1)
+
+    try:
+        _require_pyarrow()
+    except ImportError as e:
+        sys.stderr.write(f"{e}\n")
+        sys.exit(1)
+
+    from get_csv_file import CryptoDataFetcher
+    fetcher = CryptoDataFetcher()
+    index = IntegrityIndex(options['--root'])
+    results = []
+    for symbol in args[1:]:
+        symbol = fetcher._format_symbol(symbol)
+        for interval in options['--intervals'].split(','):
+            if args[0] == 'check':
+                results.append(check_series(options['--root'], symbol, interval, index))
+            else:
+                results.append({'symbol': symbol, 'interval': interval,
+                                **backfill_series(options['--root'], symbol, interval, fetcher, index)})
+
+    print(json.dumps(results, indent=2))
+    if any(result.get('failed') for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
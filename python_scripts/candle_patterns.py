@@ -0,0 +1,148 @@
+"""
+Распознавание свечных паттернов сразу по всей истории.
+
+Каждый паттерн - булев массив по свечам, вычисляемый сравнением массивов NumPy
+(текущая свеча и сдвинутые предыдущие), без циклов по свечам.
+"Длинное" тело свечи определяется относительно среднего тела за BODY_AVERAGE_WINDOW свечей,
+тренд перед разворотными паттернами - по закрытию TREND_LOOKBACK свечей назад.
+Крипторынок торгуется круглосуточно и свеча обычно открывается по закрытию предыдущей,
+поэтому паттерны с гэпом (просвет, звезды) допускают открытие на уровне закрытия.
+"""
+import numpy as np
+import pandas as pd
+
+BODY_AVERAGE_WINDOW = 10
+TREND_LOOKBACK = 3
+
+DOJI_BODY_RATIO = 0.1
+SMALL_BODY_RATIO = 0.3
+SHADOW_BODY_RATIO = 2.0
+
+# Направление сигнала паттерна
+PATTERN_DIRECTIONS = {
+    'doji': 'NEUTRAL',
+    'hammer': 'BULLISH',
+    'inverted_hammer': 'BULLISH',
+    'hanging_man': 'BEARISH',
+    'shooting_star': 'BEARISH',
+    'bullish_engulfing': 'BULLISH',
+    'bearish_engulfing': 'BEARISH',
+    'bullish_harami': 'BULLISH',
+    'bearish_harami': 'BEARISH',
+    'piercing_line': 'BULLISH',
+    'dark_cloud_cover': 'BEARISH',
+    'morning_star': 'BULLISH',
+    'evening_star': 'BEARISH',
+    'three_white_soldiers': 'BULLISH',
+    'three_black_crows': 'BEARISH',
+    'inside_bar': 'NEUTRAL'
+}
+
+
+def _shift(values, periods):
+    """Значения periods свечей назад (в начале ряда - NaN)"""
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def detect_patterns(open_, high, low, close):
+    """
+    Все паттерны для каждой свечи.
+
+    Returns:
+        dict: имя паттерна -> булев массив длины ряда
+    """
+    open_, high, low, close = (np.asarray(values, dtype=np.float64) for values in (open_, high, low, close))
+
+    body = np.abs(close - open_)
+    candle_range = high - low
+    upper_shadow = high - np.maximum(open_, close)
+    lower_shadow = np.minimum(open_, close) - low
+    bullish = close > open_
+    bearish = close < open_
+    average_body = pd.Series(body).rolling(BODY_AVERAGE_WINDOW, min_periods=1).mean().shift(1).to_numpy()
+    long_body = body > average_body
+    small_body = body < average_body * SMALL_BODY_RATIO
+
+    with np.errstate(invalid='ignore'):
+        prior_close = _shift(close, 1)
+        downtrend = prior_close < _shift(close, TREND_LOOKBACK + 1)
+        uptrend = prior_close > _shift(close, TREND_LOOKBACK + 1)
+
+        # Молот и перевернутый молот: маленькое тело у края диапазона и длинная тень
+        hammer_shape = ((lower_shadow >= SHADOW_BODY_RATIO * body) & (upper_shadow <= body) &
+                        (candle_range > 0) & (body > 0))
+        inverted_shape = ((upper_shadow >= SHADOW_BODY_RATIO * body) & (lower_shadow <= body) &
+                          (candle_range > 0) & (body > 0))
+
+        prev_open, prev_close = _shift(open_, 1), prior_close
+        prev_high, prev_low = _shift(high, 1), _shift(low, 1)
+        prev_bullish, prev_bearish = prev_close > prev_open, prev_close < prev_open
+        prev_body_top = np.maximum(prev_open, prev_close)
+        prev_body_bottom = np.minimum(prev_open, prev_close)
+        prev_body = np.abs(prev_close - prev_open)
+        prev_midpoint = (prev_open + prev_close) / 2
+        prev_long_body = _shift(long_body.astype(np.float64), 1) == 1
+
+        open_2, close_2 = _shift(open_, 2), _shift(close, 2)
+        long_body_2 = _shift(long_body.astype(np.float64), 2) == 1
+        small_body_1 = _shift(small_body.astype(np.float64), 1) == 1
+        midpoint_2 = (open_2 + close_2) / 2
+
+        patterns = {
+            'doji': (body <= DOJI_BODY_RATIO * candle_range) & (candle_range > 0),
+            'hammer': hammer_shape & downtrend,
+            'hanging_man': hammer_shape & uptrend,
+            'inverted_hammer': inverted_shape & downtrend,
+            'shooting_star': inverted_shape & uptrend,
+            'bullish_engulfing': (prev_bearish & bullish & (open_ <= prev_close) & (close >= prev_open) &
+                                  (body > prev_body)),
+            'bearish_engulfing': (prev_bullish & bearish & (open_ >= prev_close) & (close <= prev_open) &
+                                  (body > prev_body)),
+            'bullish_harami': (prev_bearish & prev_long_body & bullish &
+                               (open_ >= prev_body_bottom) & (close <= prev_body_top) & (body < prev_body)),
+            'bearish_harami': (prev_bullish & prev_long_body & bearish &
+                               (open_ <= prev_body_top) & (close >= prev_body_bottom) & (body < prev_body)),
+            'piercing_line': (prev_bearish & prev_long_body & bullish & (open_ <= prev_close) &
+                              (close > prev_midpoint) & (close < prev_open)),
+            'dark_cloud_cover': (prev_bullish & prev_long_body & bearish & (open_ >= prev_close) &
+                                 (close < prev_midpoint) & (close > prev_open)),
+            'morning_star': ((close_2 < open_2) & long_body_2 & small_body_1 &
+                             (np.maximum(prev_open, prev_close) <= close_2) & bullish & (close > midpoint_2)),
+            'evening_star': ((close_2 > open_2) & long_body_2 & small_body_1 &
+                             (np.minimum(prev_open, prev_close) >= close_2) & bearish & (close < midpoint_2)),
+            'three_white_soldiers': (bullish & prev_bullish & (close_2 > open_2) &
+                                     (close > prev_close) & (prev_close > close_2) &
+                                     (open_ > prev_open) & (open_ <= prev_close) &
+                                     (prev_open > open_2) & (prev_open <= close_2)),
+            'three_black_crows': (bearish & prev_bearish & (close_2 < open_2) &
+                                  (close < prev_close) & (prev_close < close_2) &
+                                  (open_ < prev_open) & (open_ >= prev_close) &
+                                  (prev_open < open_2) & (prev_open >= close_2)),
+            'inside_bar': (high <= prev_high) & (low >= prev_low)
+        }
+
+    return patterns
+
+
+def pattern_score(patterns):
+    """Разность числа бычьих и медвежьих паттернов на каждой свече"""
+    score = np.zeros(len(next(iter(patterns.values()))), dtype=np.int8)
+    for name, values in patterns.items():
+        if PATTERN_DIRECTIONS[name] == 'BULLISH':
+            score += values
+        elif PATTERN_DIRECTIONS[name] == 'BEARISH':
+            score -= values
+    return score
+
+
+def latest_patterns(data, prefix='pattern_'):
+    """Паттерны последней свечи по колонкам pattern_* таблицы"""
+    if len(data) == 0:
+        return []
+    current = data.iloc[-1]
+    return [{'pattern': name, 'direction': direction}
+            for name, direction in PATTERN_DIRECTIONS.items()
+            if f'{prefix}{name}' in data.columns and bool(current[f'{prefix}{name}'])]
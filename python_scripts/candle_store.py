@@ -0,0 +1,302 @@
+"""
+Хранилище свечей в разделяемой памяти для параллельных процессов анализатора.
+
+Один процесс-писатель загружает свечи с биржи и публикует их в сегментах
+multiprocessing.shared_memory. Небольшой индекс (тоже в разделяемой памяти)
+хранит для каждой пары символ/интервал имя сегмента, число свечей, версию и время обновления.
+Процессы анализатора подключаются к сегментам только для чтения и работают
+с массивами без копирования, поэтому память и запросы к бирже не растут с числом процессов.
+
+Запуск писателя:
+    python3 candle_store.py serve BTC:5 ETH:60 SOL:D [--period 5]
+"""
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from kline_parser import KLINE_COLUMNS, kline_frame
+from timestamps import now_ms
+
+INDEX_NAME = 'cp_candle_index'
+INDEX_CAPACITY = 256
+
+INDEX_DTYPE = np.dtype([
+    ('symbol', 'S16'),
+    ('interval', 'S4'),
+    ('segment', 'S24'),
+    ('length', '<i8'),
+    ('version', '<i8'),
+    ('updated_ms', '<i8')
+])
+
+
+def _attach_segment(name):
+    """
+    Подключается к существующему сегменту, не передавая его resource_tracker:
+    иначе сегмент писателя удалялся бы при выходе процесса-читателя.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: параметра track нет, снимаем регистрацию вручную
+        segment = shared_memory.SharedMemory(name=name)
+        try:
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        except Exception:
+            pass
+        return segment
+
+
+def _close_segment(segment):
+    """Закрывает сегмент, если на него не осталось ссылок из массивов"""
+    try:
+        segment.close()
+    except BufferError:
+        pass
+
+
+class CandleStoreWriter:
+    """Публикация свечей в разделяемую память (один писатель на индекс)"""
+
+    def __init__(self, name=INDEX_NAME, capacity=INDEX_CAPACITY):
+        self.name = name
+        try:
+            self._index_segment = shared_memory.SharedMemory(
+                name=name, create=True, size=INDEX_DTYPE.itemsize * capacity)
+            self.index = np.ndarray((capacity,), dtype=INDEX_DTYPE, buffer=self._index_segment.buf)
+            self.index[:] = np.zeros(capacity, dtype=INDEX_DTYPE)
+        except FileExistsError:
+            # Индекс остался от предыдущего запуска писателя - продолжаем его версии
+            self._index_segment = shared_memory.SharedMemory(name=name)
+            self.index = np.ndarray((self._index_segment.size // INDEX_DTYPE.itemsize,),
+                                    dtype=INDEX_DTYPE, buffer=self._index_segment.buf)
+
+        # Текущий и предыдущий сегмент каждого слота: предыдущий живет одно обновление,
+        # чтобы читатели успели подключиться к нему после чтения индекса
+        self._segments = {}
+
+    def _find_slot(self, symbol, interval):
+        """Слот пары символ/интервал в индексе (новый слот при первой публикации)"""
+        matches = np.flatnonzero((self.index['symbol'] == symbol) & (self.index['interval'] == interval))
+        if len(matches):
+            return int(matches[0])
+
+        free = np.flatnonzero(self.index['symbol'] == b'')
+        if not len(free):
+            raise RuntimeError("Candle store index is full")
+        return int(free[0])
+
+    def publish(self, symbol, interval, candles):
+        """
+        Публикует свечи пары символ/интервал.
+
+        Args:
+            candles: DataFrame из get_kline_data или массив (n, 7) в порядке KLINE_COLUMNS
+                     (в том числе представление из get_kline_array - копируется прямо в сегмент)
+        """
+        if isinstance(candles, pd.DataFrame):
+            candles = candles[KLINE_COLUMNS].to_numpy(dtype=np.float64)
+        candles = np.asarray(candles, dtype=np.float64)
+
+        symbol = symbol.upper().encode()
+        interval = str(interval).encode()
+        slot = self._find_slot(symbol, interval)
+        entry = self.index[slot]
+        version = int(entry['version']) + 2
+
+        segment_name = f"{self.name[:8]}{slot}_{version}"
+        segment = shared_memory.SharedMemory(name=segment_name, create=True, size=max(candles.nbytes, 1))
+        np.ndarray(candles.shape, dtype=np.float64, buffer=segment.buf)[:] = candles
+
+        # Версия нечетная на время изменения записи индекса (seqlock)
+        self.index['version'][slot] = version - 1
+        self.index['symbol'][slot] = symbol
+        self.index['interval'][slot] = interval
+        self.index['segment'][slot] = segment_name.encode()
+        self.index['length'][slot] = len(candles)
+        self.index['updated_ms'][slot] = now_ms()
+        self.index['version'][slot] = version
+
+        current, previous = self._segments.get(slot, (None, None))
+        if previous is not None:
+            previous.close()
+            previous.unlink()
+        self._segments[slot] = (segment, current)
+        return version
+
+    def close(self, unlink=True):
+        """Закрывает сегменты писателя; unlink=True удаляет их из системы"""
+        for segments in self._segments.values():
+            for segment in segments:
+                if segment is None:
+                    continue
+                segment.close()
+                if unlink:
+                    segment.unlink()
+        self._segments = {}
+
+        del self.index
+        self._index_segment.close()
+        if unlink:
+            self._index_segment.unlink()
+
+
+class CandleStoreReader:
+    """Чтение свечей из разделяемой памяти без копирования"""
+
+    def __init__(self, name=INDEX_NAME):
+        self._index_segment = _attach_segment(name)
+        self.index = np.ndarray((self._index_segment.size // INDEX_DTYPE.itemsize,),
+                                dtype=INDEX_DTYPE, buffer=self._index_segment.buf)
+        self.index.flags.writeable = False
+        # (слот) -> (версия, сегмент, массив)
+        self._attached = {}
+
+    @classmethod
+    def connect(cls, name=INDEX_NAME):
+        """Подключается к хранилищу, если писатель запущен; иначе возвращает None"""
+        try:
+            return cls(name)
+        except (FileNotFoundError, OSError):
+            return None
+
+    def has_symbol(self, symbol):
+        """Опубликован ли символ хотя бы на одном интервале"""
+        return bool(np.any(self.index['symbol'] == symbol.upper().encode()))
+
+    def lookup(self, symbol, interval):
+        """Согласованная копия записи индекса или None"""
+        symbol = symbol.upper().encode()
+        interval = str(interval).encode()
+
+        for _ in range(100):
+            matches = np.flatnonzero((self.index['symbol'] == symbol) & (self.index['interval'] == interval))
+            if not len(matches):
+                return None
+
+            slot = int(matches[0])
+            version = int(self.index['version'][slot])
+            if version % 2:
+                continue
+            entry = self.index[slot].copy()
+            if int(self.index['version'][slot]) == version:
+                return {
+                    'slot': slot,
+                    'segment': entry['segment'].decode(),
+                    'length': int(entry['length']),
+                    'version': version,
+                    'updated_ms': int(entry['updated_ms'])
+                }
+        return None
+
+    def get_array(self, symbol, interval):
+        """
+        Свечи пары символ/интервал как массив (n, 7) только для чтения, без копирования.
+        Возвращает None, если пара не опубликована.
+        """
+        for _ in range(3):
+            entry = self.lookup(symbol, interval)
+            if entry is None:
+                return None
+
+            attached = self._attached.get(entry['slot'])
+            if attached is not None and attached[0] == entry['version']:
+                return attached[2]
+
+            try:
+                segment = _attach_segment(entry['segment'])
+            except FileNotFoundError:
+                # Писатель успел заменить сегмент - перечитываем индекс
+                continue
+
+            array = np.ndarray((entry['length'], len(KLINE_COLUMNS)), dtype=np.float64, buffer=segment.buf)
+            array.flags.writeable = False
+
+            if attached is not None:
+                _close_segment(attached[1])
+            self._attached[entry['slot']] = (entry['version'], segment, array)
+            return array
+        return None
+
+    def get_frame(self, symbol, interval, copy=False):
+        """Свечи в виде DataFrame с колонками KLINE_COLUMNS (по умолчанию без копирования)"""
+        array = self.get_array(symbol, interval)
+        if array is None:
+            return None
+        return pd.DataFrame(array, columns=KLINE_COLUMNS, copy=copy)
+
+    def get_recent_klines(self, symbol, interval, limit, max_age_ms=60_000):
+        """
+        Последние limit свечей в формате get_kline_data, если данные в хранилище свежие.
+        Возвращает None, если свечей не хватает или они устарели (max_age_ms=None - любой давности).
+        """
+        entry = self.lookup(symbol, interval)
+        if entry is None or entry['length'] < limit:
+            return None
+        if max_age_ms is not None and now_ms() - entry['updated_ms'] > max_age_ms:
+            return None
+
+        array = self.get_array(symbol, interval)
+        if array is None or len(array) < limit:
+            return None
+
+        # Копия: массив - представление разделяемой памяти только для чтения, а вызывающий код
+        # (analyze_script._merge_current_price) изменяет последнюю свечу. pandas < 3 не копирует ndarray
+        return kline_frame(array[-limit:].copy())
+
+    def close(self):
+        """Отключается от сегментов"""
+        for _, segment, _ in self._attached.values():
+            _close_segment(segment)
+        self._attached = {}
+        del self.index
+        _close_segment(self._index_segment)
+
+
+def serve(pairs, period=5.0, limit=1000):
+    """
+    Периодически загружает свечи пар (символ, интервал) и публикует их в хранилище.
+    """
+    from get_csv_file import CryptoDataFetcher
+
+    fetcher = CryptoDataFetcher()
+    writer = CandleStoreWriter()
+    print(f"📦 Хранилище свечей запущено: {', '.join(f'{s}:{i}' for s, i in pairs)}")
+
+    try:
+        while True:
+            for symbol, interval in pairs:
+                symbol = fetcher._format_symbol(symbol)
+                klines = fetcher.get_kline_array(symbol, interval, limit)
+                if klines is not None and len(klines):
+                    writer.publish(symbol, interval, klines)
+            time.sleep(period)
+    except KeyboardInterrupt:
+        print("👋 Хранилище свечей остановлено")
+    finally:
+        writer.close()
+
+
+def main():
+    """Точка входа для запуска писателя"""
+    if len(sys.argv) < 3 or sys.argv[1] != 'serve':
+        print("Usage: python candle_store.py serve <SYMBOL:INTERVAL> [...] [--period seconds]")
+        print("Example: python candle_store.py serve BTC:5 ETH:60 --period 5")
+        sys.exit(1)
+
+    args = sys.argv[2:]
+    period = 5.0
+    if '--period' in args:
+        position = args.index('--period')
+        period = float(args[position + 1])
+        del args[position:position + 2]
+
+    pairs = [tuple(arg.split(':', 1)) for arg in args]
+    serve(pairs, period)
+
+
+if __name__ == "__main__":
+    main()
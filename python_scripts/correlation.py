@@ -0,0 +1,205 @@
+"""
+Скользящая корреляция доходностей нескольких символов.
+
+На закрытии каждой свечи вектор логарифмических доходностей всех символов добавляется в окно,
+а самый старый вектор удаляется. Среднее и матрица совместных отклонений обновляются
+онлайн (формулы Уэлфорда для добавления и удаления), поэтому обновление стоит O(k^2)
+для k символов и не зависит от длины окна. Для защиты от накопления ошибок округления
+матрица периодически пересчитывается по окну целиком.
+
+Запуск:
+    python3 correlation.py BTC ETH SOL [--interval 5] [--window 100]
+"""
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_WINDOW = 100
+
+
+class RollingCorrelation:
+    """Скользящие ковариация и корреляция доходностей символов"""
+
+    def __init__(self, symbols, window=DEFAULT_WINDOW):
+        self.symbols = list(symbols)
+        self.window = window
+        size = len(self.symbols)
+
+        self._returns = np.zeros((window, size))
+        self._position = 0
+        self.count = 0
+        self.mean = np.zeros(size)
+        self._comoment = np.zeros((size, size))
+        self._updates = 0
+
+        self.last_closes = np.full(size, np.nan)
+        self.last_timestamp = None
+
+    def _add(self, values):
+        """Добавление вектора доходностей в статистику"""
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self._comoment += np.outer(delta, values - self.mean)
+
+    def _remove(self, values):
+        """Удаление вектора доходностей из статистики"""
+        self.count -= 1
+        if self.count == 0:
+            self.mean[:] = 0
+            self._comoment[:] = 0
+            return
+        delta = values - self.mean
+        self.mean -= delta / self.count
+        self._comoment -= np.outer(delta, values - self.mean)
+
+    def _recompute(self):
+        """Точный пересчет по окну"""
+        window = self.window_returns()
+        self.mean = window.mean(axis=0)
+        centered = window - self.mean
+        self._comoment = centered.T @ centered
+
+    def add_returns(self, values):
+        """Добавляет вектор доходностей (в порядке self.symbols)"""
+        values = np.asarray(values, dtype=np.float64)
+        if self.count == self.window:
+            self._remove(self._returns[self._position])
+
+        self._returns[self._position] = values
+        self._position = (self._position + 1) % self.window
+        self._add(values)
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            self._recompute()
+
+    def update(self, closes, timestamp=None):
+        """
+        Обрабатывает закрытие свечи.
+
+        Args:
+            closes: dict символ -> цена закрытия; отсутствующий символ считается без изменения цены
+            timestamp: время свечи; повтор того же времени игнорируется
+        """
+        if timestamp is not None and self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return False
+
+        current = np.array([closes.get(symbol, np.nan) for symbol in self.symbols], dtype=np.float64)
+        current = np.where(np.isnan(current), self.last_closes, current)
+        ready = not np.isnan(self.last_closes).any() and not np.isnan(current).any()
+
+        if ready:
+            self.add_returns(np.log(current / self.last_closes))
+
+        self.last_closes = current
+        self.last_timestamp = timestamp
+        return ready
+
+    def window_returns(self):
+        """Доходности в окне, от старых к новым"""
+        if self.count < self.window:
+            return self._returns[:self.count].copy()
+        return np.roll(self._returns, -self._position, axis=0)
+
+    def covariance(self):
+        """Выборочная ковариационная матрица доходностей"""
+        if self.count < 2:
+            return np.full_like(self._comoment, np.nan)
+        return self._comoment / (self.count - 1)
+
+    def correlation(self):
+        """Корреляционная матрица доходностей"""
+        covariance = self.covariance()
+        deviation = np.sqrt(np.diag(covariance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = covariance / np.outer(deviation, deviation)
+        np.fill_diagonal(matrix, 1.0)
+        return np.clip(matrix, -1.0, 1.0)
+
+    def top_pairs(self, count=5):
+        """Пары символов с наибольшей по модулю корреляцией"""
+        matrix = self.correlation()
+        rows, cols = np.triu_indices(len(self.symbols), k=1)
+        values = matrix[rows, cols]
+        order = np.argsort(-np.abs(np.nan_to_num(values)), kind='stable')[:count]
+        return [{'pair': [self.symbols[rows[i]], self.symbols[cols[i]]],
+                 'correlation': round(float(values[i]), 4)} for i in order if not np.isnan(values[i])]
+
+    def correlated_symbols(self, symbol, threshold=0.8):
+        """Символы, корреляция которых с symbol не ниже threshold"""
+        matrix = self.correlation()
+        row = matrix[self.symbols.index(symbol)]
+        return [other for other, value in zip(self.symbols, row)
+                if other != symbol and value >= threshold]
+
+    def to_dict(self, count=5):
+        """Текущая матрица и топ пар для JSON"""
+        matrix = self.correlation()
+        return {
+            'symbols': self.symbols,
+            'window': self.window,
+            'samples': self.count,
+            'matrix': [[None if np.isnan(value) else round(float(value), 4) for value in row] for row in matrix],
+            'top_pairs': self.top_pairs(count)
+        }
+
+    @classmethod
+    def from_history(cls, frames, window=DEFAULT_WINDOW):
+        """
+        Заполняет окно по истории свечей.
+
+        Args:
+            frames: dict символ -> DataFrame с колонками timestamp и close (как get_kline_data)
+        """
+        tracker = cls(frames.keys(), window)
+        common = None
+        for frame in frames.values():
+            timestamps = frame['timestamp'].to_numpy(dtype=np.int64)
+            common = timestamps if common is None else np.intersect1d(common, timestamps)
+
+        closes = np.column_stack([
+            frame.set_index('timestamp')['close'].reindex(common).to_numpy(dtype=np.float64)
+            for frame in frames.values()
+        ])
+        for timestamp, row in zip(common[-(window + 1):], closes[-(window + 1):]):
+            tracker.update(dict(zip(tracker.symbols, row)), int(timestamp))
+        return tracker
+
+
+def main():
+    """Корреляция символов по истории свечей"""
+    args = sys.argv[1:]
+    options = {'--interval': '5', '--window': str(DEFAULT_WINDOW)}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+
+    if len(args) < 2:
+        print("Usage: python correlation.py <symbol> <symbol> [...] [--interval 5] [--window 100]")
+        sys.exit(1)
+
+    from get_csv_file import CryptoDataFetcher
+
+    fetcher = CryptoDataFetcher(pool_size=len(args))
+    window = int(options['--window'])
+    symbols = [fetcher._format_symbol(symbol) for symbol in args]
+
+    with ThreadPoolExecutor(max_workers=len(symbols)) as executor:
+        klines = list(executor.map(
+            lambda symbol: fetcher.get_kline_data(symbol, options['--interval'], min(window + 1, 1000)), symbols))
+
+    frames = {symbol: frame for symbol, frame in zip(symbols, klines) if frame is not None and not frame.empty}
+    if len(frames) < 2:
+        print(json.dumps({"error": "Not enough data for correlation"}, indent=2))
+        sys.exit(1)
+
+    print(json.dumps(RollingCorrelation.from_history(frames, window).to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Бинарный кеш разобранного CSV рядом с файлом.
+
+Разбор текста большого CSV повторяется при каждом запуске анализатора. После первого
+разбора колонки сохраняются в <файл>.cache/<имя>/ по одному .npy на колонку,
+при следующих загрузках они открываются через memory map (np.load(mmap_mode='r')),
+поэтому таблица доступна сразу, а в память читаются только нужные страницы.
+
+Кеш действителен, пока совпадает ключ CSV: размер, время изменения и хеш содержимого.
+Хеш считается по выборке блоков (начало, конец и равномерно по файлу), чтобы проверка
+не читала весь многогигабайтный файл. В кеш попадают числовые и булевы колонки.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+CACHE_SUFFIX = '.cache'
+META_FILE = 'meta.json'
+CACHE_VERSION = 1
+
+HASH_BLOCK = 1 << 20
+HASH_SAMPLES = 8
+
+
+def fingerprint(path):
+    """Ключ файла: размер, время изменения (нс) и хеш выборки блоков"""
+    stat = os.stat(path)
+    digest = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        offsets = np.linspace(0, max(stat.st_size - HASH_BLOCK, 0), HASH_SAMPLES + 2).astype(np.int64)
+        for offset in np.unique(offsets):
+            f.seek(int(offset))
+            digest.update(f.read(HASH_BLOCK))
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest.hexdigest()}
+
+
+def cache_dir(csv_path, name):
+    """Каталог кеша name для CSV"""
+    return os.path.join(csv_path + CACHE_SUFFIX, name)
+
+
+def load_cached_frame(csv_path, name, key=None, **params):
+    """
+    Таблица из кеша (колонки открыты через memory map) или None, если кеша нет или он устарел.
+
+    Args:
+        key: fingerprint(csv_path), если уже посчитан
+        params: дополнительные параметры, с которыми кеш должен совпадать (например, compact)
+    """
+    directory = cache_dir(csv_path, name)
+    meta_path = os.path.join(directory, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if (meta.get('version') != CACHE_VERSION or meta.get('params') != params or
+                meta.get('key') != (key or fingerprint(csv_path))):
+            return None
+
+        columns = {column: np.load(os.path.join(directory, f"{position}.npy"), mmap_mode='r')
+                   for position, column in enumerate(meta['columns'])}
+        return pd.DataFrame(columns, copy=False)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_cached_frame(csv_path, name, frame, key=None, **params):
+    """
+    Сохраняет числовые колонки таблицы в кеш. Метаданные пишутся последними,
+    поэтому прерванная запись не дает действительного кеша. Возвращает True при успехе.
+    """
+    directory = cache_dir(csv_path, name)
+    try:
+        key = key or fingerprint(csv_path)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+        columns = [column for column in frame.columns if frame[column].dtype.kind in 'biuf']
+        for position, column in enumerate(columns):
+            np.save(os.path.join(directory, f"{position}.npy"), frame[column].to_numpy())
+
+        meta = {'version': CACHE_VERSION, 'key': key, 'params': params, 'columns': columns,
+                'rows': len(frame)}
+        temporary = os.path.join(directory, META_FILE + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(temporary, os.path.join(directory, META_FILE))
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,182 @@
+"""
+Потоковый экспорт свечей в сжатый CSV с дозаписью.
+
+Для каждой пары символ/таймфрейм ведется один растущий файл <SYMBOL>_<interval>.csv.gz
+(или .csv.zst). Новые свечи дописываются в конец отдельным сжатым блоком (член gzip,
+кадр zstd): склейка таких блоков - корректный сжатый файл, поэтому старые строки
+не перечитываются и не перепаковываются. Строки сжимаются порциями по chunk_size,
+текст всего экспорта в памяти не собирается.
+
+Рядом с файлом лежит индекс <файл>.idx (JSON): колонки, время последней свечи, число строк
+и размер файла после последней удачной дозаписи. По индексу дописываются только свечи
+новее последней. Если дозапись прервалась, файл обрезается до размера из индекса;
+если индекса нет, он восстанавливается потоковым чтением файла.
+
+Для zstd нужен пакет zstandard (pip install zstandard).
+"""
+import gzip
+import io
+import json
+import os
+
+import pandas as pd
+
+from timestamps import format_epoch_ms, to_epoch_ms
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+EXTENSIONS = {'gzip': '.csv.gz', 'zstd': '.csv.zst'}
+INDEX_SUFFIX = '.idx'
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def export_path(directory, symbol, interval, compression='gzip'):
+    """Файл экспорта символа и таймфрейма"""
+    return os.path.join(directory, f"{symbol}_{interval}{EXTENSIONS[compression]}")
+
+
+def compression_of(path):
+    """Сжатие по расширению файла"""
+    for compression, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    raise ValueError(f"Unknown export extension: {path}")
+
+
+def _require_zstd(compression):
+    if compression == 'zstd' and not ZSTD_AVAILABLE:
+        raise ImportError("zstandard is required for zstd export: pip install zstandard")
+
+
+def _open_writer(path, compression):
+    """Текстовый поток, дописывающий новый сжатый блок в конец файла"""
+    _require_zstd(compression)
+    if compression == 'gzip':
+        return gzip.open(path, 'at', encoding='utf-8', newline='')
+    writer = zstandard.ZstdCompressor().stream_writer(open(path, 'ab'), closefd=True)
+    return io.TextIOWrapper(writer, encoding='utf-8', newline='')
+
+
+def open_export(path):
+    """Текстовый поток чтения файла экспорта (все сжатые блоки подряд)"""
+    compression = compression_of(path)
+    _require_zstd(compression)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                        closefd=True)
+    return io.TextIOWrapper(reader, encoding='utf-8', newline='')
+
+
+def read_export(path, **kwargs):
+    """Читает файл экспорта в DataFrame (аргументы передаются в pd.read_csv)"""
+    with open_export(path) as handle:
+        return pd.read_csv(handle, **kwargs)
+
+
+def load_index(path):
+    """Индекс файла экспорта или None"""
+    index_path = path + INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_index(path, index):
+    """Атомарно сохраняет индекс файла экспорта"""
+    temporary = path + INDEX_SUFFIX + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    os.replace(temporary, path + INDEX_SUFFIX)
+
+
+def rebuild_index(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Индекс по содержимому файла (потоковое чтение порциями)"""
+    index = {'columns': None, 'last_timestamp': None, 'rows': 0, 'size': os.path.getsize(path)}
+    with open_export(path) as handle:
+        for chunk in pd.read_csv(handle, chunksize=chunk_size):
+            if index['columns'] is None:
+                index['columns'] = list(chunk.columns)
+            if len(chunk):
+                index['rows'] += len(chunk)
+                index['last_timestamp'] = int(to_epoch_ms(chunk['Timestamp']).max())
+    return index
+
+
+def prepare_export(path):
+    """
+    Индекс файла перед дозаписью: обрезает недописанный хвост или восстанавливает индекс.
+    Для нового файла возвращает пустой индекс.
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return {'columns': None, 'last_timestamp': None, 'rows': 0, 'size': 0}
+
+    index = load_index(path)
+    size = os.path.getsize(path)
+    if index is None or size < index['size']:
+        index = rebuild_index(path)
+        save_index(path, index)
+    elif size > index['size']:
+        with open(path, 'r+b') as f:
+            f.truncate(index['size'])
+    return index
+
+
+def append_candles(path, frames, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Дописывает в файл экспорта свечи новее последней записанной.
+
+    Args:
+        path: файл .csv.gz или .csv.zst (см. export_path)
+        frames: DataFrame или итератор DataFrame с колонкой Timestamp (int64 мс)
+
+    Returns:
+        dict: appended - дописано строк, rows - всего строк, last_timestamp - время последней свечи
+    """
+    compression = compression_of(path)
+    _require_zstd(compression)
+    index = prepare_export(path)
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+
+    appended = 0
+    writer = None
+    try:
+        for frame in frames:
+            if frame is None or frame.empty:
+                continue
+            if index['last_timestamp'] is not None:
+                frame = frame[frame['Timestamp'] > index['last_timestamp']]
+            frame = frame.sort_values('Timestamp').drop_duplicates('Timestamp', keep='last')
+            if frame.empty:
+                continue
+
+            columns = index['columns'] or list(frame.columns)
+            missing = [column for column in columns if column not in frame.columns]
+            if missing:
+                raise ValueError(f"Missing export columns: {missing}")
+
+            if writer is None:
+                writer = _open_writer(path, compression)
+            for start in range(0, len(frame), chunk_size):
+                chunk = frame.iloc[start:start + chunk_size][columns].copy()
+                chunk['Timestamp'] = format_epoch_ms(chunk['Timestamp']).to_numpy()
+                chunk.to_csv(writer, header=index['rows'] == 0, index=False)
+                index['rows'] += len(chunk)
+
+            index['columns'] = columns
+            index['last_timestamp'] = int(frame['Timestamp'].iloc[-1])
+            appended += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if appended:
+        index['size'] = os.path.getsize(path)
+        save_index(path, index)
+    return {'appended': appended, 'rows': index['rows'], 'last_timestamp': index['last_timestamp']}
@@ -1,53 +1,220 @@
+"""
+Интерактивный анализ CSV-файла свечей.
+
+Загрузка файла (целиком, порциями или из бинарного кеша) и вывод на русском.
+Индикаторы, стратегии и уровни считает общий пакет analysis - тот же, что у analyze_script.py,
+этот модуль только переводит его результаты для печати.
+"""
 import pandas as pd
 import numpy as np
-import ta
-from datetime import datetime
 import warnings
 
 warnings.filterwarnings('ignore')
 
+import analysis
+from analysis import INDICATOR_GROUPS, REQUIRED_COLUMNS, SwingLevelTracker, compute_indicators, set_indicator
+from strategies import load_strategy, resolve_strategy_key
+from timestamps import TIMESTAMP_FORMAT, format_epoch_ms, to_epoch_ms
+from csv_cache import fingerprint, load_cached_frame, save_cached_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Явные типы цен и объема: без вывода типов по содержимому файла
+CSV_DTYPES = {'Open': np.float64, 'High': np.float64, 'Low': np.float64, 'Close': np.float64, 'Volume': np.float64}
+
+# Потоковая загрузка: размер порции, хвост прогрева индикаторов из предыдущей порции
+# и число последних свечей, которые остаются в памяти для стратегий
+DEFAULT_CHUNK_ROWS = 200_000
+WARMUP_ROWS = 2000
+CHUNK_KEEP_ROWS = 1000
+
+# Уровни при потоковой загрузке переносятся между порциями SwingLevelTracker
+CHUNK_INDICATOR_GROUPS = [group for group in INDICATOR_GROUPS if group != 'support_resistance']
+
+# Версия расчета индикаторов в кеше: увеличить при изменении analysis.compute_indicators
+INDICATORS_CACHE_VERSION = 2
+
+# Перевод результатов общего анализатора для вывода
+DIRECTION_LABELS = {'BULLISH': 'ВВЕРХ', 'BEARISH': 'ВНИЗ', 'NEUTRAL': 'НЕОПРЕДЕЛЕННО', 'NO_DATA': 'НЕТ ДАННЫХ'}
+CONFIDENCE_LABELS = {'HIGH': 'ВЫСОКАЯ', 'MEDIUM': 'СРЕДНЯЯ', 'LOW': 'НИЗКАЯ'}
+REGIME_LABELS = {'TREND': 'ТРЕНД', 'RANGE': 'БОКОВИК', 'HIGH_VOLATILITY': 'ВЫСОКАЯ ВОЛАТИЛЬНОСТЬ'}
+
+DETAIL_LABELS = {
+    'rsi_value': 'RSI',
+    'rsi_signal': 'Сигнал RSI',
+    'macd_signal': 'MACD',
+    'sma_signal': 'SMA 20/50',
+    'sma_20': 'SMA 20',
+    'sma_50': 'SMA 50',
+    'ema_signal': 'EMA',
+    'bb_signal': 'Bollinger Bands',
+    'bb_upper': 'Верхняя полоса',
+    'bb_lower': 'Нижняя полоса',
+    'bb_middle': 'Средняя линия',
+    'bb_width': 'Ширина полос, %',
+    'stoch_signal': 'Stochastic',
+    'stoch_k': 'Stochastic K',
+    'stoch_d': 'Stochastic D',
+    'sar_signal': 'Parabolic SAR',
+    'sar_value': 'Значение SAR',
+    'adx': 'ADX',
+    'adx_strength': 'Сила тренда',
+    'atr': 'ATR',
+    'breakout_type': 'Тип пробоя',
+    'breakout_level': 'Уровень пробоя',
+    'consolidation_range': 'Диапазон консолидации',
+    'nearest_support': 'Ближайшая поддержка',
+    'nearest_resistance': 'Ближайшее сопротивление',
+    'error': 'Ошибка'
+}
+
+SIGNAL_LABELS = {
+    'NEUTRAL': 'НЕЙТРАЛЬНЫЙ',
+    'BULLISH': 'БЫЧИЙ',
+    'BEARISH': 'МЕДВЕЖИЙ',
+    'OVERSOLD_BULLISH': 'ПЕРЕПРОДАННОСТЬ (БЫЧИЙ)',
+    'OVERBOUGHT_BEARISH': 'ПЕРЕКУПЛЕННОСТЬ (МЕДВЕЖИЙ)',
+    'CROSS_UP_BULLISH': 'ПЕРЕСЕЧЕНИЕ ВВЕРХ (БЫЧИЙ)',
+    'CROSS_DOWN_BEARISH': 'ПЕРЕСЕЧЕНИЕ ВНИЗ (МЕДВЕЖИЙ)',
+    'GOLDEN_CROSS_BULLISH': 'ЗОЛОТОЙ КРЕСТ (БЫЧИЙ)',
+    'DEATH_CROSS_BEARISH': 'МЕРТВЫЙ КРЕСТ (МЕДВЕЖИЙ)',
+    'LOWER_BAND_OVERSOLD': 'ЦЕНА У НИЖНЕЙ ПОЛОСЫ (ПЕРЕПРОДАННОСТЬ)',
+    'UPPER_BAND_OVERBOUGHT': 'ЦЕНА У ВЕРХНЕЙ ПОЛОСЫ (ПЕРЕКУПЛЕННОСТЬ)',
+    'INSIDE_BANDS': 'ЦЕНА ВНУТРИ ПОЛОС',
+    'BULLISH_TREND': 'БЫЧИЙ ТРЕНД',
+    'BEARISH_TREND': 'МЕДВЕЖИЙ ТРЕНД',
+    'WEAK': 'СЛАБЫЙ',
+    'STRONG': 'СИЛЬНЫЙ',
+    'VERY_STRONG': 'ОЧЕНЬ СИЛЬНЫЙ',
+    'RESISTANCE_BREAKOUT': 'ПРОБОЙ СОПРОТИВЛЕНИЯ',
+    'SUPPORT_BREAKOUT': 'ПРОБОЙ ПОДДЕРЖКИ',
+    'CONSOLIDATION': 'КОНСОЛИДАЦИЯ',
+    'Not enough data for analysis': 'Недостаточно данных для анализа'
+}
+
+
+def localize_result(result):
+    """Результат стратегии общего анализатора с русскими значениями для вывода"""
+    details = {}
+    for key, value in result['details'].items():
+        if value is None:
+            value = "НЕТ"
+        elif isinstance(value, str):
+            value = SIGNAL_LABELS.get(value, value)
+        details[DETAIL_LABELS.get(key, key)] = value
+    details['Текущая цена'] = round(result['current_price'], 4)
+
+    return {
+        'direction': DIRECTION_LABELS.get(result['direction'], result['direction']),
+        'confidence': CONFIDENCE_LABELS.get(result['confidence'], result['confidence']),
+        'take_profit': round(result['take_profit'], 4),
+        'stop_loss': round(result['stop_loss'], 4),
+        'details': details
+    }
+
+
+def iter_csv_chunks(csv_file_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Порции CSV с явными типами колонок: потоковый reader pyarrow,
+    без pyarrow - pd.read_csv с chunksize
+    """
+    if not PYARROW_AVAILABLE:
+        yield from pd.read_csv(csv_file_path, usecols=REQUIRED_COLUMNS, dtype=CSV_DTYPES, chunksize=chunk_rows)
+        return
+
+    reader = pa_csv.open_csv(csv_file_path, convert_options=pa_csv.ConvertOptions(
+        column_types={column: pa.float64() for column in CSV_DTYPES},
+        include_columns=REQUIRED_COLUMNS,
+        timestamp_parsers=[TIMESTAMP_FORMAT]))
+
+    batches, rows = [], 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= chunk_rows:
+            yield pa.Table.from_batches(batches).to_pandas()
+            batches, rows = [], 0
+    if batches:
+        yield pa.Table.from_batches(batches).to_pandas()
 
-class TradingStrategyAnalyzer:
-    def __init__(self, csv_file_path):
+
+class TradingStrategyAnalyzer(analysis.TradingStrategyAnalyzer):
+    def __init__(self, csv_file_path, compact=False, chunk_rows=None, use_cache=True):
         """
         Инициализация анализатора торговых стратегий
 
         Args:
             csv_file_path: путь к CSV файлу с данными
+            compact: экономный режим памяти для больших историй - осцилляторы в float32,
+                     расчет без копии всей таблицы, без промежуточных колонок
+            chunk_rows: потоковая загрузка файлов больше памяти порциями по chunk_rows свечей
+            use_cache: бинарный кеш свечей и индикаторов рядом с CSV (см. csv_cache)
         """
-        self.data = self.load_data(csv_file_path)
-        self.strategies = {
-            '1': {'name': 'RSI + MACD', 'function': self.rsi_macd_strategy},
-            '2': {'name': 'Скользящие средние', 'function': self.moving_averages_strategy},
-            '3': {'name': 'Bollinger Bands', 'function': self.bollinger_bands_strategy},
-            '4': {'name': 'Stochastic + EMA', 'function': self.stochastic_ema_strategy},
-            '5': {'name': 'Parabolic SAR + ADX', 'function': self.parabolic_sar_strategy},
-            '6': {'name': 'Пробой уровня', 'function': self.breakout_strategy}
-        }
+        self.compact = compact
+        self.chunk_rows = chunk_rows
+        self.csv_file_path = csv_file_path
+        self.use_cache = use_cache and not chunk_rows
+        self.cache_key = None
+        self.indicators_ready = False
+        if chunk_rows:
+            data = self.load_data_chunked(csv_file_path, chunk_rows)
+        else:
+            data = self.load_data(csv_file_path)
+
+        self.data = None
+        if data is not None:
+            super().__init__(data, compact)
 
     def load_data(self, csv_file_path):
         """Загрузка и подготовка данных из CSV файла"""
         try:
-            data = pd.read_csv(csv_file_path)
+            if self.use_cache:
+                self.cache_key = fingerprint(csv_file_path)
+                data = load_cached_frame(csv_file_path, 'candles', self.cache_key)
+                if data is not None:
+                    if self.compact:
+                        data['Volume'] = data['Volume'].astype(np.float32)
+                    print(f"✅ Данные загружены из кеша: {len(data)} свечей")
+                    print(f"📅 Период: {self._format_time(data['Timestamp'].iloc[0])} - "
+                          f"{self._format_time(data['Timestamp'].iloc[-1])}")
+                    return data
+
+            if PYARROW_AVAILABLE:
+                data = pd.read_csv(csv_file_path, dtype=CSV_DTYPES, engine='pyarrow')
+            else:
+                data = pd.read_csv(csv_file_path, dtype=CSV_DTYPES)
 
             # Проверяем необходимые колонки
-            required_columns = ['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume']
-            for col in required_columns:
+            for col in REQUIRED_COLUMNS:
                 if col not in data.columns:
                     raise ValueError(f"Отсутствует обязательная колонка: {col}")
 
-            # Конвертируем Timestamp если нужно
+            # Приводим Timestamp к миллисекундам epoch (строки разбираются один раз при загрузке)
             if 'Timestamp' in data.columns:
                 try:
-                    data['Timestamp'] = pd.to_datetime(data['Timestamp'])
+                    data['Timestamp'] = to_epoch_ms(data['Timestamp']).to_numpy()
                 except:
                     print("Не удалось конвертировать Timestamp, используем как есть")
 
-            # Сортируем по времени
-            data = data.sort_values('Timestamp').reset_index(drop=True)
+            # Сортируем по времени (в экономном режиме упорядоченный файл не копируется)
+            if not (self.compact and data['Timestamp'].is_monotonic_increasing):
+                data = data.sort_values('Timestamp')
+            data.reset_index(drop=True, inplace=True)
+
+            if self.use_cache:
+                save_cached_frame(csv_file_path, 'candles', data, self.cache_key)
+
+            if self.compact:
+                data['Volume'] = data['Volume'].astype(np.float32)
 
             print(f"✅ Данные успешно загружены: {len(data)} свечей")
-            print(f"📅 Период: {data['Timestamp'].iloc[0]} - {data['Timestamp'].iloc[-1]}")
+            print(f"📅 Период: {self._format_time(data['Timestamp'].iloc[0])} - "
+                  f"{self._format_time(data['Timestamp'].iloc[-1])}")
 
             return data
 
@@ -55,461 +222,116 @@ class TradingStrategyAnalyzer:
             print(f"❌ Ошибка загрузки данных: {e}")
             return None
 
-    def calculate_technical_indicators(self):
-        """Расчет всех технических индикаторов"""
-        df = self.data.copy()
-
-        # RSI
-        df['rsi'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
-
-        # MACD
-        macd = ta.trend.MACD(df['Close'])
-        df['macd'] = macd.macd()
-        df['macd_signal'] = macd.macd_signal()
-        df['macd_histogram'] = macd.macd_diff()
-
-        # Скользящие средние
-        df['sma_20'] = ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator()
-        df['sma_50'] = ta.trend.SMAIndicator(df['Close'], window=50).sma_indicator()
-        df['ema_12'] = ta.trend.EMAIndicator(df['Close'], window=12).ema_indicator()
-        df['ema_26'] = ta.trend.EMAIndicator(df['Close'], window=26).ema_indicator()
-
-        # Bollinger Bands
-        bollinger = ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2)
-        df['bb_upper'] = bollinger.bollinger_hband()
-        df['bb_Lower'] = bollinger.bollinger_lband()
-        df['bb_middle'] = bollinger.bollinger_mavg()
-
-        # Stochastic
-        stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'], window=14, smooth_window=3)
-        df['stoch_k'] = stoch.stoch()
-        df['stoch_d'] = stoch.stoch_signal()
-
-        # Parabolic SAR
-        df['parabolic_sar'] = ta.trend.PSARIndicator(df['High'], df['Low'], df['Close']).psar()
-
-        # ADX
-        df['adx'] = ta.trend.ADXIndicator(df['High'], df['Low'], df['Close'], window=14).adx()
-
-        # ATR для расчета стоп-лосса
-        df['atr'] = ta.volatility.AverageTrueRange(df['High'], df['Low'], df['Close'], window=14).average_true_range()
-
-        # Уровни поддержки и сопротивления для пробоев
-        df = self.calculate_support_resistance(df)
-
-        self.data = df
-
-    def calculate_support_resistance(self, df, window=20):
+    def load_data_chunked(self, csv_file_path, chunk_rows=DEFAULT_CHUNK_ROWS):
         """
-        Расчет уровней поддержки и сопротивления
-        на основе локальных минимумов и максимумов
-        """
-        # Локальные максимумы (сопротивление)
-        df['resistance'] = df['High'].rolling(window=window, center=True).max()
-
-        # Локальные минимумы (поддержка)
-        df['support'] = df['Low'].rolling(window=window, center=True).min()
-
-        # Определение ближайших значимых уровней
-        current_High = df['High'].iloc[-1]
-        current_Low = df['Low'].iloc[-1]
+        Потоковая загрузка файла, который не помещается в память (файл должен быть упорядочен по времени).
 
-        # Ближайшие уровни сопротивления (выше текущей цены)
-        resistance_levels = df['resistance'].unique()
-        resistance_levels = sorted([r for r in resistance_levels if r > current_High and not np.isnan(r)])
-
-        # Ближайшие уровни поддержки (ниже текущей цены)
-        support_levels = df['support'].unique()
-        support_levels = sorted([s for s in support_levels if s < current_Low and not np.isnan(s)], reverse=True)
+        Индикаторы считаются по каждой порции вместе с хвостом прогрева из WARMUP_ROWS предыдущих свечей:
+        скользящие окна получают полную историю, экспоненциальные индикаторы (RSI, MACD, EMA, ADX, ATR)
+        и Parabolic SAR за время прогрева сходятся к значениям полного расчета,
+        а подтвержденные свинги уровней переносятся между порциями SwingLevelTracker.
+        В памяти остаются последние CHUNK_KEEP_ROWS свечей с индикаторами.
+        """
+        try:
+            tracker = SwingLevelTracker()
+            tail = kept = None
+            offset = total = 0
+            first_timestamp = last_timestamp = None
+
+            for chunk in iter_csv_chunks(csv_file_path, chunk_rows):
+                chunk['Timestamp'] = to_epoch_ms(chunk['Timestamp']).to_numpy()
+                timestamps = chunk['Timestamp'].to_numpy()
+                if (not chunk['Timestamp'].is_monotonic_increasing or
+                        (last_timestamp is not None and len(timestamps) and timestamps[0] < last_timestamp)):
+                    raise ValueError("файл не упорядочен по времени, используйте обычную загрузку")
+                if not len(chunk):
+                    continue
+                if first_timestamp is None:
+                    first_timestamp = timestamps[0]
+                last_timestamp = timestamps[-1]
+                total += len(chunk)
+
+                if self.compact:
+                    chunk['Volume'] = chunk['Volume'].astype(np.float32)
+
+                warm_up = 0 if tail is None else len(tail)
+                frame = chunk if tail is None else pd.concat([tail, chunk], ignore_index=True)
+                tail = frame[REQUIRED_COLUMNS].iloc[-WARMUP_ROWS:].reset_index(drop=True)
+
+                compute_indicators(frame, CHUNK_INDICATOR_GROUPS, self.compact)
+                resistance, support = tracker.update(frame['High'], frame['Low'], frame['Close'], offset, warm_up)
+                rows = frame.iloc[warm_up:].copy()
+                set_indicator(rows, 'nearest_resistance', resistance, self.compact)
+                set_indicator(rows, 'nearest_support', support, self.compact)
+
+                kept = rows if kept is None else pd.concat([kept, rows])
+                kept = kept.iloc[-CHUNK_KEEP_ROWS:]
+                offset += len(frame) - len(tail)
+
+            if kept is None:
+                raise ValueError("файл не содержит свечей")
+
+            print(f"✅ Данные успешно загружены порциями: {total} свечей "
+                  f"(в памяти последние {len(kept)} с индикаторами)")
+            print(f"📅 Период: {self._format_time(first_timestamp)} - {self._format_time(last_timestamp)}")
+
+            return kept.reset_index(drop=True)
 
-        # Сохраняем ближайшие уровни
-        df['nearest_resistance'] = resistance_levels[0] if resistance_levels else np.nan
-        df['nearest_support'] = support_levels[0] if support_levels else np.nan
+        except Exception as e:
+            print(f"❌ Ошибка загрузки данных: {e}")
+            return None
 
-        return df
+    @staticmethod
+    def _format_time(value):
+        """Время свечи для вывода на экран"""
+        if isinstance(value, (int, np.integer)):
+            return format_epoch_ms(value)
+        return value
 
-    def detect_breakout(self, df, lookback_period=10):
+    def calculate_technical_indicators(self, indicators=None):
         """
-        Обнаружение пробоев уровней поддержки/сопротивления
+        Расчет всех технических индикаторов один раз за запуск
+        (стратегии запрашивают группы, но меню переключается между ними)
         """
-        current = df.iloc[-1]
-        current_Close = current['Close']
-        current_High = current['High']
-        current_Low = current['Low']
-
-        # Анализируем последние N свечей для определения консолидации
-        recent_data = df.tail(lookback_period)
-
-        # Определяем диапазон консолидации
-        consolidation_High = recent_data['High'].max()
-        consolidation_Low = recent_data['Low'].min()
-        consolidation_range = consolidation_High - consolidation_Low
-
-        # Проверяем пробой сопротивления
-        resistance_break = False
-        if not np.isnan(current['nearest_resistance']):
-            # Пробой считается если цена закрылась выше сопротивления
-            # и объем выше среднего
-            if (current_Close > current['nearest_resistance'] and
-                    current_High > consolidation_High and
-                    current['Volume'] > recent_data['Volume'].mean()):
-                resistance_break = True
-
-        # Проверяем пробой поддержки
-        support_break = False
-        if not np.isnan(current['nearest_support']):
-            # Пробой считается если цена закрылась ниже поддержки
-            # и объем выше среднего
-            if (current_Close < current['nearest_support'] and
-                    current_Low < consolidation_Low and
-                    current['Volume'] > recent_data['Volume'].mean()):
-                support_break = True
-
-        return resistance_break, support_break, consolidation_High, consolidation_Low
-
-    def breakout_strategy(self):
-        """Стратегия пробоя уровней"""
-        current = self.data.iloc[-1]
-        current_price = current['Close']
-
-        # Обнаружение пробоев
-        resistance_break, support_break, consolidation_High, consolidation_Low = self.detect_breakout(self.data)
-
-        # Определение направления
-        if resistance_break:
-            direction = "ВВЕРХ"
-            confidence = "ВЫСОКАЯ"
-            breakout_type = "ПРОБОЙ СОПРОТИВЛЕНИЯ"
-            breakout_level = current['nearest_resistance']
-        elif support_break:
-            direction = "ВНИЗ"
-            confidence = "ВЫСОКАЯ"
-            breakout_type = "ПРОБОЙ ПОДДЕРЖКИ"
-            breakout_level = current['nearest_support']
-        else:
-            direction = "НЕОПРЕДЕЛЕННО"
-            confidence = "НИЗКАЯ"
-            breakout_type = "КОНСОЛИДАЦИЯ"
-            breakout_level = None
-
-        # Расчет целей на основе диапазона консолидации
-        consolidation_range = consolidation_High - consolidation_Low
-
-        if direction == "ВВЕРХ" and breakout_level:
-            # Цель: уровень пробоя + диапазон консолидации
-            tp = breakout_level + consolidation_range
-            # Стоп-лосс: ниже уровня консолидации или ниже пробойного уровня
-            sl = min(consolidation_Low, breakout_level - (consolidation_range * 0.1))
-        elif direction == "ВНИЗ" and breakout_level:
-            # Цель: уровень пробоя - диапазон консолидации
-            tp = breakout_level - consolidation_range
-            # Стоп-лосс: выше уровня консолидации или выше пробойного уровня
-            sl = max(consolidation_High, breakout_level + (consolidation_range * 0.1))
-        else:
-            # Нет пробоя - используем ATR для расчетов
-            tp = current_price + (2 * current['atr'])
-            sl = current_price - (2 * current['atr'])
-
-        # Дополнительные метрики для анализа
-        Volume_analysis = "ВЫСОКИЙ" if current['Volume'] > self.data['Volume'].tail(20).mean() else "СРЕДНИЙ"
-        volatility_analysis = "ВЫСОКАЯ" if consolidation_range > current['atr'] else "НОРМАЛЬНАЯ"
-
-        details = {
-            'Тип пробоя': breakout_type,
-            'Уровень пробоя': f"{breakout_level:.4f}" if breakout_level else "НЕТ",
-            'Диапазон консолидации': f"{consolidation_range:.4f}",
-            'Объем': f"{Volume_analysis}",
-            'Волатильность': f"{volatility_analysis}",
-            'Текущая цена': f"{current_price:.4f}",
-            'Ближайшая поддержка': f"{current['nearest_support']:.4f}" if not np.isnan(
-                current['nearest_support']) else "НЕТ",
-            'Ближайшее сопротивление': f"{current['nearest_resistance']:.4f}" if not np.isnan(
-                current['nearest_resistance']) else "НЕТ"
-        }
-
-        return {
-            'direction': direction,
-            'confidence': confidence,
-            'take_profit': round(tp, 4),
-            'stop_loss': round(sl, 4),
-            'details': details
-        }
-
-    def rsi_macd_strategy(self):
-        """Стратегия RSI + MACD"""
-        current = self.data.iloc[-1]
-
-        # Сигналы RSI
-        rsi_signal = "НЕЙТРАЛЬНЫЙ"
-        if current['rsi'] < 30:
-            rsi_signal = "ПЕРЕПРОДАННОСТЬ (БЫЧИЙ)"
-        elif current['rsi'] > 70:
-            rsi_signal = "ПЕРЕКУПЛЕННОСТЬ (МЕДВЕЖИЙ)"
-
-        # Сигналы MACD
-        macd_signal = "НЕЙТРАЛЬНЫЙ"
-        if current['macd'] > current['macd_signal'] and self.data.iloc[-2]['macd'] <= self.data.iloc[-2]['macd_signal']:
-            macd_signal = "ПЕРЕСЕЧЕНИЕ ВВЕРХ (БЫЧИЙ)"
-        elif current['macd'] < current['macd_signal'] and self.data.iloc[-2]['macd'] >= self.data.iloc[-2][
-            'macd_signal']:
-            macd_signal = "ПЕРЕСЕЧЕНИЕ ВНИЗ (МЕДВЕЖИЙ)"
-
-        # Общий сигнал
-        if "БЫЧИЙ" in rsi_signal and "БЫЧИЙ" in macd_signal:
-            direction = "ВВЕРХ"
-            confidence = "ВЫСОКАЯ"
-        elif "МЕДВЕЖИЙ" in rsi_signal and "МЕДВЕЖИЙ" in macd_signal:
-            direction = "ВНИЗ"
-            confidence = "ВЫСОКАЯ"
-        else:
-            direction = "НЕОПРЕДЕЛЕННО"
-            confidence = "НИЗКАЯ"
-
-        # Расчет TP/SL
-        current_price = current['Close']
-        atr = current['atr']
-
-        if direction == "ВВЕРХ":
-            tp = current_price + (2 * atr)
-            sl = current_price - (1 * atr)
-        elif direction == "ВНИЗ":
-            tp = current_price - (2 * atr)
-            sl = current_price + (1 * atr)
-        else:
-            tp = sl = current_price
-
-        return {
-            'direction': direction,
-            'confidence': confidence,
-            'take_profit': round(tp, 4),
-            'stop_loss': round(sl, 4),
-            'details': {
-                'RSI': f"{current['rsi']:.2f} - {rsi_signal}",
-                'MACD': f"{macd_signal}",
-                'Текущая цена': f"{current_price:.4f}",
-                'ATR': f"{atr:.4f}"
-            }
-        }
-
-    def moving_averages_strategy(self):
-        """Стратегия скользящих средних"""
-        current = self.data.iloc[-1]
-
-        # Сигналы от SMA
-        sma_signal = "НЕЙТРАЛЬНЫЙ"
-        if current['sma_20'] > current['sma_50'] and self.data.iloc[-2]['sma_20'] <= self.data.iloc[-2]['sma_50']:
-            sma_signal = "ЗОЛОТОЙ КРЕСТ (БЫЧИЙ)"
-        elif current['sma_20'] < current['sma_50'] and self.data.iloc[-2]['sma_20'] >= self.data.iloc[-2]['sma_50']:
-            sma_signal = "МЕРТВЫЙ КРЕСТ (МЕДВЕЖИЙ)"
-
-        # Сигналы от EMA
-        ema_signal = "НЕЙТРАЛЬНЫЙ"
-        if current['ema_12'] > current['ema_26']:
-            ema_signal = "БЫЧИЙ"
-        else:
-            ema_signal = "МЕДВЕЖИЙ"
-
-        # Общий сигнал
-        if "БЫЧИЙ" in sma_signal and ema_signal == "БЫЧИЙ":
-            direction = "ВВЕРХ"
-            confidence = "ВЫСОКАЯ"
-        elif "МЕДВЕЖИЙ" in sma_signal and ema_signal == "МЕДВЕЖИЙ":
-            direction = "ВНИЗ"
-            confidence = "ВЫСОКАЯ"
-        else:
-            direction = "НЕОПРЕДЕЛЕННО"
-            confidence = "СРЕДНЯЯ"
-
-        # Расчет TP/SL
-        current_price = current['Close']
-        atr = current['atr']
-
-        if direction == "ВВЕРХ":
-            tp = current_price + (3 * atr)
-            sl = current_price - (1.5 * atr)
-        elif direction == "ВНИЗ":
-            tp = current_price - (3 * atr)
-            sl = current_price + (1.5 * atr)
-        else:
-            tp = sl = current_price
-
-        return {
-            'direction': direction,
-            'confidence': confidence,
-            'take_profit': round(tp, 4),
-            'stop_loss': round(sl, 4),
-            'details': {
-                'SMA 20/50': f"{sma_signal}",
-                'EMA 12/26': f"{ema_signal}",
-                'Текущая цена': f"{current_price:.4f}",
-                'ATR': f"{atr:.4f}"
-            }
-        }
-
-    def bollinger_bands_strategy(self):
-        """Стратегия Bollinger Bands"""
-        current = self.data.iloc[-1]
-        current_price = current['Close']
-
-        # Анализ положения цены относительно полос
-        if current_price <= current['bb_Lower']:
-            bb_signal = "ЦЕНА У НИЖНЕЙ ПОЛОСЫ (ПЕРЕПРОДАННОСТЬ)"
-            direction = "ВВЕРХ"
-            confidence = "ВЫСОКАЯ"
-        elif current_price >= current['bb_upper']:
-            bb_signal = "ЦЕНА У ВЕРХНЕЙ ПОЛОСЫ (ПЕРЕКУПЛЕННОСТЬ)"
-            direction = "ВНИЗ"
-            confidence = "ВЫСОКАЯ"
-        else:
-            bb_signal = "ЦЕНА ВНУТРИ ПОЛОС"
-            direction = "НЕОПРЕДЕЛЕННО"
-            confidence = "НИЗКАЯ"
-
-        # Анализ ширины полос (волатильность)
-        bb_width = (current['bb_upper'] - current['bb_Lower']) / current['bb_middle']
-        volatility = "ВЫСОКАЯ" if bb_width > 0.05 else "НИЗКАЯ"
-
-        # Расчет TP/SL на основе ширины полос
-        bb_range = current['bb_upper'] - current['bb_Lower']
-
-        if direction == "ВВЕРХ":
-            tp = current_price + (0.5 * bb_range)
-            sl = current_price - (0.25 * bb_range)
-        elif direction == "ВНИЗ":
-            tp = current_price - (0.5 * bb_range)
-            sl = current_price + (0.25 * bb_range)
-        else:
-            tp = sl = current_price
-
-        return {
-            'direction': direction,
-            'confidence': confidence,
-            'take_profit': round(tp, 4),
-            'stop_loss': round(sl, 4),
-            'details': {
-                'Bollinger Bands': bb_signal,
-                'Ширина полос': f"{bb_width:.4f}",
-                'Волатильность': volatility,
-                'Текущая цена': f"{current_price:.4f}",
-                'Верхняя полоса': f"{current['bb_upper']:.4f}",
-                'Нижняя полоса': f"{current['bb_Lower']:.4f}"
-            }
-        }
-
-    def stochastic_ema_strategy(self):
-        """Стратегия Stochastic + EMA"""
-        current = self.data.iloc[-1]
-
-        # Сигналы Stochastic
-        stoch_signal = "НЕЙТРАЛЬНЫЙ"
-        if current['stoch_k'] < 20 and current['stoch_d'] < 20:
-            stoch_signal = "ПЕРЕПРОДАННОСТЬ (БЫЧИЙ)"
-        elif current['stoch_k'] > 80 and current['stoch_d'] > 80:
-            stoch_signal = "ПЕРЕКУПЛЕННОСТЬ (МЕДВЕЖИЙ)"
-        elif current['stoch_k'] > current['stoch_d'] and self.data.iloc[-2]['stoch_k'] <= self.data.iloc[-2]['stoch_d']:
-            stoch_signal = "ПЕРЕСЕЧЕНИЕ ВВЕРХ (БЫЧИЙ)"
-        elif current['stoch_k'] < current['stoch_d'] and self.data.iloc[-2]['stoch_k'] >= self.data.iloc[-2]['stoch_d']:
-            stoch_signal = "ПЕРЕСЕЧЕНИЕ ВНИЗ (МЕДВЕЖИЙ)"
-
-        # Сигналы EMA
-        ema_signal = "БЫЧИЙ" if current['Close'] > current['ema_12'] else "МЕДВЕЖИЙ"
-
-        # Общий сигнал
-        if "БЫЧИЙ" in stoch_signal and ema_signal == "БЫЧИЙ":
-            direction = "ВВЕРХ"
-            confidence = "ВЫСОКАЯ"
-        elif "МЕДВЕЖИЙ" in stoch_signal and ema_signal == "МЕДВЕЖИЙ":
-            direction = "ВНИЗ"
-            confidence = "ВЫСОКАЯ"
-        else:
-            direction = "НЕОПРЕДЕЛЕННО"
-            confidence = "СРЕДНЯЯ"
-
-        # Расчет TP/SL
-        current_price = current['Close']
-        atr = current['atr']
-
-        if direction == "ВВЕРХ":
-            tp = current_price + (2.5 * atr)
-            sl = current_price - (1.2 * atr)
-        elif direction == "ВНИЗ":
-            tp = current_price - (2.5 * atr)
-            sl = current_price + (1.2 * atr)
-        else:
-            tp = sl = current_price
-
-        return {
-            'direction': direction,
-            'confidence': confidence,
-            'take_profit': round(tp, 4),
-            'stop_loss': round(sl, 4),
-            'details': {
-                'Stochastic K/D': f"{current['stoch_k']:.2f}/{current['stoch_d']:.2f} - {stoch_signal}",
-                'EMA 12': f"{ema_signal}",
-                'Текущая цена': f"{current_price:.4f}",
-                'ATR': f"{atr:.4f}"
-            }
-        }
-
-    def parabolic_sar_strategy(self):
-        """Стратегия Parabolic SAR + ADX"""
-        current = self.data.iloc[-1]
-        current_price = current['Close']
-
-        # Сигналы Parabolic SAR
-        sar_signal = "НЕЙТРАЛЬНЫЙ"
-        if current_price > current['parabolic_sar']:
-            sar_signal = "БЫЧИЙ ТРЕНД"
-            direction = "ВВЕРХ"
-        else:
-            sar_signal = "МЕДВЕЖИЙ ТРЕНД"
-            direction = "ВНИЗ"
-
-        # Сигналы ADX (сила тренда)
-        adx_strength = "СЛАБЫЙ"
-        if current['adx'] > 25:
-            adx_strength = "СИЛЬНЫЙ"
-        elif current['adx'] > 40:
-            adx_strength = "ОЧЕНЬ СИЛЬНЫЙ"
-
-        confidence = "ВЫСОКАЯ" if adx_strength != "СЛАБЫЙ" else "НИЗКАЯ"
-
-        # Расчет TP/SL
-        atr = current['atr']
-
-        if direction == "ВВЕРХ":
-            tp = current_price + (4 * atr)
-            sl = current['parabolic_sar']  # Используем SAR как стоп-лосс
-        else:
-            tp = current_price - (4 * atr)
-            sl = current['parabolic_sar']
-
-        return {
-            'direction': direction,
-            'confidence': confidence,
-            'take_profit': round(tp, 4),
-            'stop_loss': round(sl, 4),
-            'details': {
-                'Parabolic SAR': f"{sar_signal} ({current['parabolic_sar']:.4f})",
-                'ADX': f"{current['adx']:.2f} - {adx_strength} ТРЕНД",
-                'Текущая цена': f"{current_price:.4f}",
-                'ATR': f"{atr:.4f}"
-            }
-        }
+        if self.indicators_ready:
+            return
+        self.indicators_ready = True
+
+        # При потоковой загрузке индикаторы уже рассчитаны по всей истории
+        if self.chunk_rows:
+            return
+
+        # Индикаторы неизмененного файла берутся из кеша
+        cache_params = {'compact': self.compact, 'version': INDICATORS_CACHE_VERSION}
+        if self.use_cache:
+            cached = load_cached_frame(self.csv_file_path, 'indicators', self.cache_key, **cache_params)
+            if cached is not None and len(cached) == len(self.data):
+                self.data = cached
+                return
+
+        super().calculate_technical_indicators()
+        if self.use_cache:
+            save_cached_frame(self.csv_file_path, 'indicators', self.data, self.cache_key, **cache_params)
+
+    @staticmethod
+    def _print_memory_report(result):
+        """Пиковая память запуска в экономном режиме"""
+        memory = result.get('memory')
+        if memory:
+            print(f"\n📦 Пиковая память: {memory['peak_mb']} МБ "
+                  f"(таблица индикаторов: {memory['frame_mb']} МБ, свечей: {memory['rows']})")
 
     def analyze_strategy(self, strategy_key):
         """Анализ выбранной стратегии"""
-        if strategy_key not in self.strategies:
+        strategy_key = resolve_strategy_key(strategy_key)
+        if strategy_key is None:
             return None
 
-        print(f"\n🔍 Анализ по стратегии: {self.strategies[strategy_key]['name']}")
+        print(f"\n🔍 Анализ по стратегии: {load_strategy(strategy_key).NAME}")
         print("=" * 60)
 
-        # Расчет индикаторов
-        self.calculate_technical_indicators()
-
-        # Получение сигналов от стратегии
-        result = self.strategies[strategy_key]['function']()
+        raw = super().analyze_strategy(strategy_key)
+        result = localize_result(raw)
 
         # Вывод результатов
         print(f"🎯 Направление: {result['direction']}")
@@ -522,7 +344,7 @@ class TradingStrategyAnalyzer:
             print(f"   {key}: {value}")
 
         # Расчет риска/прибыли
-        if result['direction'] != "НЕОПРЕДЕЛЕННО":
+        if raw['direction'] in ('BULLISH', 'BEARISH'):
             current_price = self.data['Close'].iloc[-1]
             risk = abs(current_price - result['stop_loss'])
             reward = abs(result['take_profit'] - current_price)
@@ -537,6 +359,8 @@ class TradingStrategyAnalyzer:
             else:
                 print("❌ ПЛОХОЕ соотношение риск/прибыль")
 
+        self._print_memory_report(raw)
+
         return result
 
     def compare_strategies(self):
@@ -544,18 +368,16 @@ class TradingStrategyAnalyzer:
         print("\n📊 СРАВНЕНИЕ ВСЕХ СТРАТЕГИЙ")
         print("=" * 80)
 
-        self.calculate_technical_indicators()
-        current_price = self.data['Close'].iloc[-1]
+        overall_result = super().compare_strategies()
 
         results = []
-        for key, strategy in self.strategies.items():
-            result = strategy['function']()
+        for key, result in overall_result['strategies'].items():
             results.append({
-                'Стратегия': strategy['name'],
-                'Направление': result['direction'],
-                'Уверенность': result['confidence'],
-                'TP': result['take_profit'],
-                'SL': result['stop_loss']
+                'Стратегия': load_strategy(key).NAME,
+                'Направление': DIRECTION_LABELS.get(result['direction'], result['direction']),
+                'Уверенность': CONFIDENCE_LABELS.get(result['confidence'], result['confidence']),
+                'TP': round(result['take_profit'], 4),
+                'SL': round(result['stop_loss'], 4)
             })
 
         # Создаем DataFrame для красивого вывода
@@ -579,6 +401,24 @@ class TradingStrategyAnalyzer:
 
         print(f"   ОБЩИЙ СИГНАЛ: {consensus}")
 
+        # Взвешенная оценка общего анализатора: веса стратегий зависят от режима рынка
+        overall = overall_result['overall']
+        probabilities = overall['probabilities']
+        regime = overall['regime']['regime']
+        print(f"\n⚖️ ВЗВЕШЕННАЯ ОЦЕНКА (режим рынка: {REGIME_LABELS.get(regime, regime)}):")
+        print(f"   Вверх: {probabilities['bullish']}%, вниз: {probabilities['bearish']}%, "
+              f"нейтрально: {probabilities['neutral']}%")
+        print(f"   Направление: {DIRECTION_LABELS[overall['direction']]}, "
+              f"уверенность: {CONFIDENCE_LABELS[overall['confidence']]}")
+        print(f"   Средние TP/SL: {round(overall['take_profit'], 4)} / {round(overall['stop_loss'], 4)}")
+
+        if overall_result['patterns']:
+            patterns = ", ".join(f"{pattern['pattern']} ({DIRECTION_LABELS[pattern['direction']]})"
+                                 for pattern in overall_result['patterns'])
+            print(f"   Свечные паттерны: {patterns}")
+
+        self._print_memory_report(overall_result)
+
         return results
 
 
@@ -591,8 +431,14 @@ def main():
     # Запрос пути к файлу
     csv_file = input("📁 Введите путь к CSV файлу: ").strip()
 
+    compact_choice = input("📦 Включить экономный режим памяти для больших файлов? (y/n): ").strip().lower()
+    compact = compact_choice in ['y', 'yes', 'д', 'да']
+
+    chunked_choice = input("🧱 Читать файл порциями (для файлов больше памяти)? (y/n): ").strip().lower()
+    chunk_rows = DEFAULT_CHUNK_ROWS if chunked_choice in ['y', 'yes', 'д', 'да'] else None
+
     # Создание анализатора
-    analyzer = TradingStrategyAnalyzer(csv_file)
+    analyzer = TradingStrategyAnalyzer(csv_file, compact=compact, chunk_rows=chunk_rows)
 
     if analyzer.data is None:
         return
@@ -0,0 +1,269 @@
+"""
+Пакетная выгрузка истории свечей в набор Parquet.
+
+Свечи нескольких символов и таймфреймов загружаются параллельно за произвольный период
+и сохраняются с разбиением по символу, таймфрейму и месяцу (UTC):
+
+    <root>/symbol=BTCUSDT/interval=5/month=2024-01/data.parquet
+
+Единица работы - один месяц одного символа и таймфрейма. Файл месяца записывается
+атомарно (через временный файл), завершенные месяцы отмечаются в <root>/_progress.json,
+поэтому прерванную выгрузку можно запустить повторно - готовые месяцы пропускаются.
+Текущий (незакрытый) месяц готовым не отмечается и при повторном запуске догружается.
+
+Колонки совпадают с таблицей анализатора: Timestamp (int64 мс), Open, High, Low, Close,
+Volume, Turnover. read_dataset читает срез без разбора текста - только нужные разделы
+и строки по фильтру времени.
+
+Требуется pyarrow (pip install pyarrow).
+
+Запуск:
+    python3 dataset_export.py BTC ETH --intervals 5,60 --start 2024-01-01 [--end 2024-06-01]
+                              [--out dataset] [--workers 4]
+"""
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from timestamps import now_ms
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_ROOT = 'dataset'
+DEFAULT_WORKERS = 4
+PROGRESS_FILE = '_progress.json'
+PARTITION_FILE = 'data.parquet'
+
+COLUMNS = ['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume', 'Turnover']
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet export: pip install pyarrow")
+
+
+def month_ranges(start_ms, end_ms):
+    """
+    Разбивает период [start_ms, end_ms] на календарные месяцы UTC.
+    Возвращает список (месяц 'YYYY-MM', начало мс, конец мс) с обрезкой по границам периода.
+    """
+    start = pd.Timestamp(int(start_ms), unit='ms').to_period('M')
+    end = pd.Timestamp(int(end_ms), unit='ms').to_period('M')
+
+    ranges = []
+    for period in pd.period_range(start, end, freq='M'):
+        month_start = int(period.start_time.value // 1_000_000)
+        month_end = int((period + 1).start_time.value // 1_000_000) - 1
+        ranges.append((str(period), max(month_start, int(start_ms)), min(month_end, int(end_ms))))
+    return ranges
+
+
+def partition_path(root, symbol, interval, month):
+    """Файл раздела месяца"""
+    return os.path.join(root, f"symbol={symbol}", f"interval={interval}", f"month={month}", PARTITION_FILE)
+
+
+def to_dataset_frame(klines):
+    """Свечи get_kline_data -> колонки и типы набора"""
+    return pd.DataFrame({
+        'Timestamp': klines['timestamp'].to_numpy(dtype=np.int64),
+        'Open': klines['open'].to_numpy(dtype=np.float64),
+        'High': klines['high'].to_numpy(dtype=np.float64),
+        'Low': klines['low'].to_numpy(dtype=np.float64),
+        'Close': klines['close'].to_numpy(dtype=np.float64),
+        'Volume': klines['volume'].to_numpy(dtype=np.float64),
+        'Turnover': klines['turnover'].to_numpy(dtype=np.float64)
+    })
+
+
+def write_partition(root, symbol, interval, month, frame):
+    """
+    Записывает месяц в раздел. Свечи, уже лежащие в разделе, объединяются с новыми
+    (при совпадении времени остается новая свеча). Запись атомарная.
+    """
+    _require_pyarrow()
+    path = partition_path(root, symbol, interval, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if os.path.exists(path):
+        existing = pq.read_table(path).to_pandas()
+        frame = pd.concat([existing, frame], ignore_index=True)
+        frame = frame.drop_duplicates('Timestamp', keep='last')
+    frame = frame.sort_values('Timestamp').reset_index(drop=True)
+
+    temporary = path + '.tmp'
+    pq.write_table(pa.Table.from_pandas(frame[COLUMNS], preserve_index=False), temporary)
+    os.replace(temporary, path)
+    return len(frame)
+
+
+class ExportProgress:
+    """Готовые месяцы выгрузки в JSON-файле (ключ symbol/interval/month)"""
+
+    def __init__(self, root):
+        self.path = os.path.join(root, PROGRESS_FILE)
+        self.lock = threading.Lock()
+        self.completed = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                self.completed = json.load(f)
+
+    @staticmethod
+    def key(symbol, interval, month):
+        return f"{symbol}/{interval}/{month}"
+
+    def is_done(self, symbol, interval, month):
+        return self.key(symbol, interval, month) in self.completed
+
+    def mark_done(self, symbol, interval, month, rows):
+        """Отмечает месяц готовым и сразу сохраняет файл прогресса"""
+        with self.lock:
+            self.completed[self.key(symbol, interval, month)] = rows
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(self.completed, f, indent=1, sort_keys=True)
+            os.replace(temporary, self.path)
+
+
+class DatasetExporter:
+    """Параллельная выгрузка свечей символов и таймфреймов в набор Parquet"""
+
+    def __init__(self, root=DEFAULT_ROOT, fetcher=None, workers=DEFAULT_WORKERS):
+        _require_pyarrow()
+        if fetcher is None:
+            from get_csv_file import CryptoDataFetcher
+            fetcher = CryptoDataFetcher(pool_size=workers)
+        self.root = root
+        self.fetcher = fetcher
+        self.workers = workers
+        os.makedirs(root, exist_ok=True)
+        self.progress = ExportProgress(root)
+
+    def plan(self, symbols, intervals, start_ms, end_ms):
+        """Месяцы, которые нужно выгрузить (готовые по файлу прогресса пропускаются)"""
+        jobs = []
+        for symbol in symbols:
+            symbol = self.fetcher._format_symbol(symbol)
+            for interval in intervals:
+                for month, month_start, month_end in month_ranges(start_ms, end_ms):
+                    if not self.progress.is_done(symbol, interval, month):
+                        jobs.append((symbol, interval, month, month_start, month_end))
+        return jobs
+
+    def export_month(self, symbol, interval, month, start_ms, end_ms):
+        """Загружает и записывает один месяц. Возвращает число свечей в разделе"""
+        klines = self.fetcher.get_kline_range(symbol, interval, start_ms, end_ms)
+        if klines is None:
+            raise RuntimeError(f"Failed to load {symbol} {interval} {month}")
+
+        rows = 0
+        if not klines.empty:
+            rows = write_partition(self.root, symbol, interval, month, to_dataset_frame(klines))
+
+        # Готовым отмечается только закрытый месяц, выгруженный целиком
+        period = pd.Period(month, freq='M')
+        month_start = int(period.start_time.value // 1_000_000)
+        month_end = int((period + 1).start_time.value // 1_000_000) - 1
+        if start_ms <= month_start and end_ms >= month_end and month_end < now_ms():
+            self.progress.mark_done(symbol, interval, month, rows)
+        return rows
+
+    def export(self, symbols, intervals, start_ms, end_ms=None):
+        """
+        Выгружает все месяцы периода.
+
+        Returns:
+            dict: exported - число выгруженных месяцев, rows - свечей, failed - список ошибок
+        """
+        end_ms = now_ms() if end_ms is None else end_ms
+        jobs = self.plan(symbols, intervals, start_ms, end_ms)
+        summary = {'planned': len(jobs), 'exported': 0, 'rows': 0, 'failed': []}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.export_month, *job): job for job in jobs}
+            for future in as_completed(futures):
+                symbol, interval, month = futures[future][:3]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    summary['failed'].append({'symbol': symbol, 'interval': interval, 'month': month,
+                                              'error': str(e)})
+                    continue
+                summary['exported'] += 1
+                summary['rows'] += rows
+                print(f"✅ {symbol} {interval} {month}: {rows} свечей", flush=True)
+
+        return summary
+
+
+def read_dataset(root, symbol, interval, start_ms=None, end_ms=None, columns=None):
+    """
+    Срез набора для символа и таймфрейма за период [start_ms, end_ms].
+    Читаются только разделы нужного символа, таймфрейма и месяцев.
+    """
+    _require_pyarrow()
+    partitioning = ds.partitioning(
+        pa.schema([('symbol', pa.string()), ('interval', pa.string()), ('month', pa.string())]),
+        flavor='hive')
+    dataset = ds.dataset(root, format='parquet', partitioning=partitioning,
+                         exclude_invalid_files=False, ignore_prefixes=['_', '.'])
+
+    condition = (ds.field('symbol') == symbol) & (ds.field('interval') == str(interval))
+    if start_ms is not None:
+        first_month = str(pd.Timestamp(int(start_ms), unit='ms').to_period('M'))
+        condition &= (ds.field('month') >= first_month) & (ds.field('Timestamp') >= int(start_ms))
+    if end_ms is not None:
+        last_month = str(pd.Timestamp(int(end_ms), unit='ms').to_period('M'))
+        condition &= (ds.field('month') <= last_month) & (ds.field('Timestamp') <= int(end_ms))
+
+    table = dataset.to_table(columns=columns or COLUMNS, filter=condition)
+    frame = table.to_pandas()
+    if 'Timestamp' in frame.columns:
+        frame = frame.sort_values('Timestamp')
+    return frame.reset_index(drop=True)
+
+
+def main():
+    """Выгрузка истории из командной строки"""
+    args = sys.argv[1:]
+    options = {'--intervals': '5', '--start': None, '--end': None, '--out': DEFAULT_ROOT,
+               '--workers': str(DEFAULT_WORKERS)}
+    for option in options:
+        if option in args:
+            position = args.index(option)
+            options[option] = args[position + 1]
+            del args[position:position + 2]
+
+    if not args or options['--start'] is None:
+        print("Usage: python dataset_export.py <symbol> [...] --start YYYY-MM-DD [--end YYYY-MM-DD] "
+              "[--intervals 5,60] [--out dataset] [--workers 4]")
+        sys.exit(1)
+
+    start_ms = int(pd.Timestamp(options['--start']).value // 1_000_000)
+    end_ms = int(pd.Timestamp(options['--end']).value // 1_000_000) - 1 if options['--end'] else None
+
+    try:
+        exporter = DatasetExporter(options['--out'], workers=int(options['--workers']))
+    except ImportError as e:
+        sys.stderr.write(f"{e}\n")
+        sys.exit(1)
+
+    summary = exporter.export(args, options['--intervals'].split(','), start_ms, end_ms)
+    print(json.dumps(summary, indent=2))
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
-import requests
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import warnings
-import time
 
 warnings.filterwarnings('ignore')
 
+from timestamps import datetime_to_ms, format_epoch_ms, interval_ms, now_ms
+from kline_parser import kline_frame, parse_kline_response
+from http_transport import DEFAULT_POOL_SIZE, shared_transport
+
 
 class CryptoDataFetcher:
-    def __init__(self):
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+        """pool_size - число параллельных запросов, под которое настраивается пул соединений"""
         self.base_url = "https://api.bybit.com"
-        self.session = requests.Session()
+        self.session = shared_transport(pool_size)
 
         self.popular_cryptos = {
             'BTCUSDT': 'Bitcoin',
@@ -88,9 +90,11 @@ class CryptoDataFetcher:
         base_currency = formatted_symbol.replace('USDT', '')
         return f"{base_currency} (Bybit)"
 
-    def get_kline_data(self, symbol, interval, limit=200):
+    def get_kline_array(self, symbol, interval, limit=200, start=None, end=None):
         """
-        Получает исторические данные (K-line) с Bybit
+        Получает исторические данные (K-line) с Bybit массивом (n, 7) float64
+        в порядке KLINE_COLUMNS от старых к новым (см. kline_parser)
+        start, end - границы периода в мс (необязательно)
         """
         try:
             symbol = self._format_symbol(symbol)
@@ -101,32 +105,57 @@ class CryptoDataFetcher:
                 'interval': interval,
                 'limit': limit
             }
+            if start is not None:
+                params['start'] = int(start)
+            if end is not None:
+                params['end'] = int(end)
 
             response = self.session.get(url, params=params)
-            data = response.json()
-
-            if data['retCode'] == 0:
-                klines = data['result']['list']
+            klines, error = parse_kline_response(response.content)
+            if error:
+                print(f"Ошибка Bybit API: {error}")
+            return klines
 
-                # Конвертируем в DataFrame
-                df = pd.DataFrame(klines, columns=[
-                    'timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'
-                ])
+        except Exception as e:
+            print(f"Ошибка при получении данных K-line: {e}")
+            return None
 
-                # Конвертируем типы данных
-                df['timestamp'] = pd.to_datetime(df['timestamp'].astype(int), unit='ms')
-                for col in ['open', 'high', 'low', 'close', 'volume']:
-                    df[col] = df[col].astype(float)
+    def get_kline_data(self, symbol, interval, limit=200, start=None, end=None):
+        """
+        Получает исторические данные (K-line) с Bybit
+        start, end - границы периода в мс (необязательно)
+        """
+        klines = self.get_kline_array(symbol, interval, limit, start, end)
+        if klines is None:
+            return None
+        return kline_frame(klines)
 
-                df = df.sort_values('timestamp').reset_index(drop=True)
-                return df
-            else:
-                print(f"Ошибка Bybit API: {data['retMsg']}")
+    def get_kline_range(self, symbol, interval, start_ms, end_ms, limit=1000):
+        """
+        Получает свечи за период [start_ms, end_ms] постранично:
+        Bybit отдает не больше 1000 свечей за запрос, страницы идут от новых к старым
+        """
+        frames = []
+        cursor = int(end_ms)
+        while cursor >= start_ms:
+            df = self.get_kline_data(symbol, interval, limit, start=start_ms, end=cursor)
+            if df is None:
                 return None
+            if df.empty:
+                break
 
-        except Exception as e:
-            print(f"Ошибка при получении данных K-line: {e}")
-            return None
+            frames.append(df)
+            if len(df) < limit:
+                break
+            cursor = int(df['timestamp'].iloc[0]) - 1
+
+        if not frames:
+            return pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'])
+
+        df = pd.concat(frames[::-1], ignore_index=True)
+        df = df.drop_duplicates('timestamp').sort_values('timestamp')
+        df = df[(df['timestamp'] >= start_ms) & (df['timestamp'] <= end_ms)]
+        return df.reset_index(drop=True)
 
     def get_current_price(self, crypto_symbol):
         """
@@ -179,12 +208,12 @@ class CryptoDataFetcher:
             if error:
                 return None, error
 
-            # Форматируем исторические данные
-            hist['Timestamp'] = hist['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            # Время свечей остается в миллисекундах epoch
+            hist['Timestamp'] = hist['timestamp']
 
             # Создаем текущую свечу
             current_candle = {
-                'Timestamp': current_timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                'Timestamp': datetime_to_ms(current_timestamp),
                 'Open': current_price,
                 'High': current_price,
                 'Low': current_price,
@@ -240,14 +269,14 @@ class CryptoDataFetcher:
                 current_price = hist['close'].iloc[-1]
                 current_timestamp = datetime.now()
 
-            # Форматируем исторические данные
-            hist['Timestamp'] = hist['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            # Время свечей остается в миллисекундах epoch
+            hist['Timestamp'] = hist['timestamp']
 
             # Обновляем последнюю свечу актуальной ценой
             hist.loc[hist.index[-1], 'close'] = current_price
             hist.loc[hist.index[-1], 'high'] = max(hist.loc[hist.index[-1], 'high'], current_price)
             hist.loc[hist.index[-1], 'low'] = min(hist.loc[hist.index[-1], 'low'], current_price)
-            hist.loc[hist.index[-1], 'Timestamp'] = current_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+            hist.loc[hist.index[-1], 'Timestamp'] = datetime_to_ms(current_timestamp)
 
             # Переименовываем колонки для совместимости
             result_data = hist.rename(columns={
@@ -280,7 +309,7 @@ class CryptoDataFetcher:
         print(f"📊 ДАННЫЕ ПО КРИПТОВАЛЮТЕ: {crypto_name}")
         print(f"⏰ Таймфрейм: {timeframe_name}")
         print(f"🕐 Актуально на: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"📅 Период: с {data['Timestamp'].iloc[0]} по {data['Timestamp'].iloc[-1]}")
+        print(f"📅 Период: с {format_epoch_ms(data['Timestamp'].iloc[0])} по {format_epoch_ms(data['Timestamp'].iloc[-1])}")
         print(f"📈 Количество свечей: {len(data)}")
         print(f"🔗 Источник: Bybit API")
         print(f"{'=' * 90}")
@@ -298,6 +327,7 @@ class CryptoDataFetcher:
 
         # Создаем копию данных для красивого отображения
         display_df = data.copy()
+        display_df['Timestamp'] = format_epoch_ms(display_df['Timestamp']).to_numpy()
         display_df['Open'] = display_df['Open'].apply(lambda x: f"${price_format.format(x)}")
         display_df['High'] = display_df['High'].apply(lambda x: f"${price_format.format(x)}")
         display_df['Low'] = display_df['Low'].apply(lambda x: f"${price_format.format(x)}")
@@ -382,13 +412,55 @@ class CryptoDataFetcher:
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"{crypto_symbol}_{self.timeframes[timeframe_key]['name'].replace(' ', '_')}_{timestamp}.csv"
-            data.to_csv(filename, index=False)
+            export_df = data.copy()
+            export_df['Timestamp'] = format_epoch_ms(export_df['Timestamp']).to_numpy()
+            export_df.to_csv(filename, index=False)
             print(f"💾 Данные сохранены в файл: {filename}")
             return filename
         except Exception as e:
             print(f"❌ Ошибка при сохранении файла: {e}")
             return None
 
+    def append_export(self, crypto_symbol, timeframe_key, compression='gzip', directory='.'):
+        """
+        Дописывает в общий сжатый CSV символа и таймфрейма закрытые свечи новее последней в файле.
+        При первой выгрузке берется limit последних свечей таймфрейма.
+        """
+        from csv_export import append_candles, export_path, prepare_export
+
+        try:
+            timeframe = self.timeframes[timeframe_key]
+            interval = timeframe['interval']
+            symbol = self._format_symbol(crypto_symbol)
+            filename = export_path(directory, symbol, interval, compression)
+
+            last_timestamp = prepare_export(filename)['last_timestamp']
+            end = now_ms()
+            start = (last_timestamp + 1 if last_timestamp is not None
+                     else end - timeframe['limit'] * interval_ms(interval))
+
+            hist = self.get_kline_range(symbol, interval, start, end)
+            if hist is None:
+                return None
+
+            # Последняя свеча еще формируется - в файл попадают только закрытые
+            hist = hist[hist['timestamp'] + interval_ms(interval) <= end]
+            data = hist.rename(columns={
+                'timestamp': 'Timestamp',
+                'open': 'Open',
+                'high': 'High',
+                'low': 'Low',
+                'close': 'Close',
+                'volume': 'Volume'
+            })[['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume']]
+
+            result = append_candles(filename, data)
+            print(f"💾 Дописано свечей: {result['appended']}, всего в файле {filename}: {result['rows']}")
+            return filename
+        except Exception as e:
+            print(f"❌ Ошибка при сохранении файла: {e}")
+            return None
+
 
 def main():
     """
@@ -441,9 +513,12 @@ def main():
                 timeframe_name = fetcher.timeframes[tf_choice]['name']
                 fetcher.display_data(data, crypto_name, timeframe_name)
 
-                export_choice = input("\n💾 Экспортировать данные в CSV? (y/n): ").strip().lower()
+                export_choice = input("\n💾 Экспортировать данные в CSV? "
+                                      "(y - новый файл, a - дописать в общий .csv.gz, n - нет): ").strip().lower()
                 if export_choice in ['y', 'yes', 'д', 'да']:
                     fetcher.export_to_csv(data, crypto_choice, tf_choice)
+                elif export_choice in ['a', 'append', 'ф']:
+                    fetcher.append_export(crypto_choice, tf_choice)
 
         elif choice == '2':
             crypto_to_check = input("\n🔍 Введите код криптовалюты для проверки: ").strip().upper()
@@ -530,7 +605,9 @@ def quick_crypto_chart(symbol, timeframe='5'):
     print(f"\n📊 {crypto_name} ({symbol}) - {timeframe_name} (Bybit)")
     print(f"💰 Актуальная цена: ${data['Close'].iloc[-1]:.6f}")
     print(f"📅 Последние 3 свечи:")
-    print(data.tail(3).to_string(index=False))
+    last_candles = data.tail(3).copy()
+    last_candles['Timestamp'] = format_epoch_ms(last_candles['Timestamp']).to_numpy()
+    print(last_candles.to_string(index=False))
 
     return data
 
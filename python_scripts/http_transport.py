@@ -0,0 +1,288 @@
+"""
+HTTP-транспорт для запросов к Bybit.
+
+HttpTransport - requests.Session с настройками для параллельных запросов:
+    - у каждого запроса есть таймауты соединения и чтения (медленный ответ не вешает анализ);
+    - пул соединений на хост размером с параллельность вызывающего кода, при нехватке
+      соединений поток ждет свободное, а не открывает лишнее (pool_block);
+    - соединения переиспользуются (keep-alive) между запросами процесса;
+    - ответы запрашиваются сжатыми (gzip);
+    - по каждому хосту собираются метрики: запросы, ошибки, таймауты, время ответа,
+      открытые и переиспользованные соединения;
+    - hedged_get - запрос с бюджетом времени: если ответ задерживается дольше p95 времени
+      ответа эндпоинта, отправляется один дублирующий запрос и берется первый ответ.
+
+Отправка запросов через один транспорт из нескольких потоков безопасна: пул urllib3
+потокобезопасен, метрики обновляются под блокировкой. Общий транспорт процесса
+(shared_transport) используют сборщики данных, демоны (candle_store serve, alert_engine)
+и параллельные загрузки (correlation, dataset_export).
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 10
+
+# Хостов одновременно в пуле (Bybit REST и запасные домены)
+POOL_HOSTS = 4
+
+# Окно времен ответа эндпоинта для p95 и минимум замеров, после которого p95 используется
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 95
+
+# Потоки для запросов hedged_get (основной и дублирующий на каждый вызов)
+HEDGE_WORKERS = 32
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Бюджет времени запроса исчерпан, ни один из запросов не ответил"""
+
+
+class HostMetrics:
+    """Счетчики запросов одного хоста"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadlines = 0
+
+    def record(self, seconds, error=False, timeout=False, size=0):
+        self.requests += 1
+        self.errors += error
+        self.timeouts += timeout
+        self.bytes += size
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'bytes': self.bytes,
+            'avg_ms': round(self.total_seconds / self.requests * 1000, 2) if self.requests else None,
+            'max_ms': round(self.max_seconds * 1000, 2),
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'deadlines': self.deadlines
+        }
+
+
+class HttpTransport(requests.Session):
+    """Сессия requests с таймаутами, пулом под параллельность и метриками по хостам"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        super().__init__()
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = 0
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._latencies = {}
+        self._adapters = []
+        self._hedge_executor = None
+        self.headers['Accept-Encoding'] = 'gzip, deflate'
+        self.ensure_pool_size(pool_size)
+
+    def ensure_pool_size(self, pool_size):
+        """
+        Увеличивает пул соединений до pool_size на хост. Прежний адаптер остается
+        у запросов, которые уже идут, и закрывается вместе с транспортом.
+        """
+        with self._lock:
+            if pool_size <= self.pool_size:
+                return
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size, pool_block=True)
+            self.mount('https://', adapter)
+            self.mount('http://', adapter)
+            self._adapters.append(adapter)
+            self.pool_size = pool_size
+
+    def request(self, method, url, **kwargs):
+        """Запрос с таймаутом по умолчанию и учетом в метриках хоста"""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.Timeout:
+            self._record(host, time.perf_counter() - started, error=True, timeout=True)
+            raise
+        except requests.RequestException:
+            self._record(host, time.perf_counter() - started, error=True)
+            raise
+
+        size = 0 if kwargs.get('stream') else len(response.content)
+        seconds = time.perf_counter() - started
+        self._record(host, seconds, error=response.status_code >= 500, size=size)
+        if response.status_code < 500:
+            with self._lock:
+                self._latency_window(url).append(seconds)
+        return response
+
+    def _record(self, host, seconds, **kwargs):
+        with self._lock:
+            self._metrics.setdefault(host, HostMetrics()).record(seconds, **kwargs)
+
+    def _count(self, url, counter):
+        with self._lock:
+            metrics = self._metrics.setdefault(urlsplit(url).netloc, HostMetrics())
+            setattr(metrics, counter, getattr(metrics, counter) + 1)
+
+    def _latency_window(self, url):
+        """Окно времен ответа эндпоинта (хост и путь без параметров); вызывать под self._lock"""
+        parts = urlsplit(url)
+        return self._latencies.setdefault(parts.netloc + parts.path, deque(maxlen=LATENCY_WINDOW))
+
+    def latency_samples(self, url):
+        """Последние времена ответа эндпоинта в секундах"""
+        with self._lock:
+            return list(self._latency_window(url))
+
+    def add_latency_samples(self, url, samples):
+        """Добавляет замеры эндпоинта (например, сохраненные прошлым запуском процесса)"""
+        with self._lock:
+            self._latency_window(url).extend(float(sample) for sample in samples)
+
+    def latency_percentile(self, url, percentile=HEDGE_PERCENTILE):
+        """Перцентиль времени ответа эндпоинта в секундах или None, пока замеров меньше HEDGE_MIN_SAMPLES"""
+        samples = self.latency_samples(url)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return float(np.percentile(samples, percentile))
+
+    def _hedge_pool(self):
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+            return self._hedge_executor
+
+    def hedged_get(self, url, deadline, hedge_after=None, **kwargs):
+        """
+        GET с бюджетом времени deadline секунд.
+
+        Если за hedge_after секунд (по умолчанию - p95 времени ответа эндпоинта) ответа нет,
+        отправляется один дублирующий запрос, возвращается первый полученный ответ.
+        Если основной запрос завершился ошибкой соединения или ответом 5xx, дубль отправляется сразу.
+        Пока замеров эндпоинта мало, дубль по времени не отправляется.
+        Пул соединений должен вмещать и дубли: при нехватке соединений дубль ждет,
+        пока освободится соединение медленного запроса (pool_block).
+
+        Raises:
+            DeadlineExceeded: ни один запрос не ответил за бюджет
+            requests.RequestException: оба запроса завершились ошибкой соединения
+        """
+        started = time.monotonic()
+        expires = started + deadline
+        if hedge_after is None:
+            hedge_after = self.latency_percentile(url)
+        kwargs.pop('timeout', None)
+        executor = self._hedge_pool()
+
+        def attempt():
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline of {deadline} s exceeded: {url}")
+            # Запрос, проигравший гонку, не живет дольше бюджета
+            return self.get(url, timeout=(min(self.timeout[0], remaining), remaining), **kwargs)
+
+        primary = executor.submit(attempt)
+        pending = {primary}
+        hedged = False
+        error = None
+        failed_response = None
+
+        while pending:
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                break
+            if not hedged and hedge_after is not None:
+                remaining = min(remaining, max(started + hedge_after - time.monotonic(), 0))
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                if response.status_code >= 500:
+                    failed_response = response
+                    continue
+                if future is not primary:
+                    self._count(url, 'hedge_wins')
+                return response
+
+            late = hedge_after is not None and time.monotonic() - started >= hedge_after
+            if not hedged and (late or not pending) and time.monotonic() < expires:
+                pending.add(executor.submit(attempt))
+                hedged = True
+                self._count(url, 'hedges')
+
+        if not pending:
+            if failed_response is not None:
+                return failed_response
+            if error is not None:
+                raise error
+        self._count(url, 'deadlines')
+        raise DeadlineExceeded(f"Deadline of {deadline} s exceeded: {url}")
+
+    def metrics(self):
+        """
+        Метрики по хостам: счетчики запросов и время ответа, а также connections -
+        открыто соединений и reused - запросов, отправленных по уже открытому соединению
+        """
+        with self._lock:
+            result = {host: metrics.to_dict() for host, metrics in self._metrics.items()}
+            adapters = list(self._adapters)
+
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+                entry = result.setdefault(host, HostMetrics().to_dict())
+                entry['connections'] = entry.get('connections', 0) + pool.num_connections
+                entry['reused'] = entry.get('reused', 0) + max(pool.num_requests - pool.num_connections, 0)
+        return result
+
+    def close(self):
+        with self._lock:
+            adapters, self._adapters = self._adapters, []
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for adapter in adapters:
+            adapter.close()
+        super().close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport(pool_size=DEFAULT_POOL_SIZE):
+    """Общий транспорт процесса; пул увеличивается до наибольшего запрошенного pool_size"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpTransport(pool_size)
+    _shared.ensure_pool_size(pool_size)
+    return _shared
@@ -0,0 +1,207 @@
+"""
+Ядра рекурсивных индикаторов: Parabolic SAR, ADX и сглаживание Уайлдера (ATR).
+
+Эти индикаторы зависят от своего предыдущего значения и не сводятся к скользящим окнам,
+поэтому на длинных рядах именно они занимают основное время расчета.
+Если установлен numba, ядра компилируются (только CPU) с кешем на диске:
+компиляция выполняется один раз на установку, а не при каждом запуске анализатора.
+Без numba используется запасной вариант на NumPy/pandas.
+
+Результаты совпадают с библиотекой ta (PSARIndicator, ADXIndicator, AverageTrueRange).
+
+Прогрев кеша при развертывании:
+    python3 indicator_kernels.py --warm-up
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _psar_loop(high, low, close, step, max_step):
+    """Parabolic SAR - последовательный проход по свечам"""
+    n = len(close)
+    psar = close.copy()
+    if n < 3:
+        return psar
+
+    up_trend = True
+    acceleration_factor = step
+    up_trend_high = high[0]
+    down_trend_low = low[0]
+
+    for i in range(2, n):
+        reversal = False
+
+        if up_trend:
+            psar[i] = psar[i - 1] + acceleration_factor * (up_trend_high - psar[i - 1])
+
+            if low[i] < psar[i]:
+                reversal = True
+                psar[i] = up_trend_high
+                down_trend_low = low[i]
+                acceleration_factor = step
+            else:
+                if high[i] > up_trend_high:
+                    up_trend_high = high[i]
+                    acceleration_factor = min(acceleration_factor + step, max_step)
+
+                if low[i - 2] < psar[i]:
+                    psar[i] = low[i - 2]
+                elif low[i - 1] < psar[i]:
+                    psar[i] = low[i - 1]
+        else:
+            psar[i] = psar[i - 1] - acceleration_factor * (psar[i - 1] - down_trend_low)
+
+            if high[i] > psar[i]:
+                reversal = True
+                psar[i] = down_trend_low
+                up_trend_high = high[i]
+                acceleration_factor = step
+            else:
+                if low[i] < down_trend_low:
+                    down_trend_low = low[i]
+                    acceleration_factor = min(acceleration_factor + step, max_step)
+
+                if high[i - 2] > psar[i]:
+                    psar[i] = high[i - 2]
+                elif high[i - 1] > psar[i]:
+                    psar[i] = high[i - 1]
+
+        up_trend = up_trend != reversal
+
+    return psar
+
+
+def _wilder_average_loop(seed, values, window):
+    """
+    Сглаживание Уайлдера: out[0] = seed, out[i] = (out[i-1] * (window - 1) + values[i - 1]) / window
+    """
+    out = np.empty(len(values) + 1)
+    out[0] = seed
+    for i in range(1, len(out)):
+        out[i] = (out[i - 1] * (window - 1) + values[i - 1]) / window
+    return out
+
+
+def _wilder_sum_loop(seed, values, window):
+    """
+    Сглаженная сумма Уайлдера: out[0] = seed, out[i] = out[i-1] - out[i-1] / window + values[i - 1]
+    """
+    out = np.empty(len(values) + 1)
+    out[0] = seed
+    for i in range(1, len(out)):
+        out[i] = out[i - 1] - (out[i - 1] / window) + values[i - 1]
+    return out
+
+
+def _wilder_average_numpy(seed, values, window):
+    """Векторный вариант _wilder_average_loop через экспоненциальное сглаживание pandas"""
+    series = pd.Series(np.concatenate(([seed], values)))
+    return series.ewm(alpha=1.0 / window, adjust=False).mean().to_numpy()
+
+
+def _wilder_sum_numpy(seed, values, window):
+    """Векторный вариант _wilder_sum_loop: сглаженная сумма равна window * сглаженному среднему"""
+    return window * _wilder_average_numpy(seed / window, values, window)
+
+
+if NUMBA_AVAILABLE:
+    _psar_kernel = njit(cache=True)(_psar_loop)
+    _wilder_average = njit(cache=True)(_wilder_average_loop)
+    _wilder_sum = njit(cache=True)(_wilder_sum_loop)
+else:
+    _psar_kernel = _psar_loop
+    _wilder_average = _wilder_average_numpy
+    _wilder_sum = _wilder_sum_numpy
+
+
+def _as_array(values):
+    """Ряд цен в виде непрерывного массива float64"""
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+
+
+def parabolic_sar(high, low, close, step=0.02, max_step=0.20):
+    """Parabolic SAR (как ta.trend.PSARIndicator.psar)"""
+    return _psar_kernel(_as_array(high), _as_array(low), _as_array(close), step, max_step)
+
+
+def true_range(high, low, close):
+    """True Range, для первой свечи - High - Low"""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    ranges = np.vstack((high - low, np.abs(high - prev_close), np.abs(low - prev_close)))
+    return np.nanmax(ranges, axis=0)
+
+
+def average_true_range(high, low, close, window=14):
+    """ATR со сглаживанием Уайлдера (как ta.volatility.AverageTrueRange)"""
+    tr = true_range(high, low, close)
+    atr = np.zeros(len(tr))
+    if len(tr) < window:
+        return atr
+
+    atr[window - 1:] = _wilder_average(tr[:window].mean(), tr[window:], window)
+    return atr
+
+
+def adx(high, low, close, window=14):
+    """ADX (как ta.trend.ADXIndicator.adx), до конца периода прогрева - нули"""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    n = len(close)
+    length = n - (window - 1)
+    result = np.zeros(n)
+    if length <= window:
+        return result
+
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+    diff_up = high[1:] - high[:-1]
+    diff_down = low[:-1] - low[1:]
+    pos = np.concatenate(([np.nan], np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)))
+    neg = np.concatenate(([np.nan], np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)))
+
+    def smoothed(values):
+        # Последний элемент остается нулем, как в ta
+        out = np.zeros(length)
+        out[:-1] = _wilder_sum(values[1:window + 1].sum(), values[window + 1:window + length - 1], window)
+        return out
+
+    trs, dip, din = smoothed(tr), smoothed(pos), smoothed(neg)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_plus = np.where(trs != 0, 100 * dip / trs, 0.0)
+        di_minus = np.where(trs != 0, 100 * din / trs, 0.0)
+        di_sum = di_plus + di_minus
+        directional_index = np.where(di_sum != 0, 100 * np.abs((di_plus - di_minus) / di_sum), 0.0)
+
+    adx_values = np.zeros(length)
+    adx_values[window:] = _wilder_average(directional_index[:window].mean(),
+                                          directional_index[window:length - 1], window)
+
+    result[window - 1:] = adx_values
+    return result
+
+
+def warm_up():
+    """Компилирует ядра и сохраняет их в кеш numba на диске"""
+    high = np.linspace(2.0, 3.0, 64)
+    low = high - 1.0
+    close = high - 0.5
+    parabolic_sar(high, low, close)
+    average_true_range(high, low, close)
+    adx(high, low, close)
+    return NUMBA_AVAILABLE
+
+
+if __name__ == "__main__":
+    if "--warm-up" in sys.argv:
+        compiled = warm_up()
+        print("Numba kernels compiled and cached" if compiled else "Numba is not installed, NumPy fallback is used")
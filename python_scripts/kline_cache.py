@@ -0,0 +1,80 @@
+"""
+Последние полученные свечи и времена ответа биржи на диске.
+
+analyze_script запускается отдельным процессом на каждый запрос, поэтому запасные данные
+и статистика времени ответа живут между запусками в каталоге кеша:
+    <каталог>/<SYMBOL>_<interval>.npy - массив свечей (n, 7) из kline_parser
+    <каталог>/latency.json            - последние времена ответа эндпоинтов (для p95 hedged_get)
+
+Свечи сохраняются и читаются только запусками с бюджетом времени (--deadline):
+если биржа не ответила за бюджет, анализ строится по свечам из кеша.
+"""
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'chase_profit_klines')
+LATENCY_FILE = 'latency.json'
+
+
+class KlineCache:
+    """Кеш последних свечей символов и времен ответа в каталоге directory"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def path(self, symbol, interval):
+        return os.path.join(self.directory, f"{symbol}_{interval}.npy")
+
+    def _replace(self, path, write):
+        """Атомарная запись файла: write(f) во временный файл и замена"""
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as f:
+            write(f)
+        os.replace(temporary, path)
+
+    def save(self, symbol, interval, klines):
+        """Сохраняет массив свечей. Ошибки записи не мешают анализу - возвращается False"""
+        try:
+            self._replace(self.path(symbol, interval), lambda f: np.save(f, np.asarray(klines, dtype=np.float64)))
+            return True
+        except OSError:
+            return False
+
+    def load(self, symbol, interval, limit=None):
+        """Последние limit свечей из кеша или None"""
+        try:
+            klines = np.load(self.path(symbol, interval))
+        except (OSError, ValueError):
+            return None
+        if not len(klines):
+            return None
+        return klines if limit is None else klines[-limit:]
+
+    def has_symbol(self, symbol):
+        """Есть ли в кеше свечи символа (любого таймфрейма)"""
+        try:
+            return any(name.startswith(f"{symbol}_") for name in os.listdir(self.directory))
+        except OSError:
+            return False
+
+    def load_latencies(self):
+        """Сохраненные времена ответа: эндпоинт -> список секунд"""
+        try:
+            with open(os.path.join(self.directory, LATENCY_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_latencies(self, latencies):
+        """Сохраняет времена ответа эндпоинтов"""
+        try:
+            payload = json.dumps(latencies).encode()
+            self._replace(os.path.join(self.directory, LATENCY_FILE), lambda f: f.write(payload))
+            return True
+        except OSError:
+            return False
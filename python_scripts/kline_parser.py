@@ -0,0 +1,68 @@
+"""
+Разбор ответа Bybit /v5/market/kline сразу в массивы NumPy.
+
+Bybit отдает свечи списком списков строк от новых к старым. Вместо DataFrame из object-колонок
+с поштучным приведением типов и сортировкой список переводится в один массив (n, 7) float64
+за один вызов np.array, а порядок от старых к новым получается срезом-представлением [::-1]
+без копирования. Время свечи в мс помещается в float64 без потерь (меньше 2**53).
+
+Ответ декодируется orjson, если он установлен (pip install orjson), иначе стандартным json.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Колонки свечи в порядке Bybit /v5/market/kline
+KLINE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']
+
+
+def decode_json(content):
+    """Тело ответа (bytes или str) -> объект JSON"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def kline_array(klines):
+    """
+    Список свечей Bybit -> массив (n, 7) float64 в порядке KLINE_COLUMNS от старых к новым.
+    Для ответа в порядке Bybit (от новых к старым) результат - представление без копирования.
+    """
+    if not klines:
+        return np.empty((0, len(KLINE_COLUMNS)), dtype=np.float64)
+
+    array = np.array(klines, dtype=np.float64)
+    if array.ndim != 2 or array.shape[1] < len(KLINE_COLUMNS):
+        raise ValueError(f"Unexpected kline shape: {array.shape}")
+    array = array[::-1, :len(KLINE_COLUMNS)]
+
+    # Порядок Bybit не гарантирован документацией - проверка дешевле сортировки
+    timestamps = array[:, 0]
+    if len(timestamps) > 1 and not (timestamps[1:] > timestamps[:-1]).all():
+        _, positions = np.unique(timestamps, return_index=True)
+        array = array[positions]
+    return array
+
+
+def parse_kline_response(content):
+    """
+    Тело ответа /v5/market/kline -> (массив свечей, None) или (None, сообщение об ошибке Bybit)
+    """
+    data = decode_json(content)
+    if data.get('retCode') != 0:
+        return None, data.get('retMsg', 'Unknown error')
+    return kline_array(data['result']['list']), None
+
+
+def kline_frame(array):
+    """Массив свечей -> DataFrame в формате get_kline_data (timestamp int64, остальные float64)"""
+    df = pd.DataFrame(array, columns=KLINE_COLUMNS)
+    df['timestamp'] = df['timestamp'].astype(np.int64)
+    return df
@@ -0,0 +1,183 @@
+"""
+Монте-Карло оценка исходов сделки по уровням TP/SL стратегии.
+
+Будущие свечи моделируются одним из способов:
+- 'bootstrap' - случайная выборка (с возвращением) реальных свечей из истории:
+  доходность закрытия и отклонения High/Low от предыдущего закрытия;
+- 'atr' - случайное блуждание с волатильностью за свечу, оцененной по ATR.
+
+Пути строятся один раз (simulate_paths) и хранят накопленные максимум и минимум цены
+относительно входа на каждой свече, поэтому уровни всех стратегий оцениваются на одном
+наборе путей: для каждого пути определяется, какой уровень достигнут первым, и через сколько свечей.
+"""
+import numpy as np
+
+DEFAULT_PATHS = 20_000
+DEFAULT_HORIZON = 100
+SIMULATION_METHODS = ('bootstrap', 'atr')
+
+# Минимум свечей истории для выборки, иначе используется модель по ATR
+MIN_BOOTSTRAP_CANDLES = 30
+
+# Средний диапазон High-Low броуновского движения за свечу равен sigma * sqrt(8 / pi)
+ATR_TO_SIGMA = 1.0 / np.sqrt(8.0 / np.pi)
+
+
+def candle_moves(high, low, close):
+    """
+    Логарифмические движения свечей относительно предыдущего закрытия:
+    (доходность закрытия, отклонение максимума, отклонение минимума).
+    """
+    high, low, close = (np.asarray(values, dtype=np.float64) for values in (high, low, close))
+    prev_close = close[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moves = np.log(np.vstack((close[1:], high[1:], low[1:])) / prev_close)
+    valid = np.isfinite(moves).all(axis=0)
+    return moves[:, valid]
+
+
+def _trade_side(entry, take_profit, stop_loss):
+    """1 - покупка, -1 - продажа, 0 - уровни не образуют сделку (например, NEUTRAL)"""
+    if take_profit <= 0 or stop_loss <= 0:
+        return 0
+    if stop_loss < entry < take_profit:
+        return 1
+    if take_profit < entry < stop_loss:
+        return -1
+    return 0
+
+
+def simulate_paths(high, low, close, method='bootstrap', atr=None,
+                   paths=DEFAULT_PATHS, horizon=DEFAULT_HORIZON, seed=None):
+    """
+    Строит пути цены от последнего закрытия.
+
+    Args:
+        high, low, close: история свечей, вход - по последнему закрытию
+        method: 'bootstrap' или 'atr' (при короткой истории bootstrap заменяется на 'atr')
+        atr: последнее значение ATR (обязательно для 'atr')
+        paths: число путей
+        horizon: число свечей, после которого сделка считается незакрытой
+
+    Returns:
+        SimulatedPaths или None, если для выбранной модели не хватает данных
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Unknown simulation method: {method}")
+
+    close = np.asarray(close, dtype=np.float64)
+    moves = candle_moves(high, low, close) if method == 'bootstrap' else None
+    if moves is not None and moves.shape[1] < MIN_BOOTSTRAP_CANDLES:
+        moves = None
+        method = 'atr'
+
+    if moves is None:
+        if atr is None or not np.isfinite(atr) or atr <= 0:
+            return None
+        sigma = atr / close[-1] * ATR_TO_SIGMA
+
+    rng = np.random.default_rng(seed)
+    position = np.zeros(paths)
+    highest = np.full(paths, -np.inf)
+    lowest = np.full(paths, np.inf)
+    # float32 вдвое сокращает память путей; точности хватает для сравнения с уровнями
+    running_high = np.empty((horizon, paths), dtype=np.float32)
+    running_low = np.empty((horizon, paths), dtype=np.float32)
+
+    for bar in range(horizon):
+        if moves is not None:
+            sample = moves[:, rng.integers(0, moves.shape[1], paths)]
+            np.maximum(highest, position + sample[1], out=highest)
+            np.minimum(lowest, position + sample[2], out=lowest)
+            position += sample[0]
+        else:
+            position += rng.standard_normal(paths) * sigma
+            np.maximum(highest, position, out=highest)
+            np.minimum(lowest, position, out=lowest)
+        running_high[bar] = highest
+        running_low[bar] = lowest
+
+    return SimulatedPaths(method, close[-1], running_high, running_low, position)
+
+
+class SimulatedPaths:
+    """
+    Пути цены в логарифмах относительно входа: накопленные максимум и минимум
+    на каждой свече (horizon x paths) и позиция на конце горизонта.
+    """
+
+    def __init__(self, method, entry, running_high, running_low, final_position):
+        self.method = method
+        self.entry = entry
+        self.running_high = running_high
+        self.running_low = running_low
+        self.final_position = final_position
+
+    @property
+    def horizon(self):
+        return self.running_high.shape[0]
+
+    @property
+    def paths(self):
+        return self.running_high.shape[1]
+
+    def _first_bar(self, reached):
+        """Номер свечи (с 1), на которой условие впервые выполнено; horizon + 1 - не выполнено"""
+        # Накопленные экстремумы монотонны, поэтому достаточно посчитать свечи до первого срабатывания
+        return self.horizon + 1 - reached.sum(axis=0)
+
+    def exit_stats(self, take_profit, stop_loss):
+        """
+        Вероятность достижения TP раньше SL и время до выхода из сделки.
+
+        Returns:
+            dict с вероятностями (%) и временем выхода в свечах или None, если уровни не образуют сделку
+        """
+        side = _trade_side(self.entry, take_profit, stop_loss)
+        if side == 0:
+            return None
+
+        tp_level = np.log(take_profit / self.entry)
+        sl_level = np.log(stop_loss / self.entry)
+        if side > 0:
+            tp_bar = self._first_bar(self.running_high >= tp_level)
+            sl_bar = self._first_bar(self.running_low <= sl_level)
+        else:
+            tp_bar = self._first_bar(self.running_low <= tp_level)
+            sl_bar = self._first_bar(self.running_high >= sl_level)
+
+        # Если за свечу задеты оба уровня, считаем, что первым сработал SL
+        hit_sl = sl_bar <= np.minimum(tp_bar, self.horizon)
+        hit_tp = (tp_bar <= self.horizon) & ~hit_sl
+        closed = hit_tp | hit_sl
+        exit_bar = np.where(hit_sl, sl_bar, tp_bar)[closed]
+        tp_share = np.mean(hit_tp)
+        sl_share = np.mean(hit_sl)
+
+        # Доходность сделки: уровень выхода или цена на конце горизонта для незакрытых путей
+        trade_return = np.where(hit_tp, tp_level, np.where(hit_sl, sl_level, self.final_position))
+
+        return {
+            'method': self.method,
+            'paths': self.paths,
+            'horizon': self.horizon,
+            'tp_probability': round(float(tp_share) * 100, 1),
+            'sl_probability': round(float(sl_share) * 100, 1),
+            'open_probability': round(float(np.mean(~closed)) * 100, 1),
+            'tp_first_probability': round(float(tp_share / (tp_share + sl_share)) * 100, 1) if closed.any() else None,
+            'expected_bars_to_exit': round(float(exit_bar.mean()), 1) if closed.any() else None,
+            'median_bars_to_exit': float(np.median(exit_bar)) if closed.any() else None,
+            'expected_return': round(float((side * np.expm1(trade_return)).mean()) * 100, 3)
+        }
+
+
+def simulate_exit(high, low, close, take_profit, stop_loss, method='bootstrap', atr=None,
+                  paths=DEFAULT_PATHS, horizon=DEFAULT_HORIZON, seed=None):
+    """
+    Оценивает вероятность достижения TP раньше SL и время до выхода из сделки
+    (отдельный набор путей для одной пары уровней, см. simulate_paths и SimulatedPaths.exit_stats).
+    """
+    if _trade_side(np.asarray(close, dtype=np.float64)[-1], take_profit, stop_loss) == 0:
+        return None
+    simulated = simulate_paths(high, low, close, method, atr, paths, horizon, seed)
+    return simulated.exit_stats(take_profit, stop_loss) if simulated is not None else None
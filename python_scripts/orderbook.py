@@ -0,0 +1,261 @@
+"""
+Стакан заявок (L2) Bybit с инкрементальными обновлениями.
+
+Каждая сторона стакана хранится в SortedDict (sortedcontainers): ключ цены -> объем.
+Ключ аска - цена, ключ бида - цена со знаком минус, поэтому лучший уровень
+обеих сторон всегда первый. Изменение, вставка и удаление уровня дельты - O(log n).
+Требуется пакет sortedcontainers (pip install sortedcontainers).
+
+Снимок берется через REST /v5/market/orderbook, дельты - из потока orderbook.{depth}.{symbol}
+(сообщения в формате Bybit v5 передаются в OrderBook.apply_message).
+Потоковое подключение требует пакет websocket-client (необязательная зависимость).
+"""
+import json
+import sys
+from itertools import islice
+
+import numpy as np
+from sortedcontainers import SortedDict
+
+from http_transport import shared_transport
+
+try:
+    import websocket
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+BYBIT_REST_URL = "https://api.bybit.com"
+BYBIT_STREAM_URL = "wss://stream.bybit.com/v5/public/spot"
+
+# Расстояния от средней цены для depth_at_distance по умолчанию (доли цены)
+DEFAULT_DEPTH_DISTANCES = (0.001, 0.005, 0.01)
+
+
+def _parse_levels(levels):
+    """Уровни Bybit [["price", "size"], ...] в массивы float64"""
+    if not levels:
+        return np.empty(0), np.empty(0)
+    array = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+    return array[:, 0], array[:, 1]
+
+
+class BookSide:
+    """Одна сторона стакана: ключи цен по возрастанию и объемы уровней"""
+
+    def __init__(self, is_bid):
+        self.sign = -1.0 if is_bid else 1.0
+        self.levels = SortedDict()
+
+    def __len__(self):
+        return len(self.levels)
+
+    @property
+    def prices(self):
+        return self.sign * np.fromiter(self.levels.keys(), dtype=np.float64, count=len(self.levels))
+
+    def reset(self, prices, sizes):
+        """Заменяет сторону снимком"""
+        keys = (self.sign * prices).tolist()
+        self.levels = SortedDict((key, size) for key, size in zip(keys, sizes.tolist()) if size > 0)
+
+    def apply(self, prices, sizes):
+        """
+        Применяет дельту: объем 0 удаляет уровень, иначе объем уровня заменяется.
+        При повторе цены в одном сообщении действует последнее значение.
+        """
+        levels = self.levels
+        for key, size in zip((self.sign * prices).tolist(), sizes.tolist()):
+            if size > 0:
+                levels[key] = size
+            else:
+                levels.pop(key, None)
+
+    def best(self):
+        """Лучшая цена и ее объем или (None, 0.0)"""
+        if not self.levels:
+            return None, 0.0
+        key, size = self.levels.peekitem(0)
+        return self.sign * key, size
+
+    def volume(self, levels=None):
+        """Суммарный объем лучших levels уровней (по умолчанию - всех)"""
+        return float(sum(islice(self.levels.values(), levels)))
+
+    def volume_within(self, price_limit):
+        """Объем уровней не дальше price_limit от лучшей цены"""
+        end = self.levels.bisect_right(self.sign * price_limit)
+        return float(sum(self.levels.values()[:end]))
+
+
+class OrderBook:
+    """L2 стакан одного символа"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.update_id = 0
+        self.timestamp = None
+
+    def apply_snapshot(self, data, timestamp=None):
+        """Загружает снимок стакана (поле result REST ответа или data сообщения snapshot)"""
+        self.bids.reset(*_parse_levels(data.get('b')))
+        self.asks.reset(*_parse_levels(data.get('a')))
+        self.update_id = int(data.get('u', 0))
+        self.timestamp = timestamp if timestamp is not None else data.get('ts')
+
+    def apply_delta(self, data, timestamp=None):
+        """Применяет дельту; устаревшие сообщения пропускаются"""
+        update_id = int(data.get('u', 0))
+        if update_id and update_id <= self.update_id:
+            return False
+
+        self.bids.apply(*_parse_levels(data.get('b')))
+        self.asks.apply(*_parse_levels(data.get('a')))
+        self.update_id = update_id or self.update_id
+        self.timestamp = timestamp
+        return True
+
+    def apply_message(self, message):
+        """
+        Обрабатывает сообщение потока orderbook Bybit v5.
+        Сообщение с u == 1 - новый снимок после переподключения сервиса.
+        """
+        data = message.get('data') or {}
+        if message.get('type') == 'snapshot' or int(data.get('u', 0)) == 1:
+            self.apply_snapshot(data, message.get('ts'))
+            return True
+        return self.apply_delta(data, message.get('ts'))
+
+    def mid_price(self):
+        """Средняя цена между лучшими бидом и аском"""
+        best_bid, _ = self.bids.best()
+        best_ask, _ = self.asks.best()
+        if best_bid is None or best_ask is None:
+            return None
+        return (best_bid + best_ask) / 2
+
+    def spread(self):
+        """Спред между лучшими аском и бидом"""
+        best_bid, _ = self.bids.best()
+        best_ask, _ = self.asks.best()
+        if best_bid is None or best_ask is None:
+            return None
+        return best_ask - best_bid
+
+    def microprice(self):
+        """Средняя цена, взвешенная объемами лучших уровней противоположных сторон"""
+        best_bid, bid_size = self.bids.best()
+        best_ask, ask_size = self.asks.best()
+        if best_bid is None or best_ask is None or bid_size + ask_size == 0:
+            return None
+        return (best_bid * ask_size + best_ask * bid_size) / (bid_size + ask_size)
+
+    def imbalance(self, levels=10):
+        """Дисбаланс объемов лучших levels уровней: от -1 (продавцы) до 1 (покупатели)"""
+        bid_volume = self.bids.volume(levels)
+        ask_volume = self.asks.volume(levels)
+        total = bid_volume + ask_volume
+        return (bid_volume - ask_volume) / total if total > 0 else 0.0
+
+    def depth_at_distance(self, distance):
+        """Объем бидов и асков в пределах distance (доля цены) от средней цены"""
+        mid = self.mid_price()
+        if mid is None:
+            return 0.0, 0.0
+        return self.bids.volume_within(mid * (1 - distance)), self.asks.volume_within(mid * (1 + distance))
+
+    def features(self, levels=10, distances=DEFAULT_DEPTH_DISTANCES):
+        """Признаки стакана для анализатора"""
+        mid = self.mid_price()
+        if mid is None:
+            return None
+
+        best_bid, _ = self.bids.best()
+        best_ask, _ = self.asks.best()
+        depth = {}
+        for distance in distances:
+            bid_depth, ask_depth = self.depth_at_distance(distance)
+            depth[f'{distance * 100:g}%'] = {'bids': round(bid_depth, 6), 'asks': round(ask_depth, 6)}
+
+        return {
+            'best_bid': float(best_bid),
+            'best_ask': float(best_ask),
+            'mid_price': round(float(mid), 6),
+            'spread': round(float(best_ask - best_bid), 6),
+            'microprice': round(float(self.microprice()), 6),
+            'imbalance': round(self.imbalance(levels), 4),
+            'imbalance_levels': levels,
+            'depth': depth,
+            'update_id': self.update_id,
+            'timestamp': self.timestamp
+        }
+
+
+def fetch_orderbook(symbol, limit=200, session=None, category='spot', base_url=BYBIT_REST_URL):
+    """Загружает снимок стакана через REST. Возвращает (OrderBook, error)"""
+    session = session or shared_transport()
+    try:
+        response = session.get(f"{base_url}/v5/market/orderbook",
+                               params={'category': category, 'symbol': symbol, 'limit': limit},
+                               timeout=10)
+        data = response.json()
+        if data['retCode'] != 0:
+            return None, data.get('retMsg', 'Unknown error')
+
+        book = OrderBook(symbol)
+        book.apply_snapshot(data['result'])
+        return book, None
+    except Exception as e:
+        return None, str(e)
+
+
+def stream_orderbook(symbol, depth=50, on_update=None):
+    """
+    Поддерживает стакан по потоку Bybit и вызывает on_update(book) после каждого сообщения.
+    """
+    if not WEBSOCKET_AVAILABLE:
+        raise ImportError("websocket-client is required for order book streaming")
+
+    book = OrderBook(symbol)
+    topic = f"orderbook.{depth}.{symbol}"
+
+    def on_open(ws):
+        ws.send(json.dumps({'op': 'subscribe', 'args': [topic]}))
+
+    def on_message(ws, raw):
+        message = json.loads(raw)
+        if message.get('topic') != topic:
+            return
+        if book.apply_message(message) and on_update is not None:
+            on_update(book)
+
+    ws = websocket.WebSocketApp(BYBIT_STREAM_URL, on_open=on_open, on_message=on_message)
+    ws.run_forever(ping_interval=20)
+    return book
+
+
+def main():
+    """Вывод признаков стакана: снимок или поток (--stream)"""
+    if len(sys.argv) < 2:
+        print("Usage: python orderbook.py <symbol> [--stream]")
+        sys.exit(1)
+
+    symbol = sys.argv[1].upper()
+    if not symbol.endswith('USDT'):
+        symbol += 'USDT'
+
+    if "--stream" in sys.argv:
+        stream_orderbook(symbol, on_update=lambda book: print(json.dumps(book.features()), flush=True))
+        return
+
+    book, error = fetch_orderbook(symbol)
+    if error:
+        print(json.dumps({"error": f"Failed to get order book: {error}"}, indent=2))
+        sys.exit(1)
+    print(json.dumps(book.features(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Определение режима рынка: тренд, флэт или высокая волатильность.
+
+Режим определяется по ADX, ATR в процентах от цены и реализованной волатильности
+(стандартное отклонение логарифмических доходностей за VOLATILITY_WINDOW свечей).
+ATR и волатильность сравниваются со своими средними за BASELINE_WINDOW свечей:
+- HIGH_VOLATILITY - одно из отношений не ниже HIGH_VOLATILITY_RATIO;
+- TREND - ADX не ниже ADX_TREND;
+- RANGE - остальные случаи.
+
+regime_series считает режим векторно по уже рассчитанным колонкам анализатора (история по свечам),
+RegimeDetector обновляет то же самое инкрементально на закрытии каждой свечи: анализатор
+заполняет его один раз хвостом истории, дальше достаточно update на каждую новую свечу.
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+REGIMES = ('TREND', 'RANGE', 'HIGH_VOLATILITY')
+
+ADX_TREND = 25
+HIGH_VOLATILITY_RATIO = 1.5
+VOLATILITY_WINDOW = 20
+BASELINE_WINDOW = 100
+
+# Свечей для начального заполнения детектора: сглаживание Уайлдера забывает начальное значение
+# за несколько сотен свечей, поэтому режим совпадает с расчетом по всей истории
+SEED_CANDLES = 1000
+
+
+def classify(adx, atr_ratio, volatility_ratio):
+    """Режим по ADX и отношениям ATR/волатильности к их средним (скаляры или массивы)"""
+    adx, atr_ratio, volatility_ratio = (np.asarray(values, dtype=np.float64)
+                                        for values in (adx, atr_ratio, volatility_ratio))
+    with np.errstate(invalid='ignore'):
+        high_volatility = (atr_ratio >= HIGH_VOLATILITY_RATIO) | (volatility_ratio >= HIGH_VOLATILITY_RATIO)
+        trend = adx >= ADX_TREND
+    return np.select([high_volatility, trend], ['HIGH_VOLATILITY', 'TREND'], 'RANGE')
+
+
+def regime_series(close, atr, adx):
+    """
+    Режим для каждой свечи по колонкам Close, atr и adx.
+
+    Returns:
+        (массив режимов, dict показателей последней свечи)
+    """
+    close = pd.Series(np.asarray(close, dtype=np.float64))
+    atr = np.asarray(atr, dtype=np.float64)
+
+    # Нули ATR в начале ряда - период прогрева, а не отсутствие волатильности
+    atr_pct = pd.Series(np.where(atr > 0, atr, np.nan) / close.to_numpy())
+    atr_ratio = atr_pct / atr_pct.rolling(BASELINE_WINDOW, min_periods=VOLATILITY_WINDOW).mean()
+
+    realized = np.log(close).diff().rolling(VOLATILITY_WINDOW).std()
+    volatility_ratio = realized / realized.rolling(BASELINE_WINDOW, min_periods=VOLATILITY_WINDOW).mean()
+
+    adx = np.asarray(adx, dtype=np.float64)
+    regimes = classify(adx, atr_ratio, volatility_ratio)
+
+    def last(values):
+        value = float(np.asarray(values)[-1]) if len(values) else np.nan
+        return None if np.isnan(value) else round(value, 4)
+
+    return regimes, {
+        'regime': str(regimes[-1]) if len(regimes) else 'RANGE',
+        'adx': last(adx),
+        'atr_ratio': last(atr_ratio),
+        'volatility_ratio': last(volatility_ratio),
+        'realized_volatility': last(realized)
+    }
+
+
+class _RollingMean:
+    """Скользящее среднее с O(1) обновлением"""
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def add(self, value):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def mean(self):
+        return self.total / len(self.values) if self.values else np.nan
+
+
+class RegimeDetector:
+    """
+    Инкрементальный детектор режима: ATR и ADX со сглаживанием Уайлдера,
+    реализованная волатильность и средние по скользящим окнам обновляются за O(1) на свечу.
+    """
+
+    def __init__(self, window=14):
+        self.window = window
+        self.candles = 0
+        self.prev_high = self.prev_low = self.prev_close = None
+
+        self._tr_seed = []
+        self._dx_seed = []
+        self.atr = None
+        self._tr_sum = self._plus_dm_sum = self._minus_dm_sum = None
+        self._dm_seed = []
+        self.adx = None
+
+        self._returns = deque(maxlen=VOLATILITY_WINDOW)
+        self._returns_sum = 0.0
+        self._returns_sumsq = 0.0
+        self._atr_baseline = _RollingMean(BASELINE_WINDOW)
+        self._volatility_baseline = _RollingMean(BASELINE_WINDOW)
+
+        self.atr_ratio = np.nan
+        self.volatility_ratio = np.nan
+        self.realized_volatility = np.nan
+        self.regime = 'RANGE'
+
+    @classmethod
+    def from_candles(cls, high, low, close, seed_candles=SEED_CANDLES):
+        """Детектор, заполненный последними seed_candles свечами истории"""
+        detector = cls()
+        for values in zip(*(np.asarray(series, dtype=np.float64)[-seed_candles:].tolist()
+                             for series in (high, low, close))):
+            detector.update(*values)
+        return detector
+
+    def _update_atr(self, true_range):
+        """ATR: среднее первых window значений TR, затем сглаживание Уайлдера"""
+        if self.atr is None:
+            self._tr_seed.append(true_range)
+            if len(self._tr_seed) == self.window:
+                self.atr = float(np.mean(self._tr_seed))
+            return
+        self.atr = (self.atr * (self.window - 1) + true_range) / self.window
+
+    def _update_adx(self, true_range, plus_dm, minus_dm):
+        """ADX по сглаженным суммам TR и направленных движений"""
+        if self._tr_sum is None:
+            self._dm_seed.append((true_range, plus_dm, minus_dm))
+            if len(self._dm_seed) == self.window:
+                self._tr_sum, self._plus_dm_sum, self._minus_dm_sum = np.sum(self._dm_seed, axis=0)
+            else:
+                return
+        else:
+            self._tr_sum += true_range - self._tr_sum / self.window
+            self._plus_dm_sum += plus_dm - self._plus_dm_sum / self.window
+            self._minus_dm_sum += minus_dm - self._minus_dm_sum / self.window
+
+        if self._tr_sum <= 0:
+            return
+        plus_di = 100 * self._plus_dm_sum / self._tr_sum
+        minus_di = 100 * self._minus_dm_sum / self._tr_sum
+        di_sum = plus_di + minus_di
+        dx = 100 * abs(plus_di - minus_di) / di_sum if di_sum else 0.0
+
+        if self.adx is None:
+            self._dx_seed.append(dx)
+            if len(self._dx_seed) == self.window:
+                self.adx = float(np.mean(self._dx_seed))
+            return
+        self.adx = (self.adx * (self.window - 1) + dx) / self.window
+
+    def _update_volatility(self, log_return):
+        """Реализованная волатильность за VOLATILITY_WINDOW свечей"""
+        if len(self._returns) == self._returns.maxlen:
+            oldest = self._returns[0]
+            self._returns_sum -= oldest
+            self._returns_sumsq -= oldest * oldest
+        self._returns.append(log_return)
+        self._returns_sum += log_return
+        self._returns_sumsq += log_return * log_return
+
+        count = len(self._returns)
+        if count < VOLATILITY_WINDOW:
+            return None
+        variance = (self._returns_sumsq - self._returns_sum ** 2 / count) / (count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def update(self, high, low, close):
+        """Обрабатывает закрытую свечу и возвращает текущий режим"""
+        self.candles += 1
+        if self.prev_close is None:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            return self.regime
+
+        true_range = max(high, self.prev_close) - min(low, self.prev_close)
+        up_move = high - self.prev_high
+        down_move = self.prev_low - low
+        plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+        minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+
+        self._update_atr(true_range)
+        self._update_adx(true_range, plus_dm, minus_dm)
+        realized = self._update_volatility(np.log(close / self.prev_close))
+
+        if self.atr is not None and self.atr > 0:
+            atr_pct = self.atr / close
+            self._atr_baseline.add(atr_pct)
+            if len(self._atr_baseline.values) >= VOLATILITY_WINDOW:
+                self.atr_ratio = atr_pct / self._atr_baseline.mean()
+        if realized is not None:
+            self.realized_volatility = realized
+            self._volatility_baseline.add(realized)
+            if len(self._volatility_baseline.values) >= VOLATILITY_WINDOW:
+                self.volatility_ratio = realized / self._volatility_baseline.mean()
+
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        adx = self.adx if self.adx is not None else np.nan
+        self.regime = str(classify(adx, self.atr_ratio, self.volatility_ratio))
+        return self.regime
+
+    def to_dict(self):
+        """Текущий режим и показатели"""
+        def rounded(value):
+            return None if value is None or np.isnan(value) else round(float(value), 4)
+
+        return {
+            'regime': self.regime,
+            'adx': rounded(self.adx),
+            'atr_ratio': rounded(self.atr_ratio),
+            'volatility_ratio': rounded(self.volatility_ratio),
+            'realized_volatility': rounded(self.realized_volatility),
+            'candles': self.candles
+        }
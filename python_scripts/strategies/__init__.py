@@ -0,0 +1,90 @@
+"""
+Реестр торговых стратегий.
+
+Каждая стратегия - отдельный модуль пакета, который объявляет:
+    KEY                  - ключ стратегии ('RSI_MACD', 'MA', ...)
+    NAME                 - название для вывода
+    REQUIRED_INDICATORS  - группы индикаторов, нужные стратегии
+    PARAMETERS           - пороги и множители стратегии
+    WEIGHT               - вес стратегии в compare_strategies
+    REGIME_WEIGHTS       - веса по режимам рынка (TREND, RANGE, HIGH_VOLATILITY), необязательно
+    analyze(data, params=None) - сигнал по последней свече
+    signals(data, params=None) - сигналы по всем свечам (bullish, bearish, confidence, tp, sl)
+
+Модули импортируются только при первом обращении, поэтому новые стратегии
+не замедляют запуск и анализ по остальным стратегиям.
+"""
+import importlib
+
+# Ключ стратегии -> модуль пакета. Порядок совпадает с номерами в меню csv_file_analysis
+STRATEGY_MODULES = {
+    'RSI_MACD': 'rsi_macd',
+    'MA': 'moving_averages',
+    'BB': 'bollinger_bands',
+    'STOCH_EMA': 'stochastic_ema',
+    'SAR_ADX': 'parabolic_sar',
+    'BREAKOUT': 'breakout'
+}
+
+_loaded_strategies = {}
+
+
+def register_strategy(key, module_path):
+    """
+    Регистрирует стратегию из произвольного модуля без его импорта.
+
+    Args:
+        key: ключ стратегии
+        module_path: полный путь модуля или имя модуля внутри пакета strategies
+    """
+    STRATEGY_MODULES[key.upper()] = module_path
+    _loaded_strategies.pop(key.upper(), None)
+
+
+def strategy_keys():
+    """Ключи всех зарегистрированных стратегий в порядке регистрации"""
+    return list(STRATEGY_MODULES)
+
+
+def resolve_strategy_key(key):
+    """
+    Приводит ключ стратегии к ключу реестра.
+    Принимает ключ ('rsi_macd', 'MA') или номер стратегии в меню ('1'..'6').
+    Возвращает None для неизвестной стратегии.
+    """
+    key = str(key).strip().upper()
+    if key in STRATEGY_MODULES:
+        return key
+
+    keys = strategy_keys()
+    if key.isdigit() and 1 <= int(key) <= len(keys):
+        return keys[int(key) - 1]
+    return None
+
+
+def load_strategy(key):
+    """Импортирует модуль стратегии при первом обращении и возвращает его"""
+    strategy_key = resolve_strategy_key(key)
+    if strategy_key is None:
+        raise KeyError(f"Unknown strategy: {key}")
+
+    if strategy_key not in _loaded_strategies:
+        module_path = STRATEGY_MODULES[strategy_key]
+        if '.' not in module_path:
+            module_path = f"{__name__}.{module_path}"
+        _loaded_strategies[strategy_key] = importlib.import_module(module_path)
+
+    return _loaded_strategies[strategy_key]
+
+
+def strategy_weight(strategy, regime=None):
+    """Вес стратегии в режиме рынка regime (без режима - базовый WEIGHT)"""
+    return getattr(strategy, 'REGIME_WEIGHTS', {}).get(regime, strategy.WEIGHT)
+
+
+def required_indicators(keys):
+    """Объединение групп индикаторов, нужных перечисленным стратегиям"""
+    indicators = set()
+    for key in keys:
+        indicators.update(load_strategy(key).REQUIRED_INDICATORS)
+    return indicators
@@ -0,0 +1,40 @@
+"""Общие функции для модулей стратегий"""
+import numpy as np
+
+
+def empty_result(strategy_name):
+    """Возвращает пустой результат для стратегии"""
+    return {
+        'strategy': strategy_name,
+        'direction': "NO_DATA",
+        'confidence': "LOW",
+        'take_profit': 0,
+        'stop_loss': 0,
+        'current_price': 0,
+        'details': {'error': 'Not enough data for analysis'}
+    }
+
+
+def column(data, name):
+    """Колонка таблицы в виде массива float64"""
+    return data[name].to_numpy(dtype=np.float64)
+
+
+def previous(values):
+    """Значения предыдущей свечи (для первой свечи - NaN)"""
+    return np.concatenate(([np.nan], values[:-1]))
+
+
+def crosses(fast, slow):
+    """Пересечения вверх и вниз линии fast через линию slow"""
+    prev_fast, prev_slow = previous(fast), previous(slow)
+    cross_up = (fast > slow) & (prev_fast <= prev_slow)
+    cross_down = (fast < slow) & (prev_fast >= prev_slow)
+    return cross_up, cross_down
+
+
+def atr_targets(bullish, bearish, close, atr, tp_mult, sl_mult):
+    """TP/SL на расстоянии в ATR от цены, для нейтральных свечей - текущая цена"""
+    tp = np.select([bullish, bearish], [close + tp_mult * atr, close - tp_mult * atr], close)
+    sl = np.select([bullish, bearish], [close - sl_mult * atr, close + sl_mult * atr], close)
+    return tp, sl
@@ -0,0 +1,85 @@
+"""Стратегия Bollinger Bands"""
+import numpy as np
+
+from strategies.base import column, empty_result
+
+KEY = 'BB'
+NAME = 'Bollinger Bands'
+REQUIRED_INDICATORS = ['bollinger']
+PARAMETERS = {
+    'take_profit_range': 0.5,
+    'stop_loss_range': 0.25
+}
+WEIGHT = 0.8
+REGIME_WEIGHTS = {'TREND': 0.5, 'RANGE': 1.3, 'HIGH_VOLATILITY': 0.6}
+
+
+def analyze(data, params=None):
+    """Сигнал стратегии по последней свече"""
+    params = {**PARAMETERS, **(params or {})}
+    if len(data) == 0:
+        return empty_result(KEY)
+
+    current = data.iloc[-1]
+    current_price = current['Close']
+
+    # Анализ положения цены относительно полос
+    if current_price <= current['bb_lower']:
+        bb_signal = "LOWER_BAND_OVERSOLD"
+        direction = "BULLISH"
+        confidence = "HIGH"
+    elif current_price >= current['bb_upper']:
+        bb_signal = "UPPER_BAND_OVERBOUGHT"
+        direction = "BEARISH"
+        confidence = "HIGH"
+    else:
+        bb_signal = "INSIDE_BANDS"
+        direction = "NEUTRAL"
+        confidence = "LOW"
+
+    # Расчет TP/SL на основе ширины полос
+    bb_range = current['bb_upper'] - current['bb_lower']
+
+    if direction == "BULLISH":
+        tp = current_price + (params['take_profit_range'] * bb_range)
+        sl = current_price - (params['stop_loss_range'] * bb_range)
+    elif direction == "BEARISH":
+        tp = current_price - (params['take_profit_range'] * bb_range)
+        sl = current_price + (params['stop_loss_range'] * bb_range)
+    else:
+        tp = sl = current_price
+
+    return {
+        'strategy': KEY,
+        'direction': direction,
+        'confidence': confidence,
+        'take_profit': round(tp, 6),
+        'stop_loss': round(sl, 6),
+        'current_price': round(current_price, 6),
+        'details': {
+            'bb_signal': bb_signal,
+            'bb_upper': round(current['bb_upper'], 6),
+            'bb_lower': round(current['bb_lower'], 6),
+            'bb_middle': round(current['bb_middle'], 6),
+            'bb_width': round((bb_range / current['bb_middle']) * 100, 2)
+        }
+    }
+
+
+def signals(data, params=None):
+    """Векторная версия analyze для всех свечей"""
+    params = {**PARAMETERS, **(params or {})}
+    close = column(data, 'Close')
+    upper = column(data, 'bb_upper')
+    lower = column(data, 'bb_lower')
+    bb_range = upper - lower
+
+    bullish = close <= lower
+    bearish = ~bullish & (close >= upper)
+    confidence = np.where(bullish | bearish, 'HIGH', 'LOW')
+
+    tp_offset = params['take_profit_range'] * bb_range
+    sl_offset = params['stop_loss_range'] * bb_range
+    tp = np.select([bullish, bearish], [close + tp_offset, close - tp_offset], close)
+    sl = np.select([bullish, bearish], [close - sl_offset, close + sl_offset], close)
+    return bullish, bearish, confidence, tp, sl
@@ -0,0 +1,161 @@
+"""Стратегия пробоя уровней поддержки/сопротивления"""
+import numpy as np
+
+from strategies.base import column, empty_result
+
+KEY = 'BREAKOUT'
+NAME = 'Пробой уровня'
+REQUIRED_INDICATORS = ['support_resistance', 'atr', 'vwap']
+PARAMETERS = {
+    'lookback_period': 10,
+    'stop_loss_range': 0.1,
+    'neutral_atr': 2
+}
+WEIGHT = 1.3
+REGIME_WEIGHTS = {'TREND': 1.2, 'RANGE': 1.0, 'HIGH_VOLATILITY': 1.6}
+
+
+def detect_breakout(df, lookback_period=10):
+    """
+    Обнаружение пробоев уровней.
+
+    Пробой подтверждается объемом выше среднего за lookback_period и закрытием
+    по ту же сторону от VWAP сессии (если колонка vwap рассчитана).
+    """
+    if len(df) == 0:
+        return False, False, 0, 0
+
+    current = df.iloc[-1]
+    current_close = current['Close']
+    current_high = current['High']
+    current_low = current['Low']
+
+    # Диапазон консолидации - по предыдущим свечам, иначе максимум включает текущую свечу и пробоя не бывает
+    recent_data = df.iloc[:-1].tail(lookback_period) if len(df) > 1 else df
+    consolidation_high = recent_data['High'].max()
+    consolidation_low = recent_data['Low'].min()
+    high_volume = 'Volume' in current and current['Volume'] > recent_data['Volume'].mean()
+    above_vwap = 'vwap' not in current or current_close > current['vwap']
+    below_vwap = 'vwap' not in current or current_close < current['vwap']
+
+    # Проверяем пробой сопротивления
+    resistance_break = False
+    if not np.isnan(current['nearest_resistance']):
+        if (current_close > current['nearest_resistance'] and
+                current_high > consolidation_high and
+                high_volume and above_vwap):
+            resistance_break = True
+
+    # Проверяем пробой поддержки
+    support_break = False
+    if not np.isnan(current['nearest_support']):
+        if (current_close < current['nearest_support'] and
+                current_low < consolidation_low and
+                high_volume and below_vwap):
+            support_break = True
+
+    return resistance_break, support_break, consolidation_high, consolidation_low
+
+
+def analyze(data, params=None):
+    """Сигнал стратегии по последней свече"""
+    params = {**PARAMETERS, **(params or {})}
+    if len(data) == 0:
+        return empty_result(KEY)
+
+    current = data.iloc[-1]
+    current_price = current['Close']
+
+    resistance_break, support_break, consolidation_high, consolidation_low = detect_breakout(
+        data, params['lookback_period'])
+
+    # Определение направления
+    if resistance_break:
+        direction = "BULLISH"
+        confidence = "HIGH"
+        breakout_type = "RESISTANCE_BREAKOUT"
+        breakout_level = current['nearest_resistance']
+    elif support_break:
+        direction = "BEARISH"
+        confidence = "HIGH"
+        breakout_type = "SUPPORT_BREAKOUT"
+        breakout_level = current['nearest_support']
+    else:
+        direction = "NEUTRAL"
+        confidence = "LOW"
+        breakout_type = "CONSOLIDATION"
+        breakout_level = None
+
+    # Расчет целей
+    consolidation_range = consolidation_high - consolidation_low
+
+    if direction == "BULLISH" and breakout_level:
+        tp = breakout_level + consolidation_range
+        sl = min(consolidation_low, breakout_level - (consolidation_range * params['stop_loss_range']))
+    elif direction == "BEARISH" and breakout_level:
+        tp = breakout_level - consolidation_range
+        sl = max(consolidation_high, breakout_level + (consolidation_range * params['stop_loss_range']))
+    else:
+        if 'atr' in current:
+            tp = current_price + (params['neutral_atr'] * current['atr'])
+            sl = current_price - (params['neutral_atr'] * current['atr'])
+        else:
+            tp = current_price * 1.02
+            sl = current_price * 0.98
+
+    return {
+        'strategy': KEY,
+        'direction': direction,
+        'confidence': confidence,
+        'take_profit': round(tp, 6),
+        'stop_loss': round(sl, 6),
+        'current_price': round(current_price, 6),
+        'details': {
+            'breakout_type': breakout_type,
+            'breakout_level': round(breakout_level, 6) if breakout_level else None,
+            'consolidation_range': round(consolidation_range, 6),
+            'vwap': round(current['vwap'], 6) if 'vwap' in current else None,
+            'nearest_support': round(current['nearest_support'], 6) if not np.isnan(current['nearest_support']) else None,
+            'nearest_resistance': round(current['nearest_resistance'], 6) if not np.isnan(current['nearest_resistance']) else None
+        }
+    }
+
+
+def prior_window(values, lookback_period, how):
+    """Статистика по lookback_period предыдущим свечам (для первой свечи - по ней самой)"""
+    rolling = getattr(values.rolling(lookback_period, min_periods=1), how)()
+    return rolling.shift(1).fillna(values).to_numpy(dtype=np.float64)
+
+
+def signals(data, params=None):
+    """Векторная версия analyze для всех свечей"""
+    params = {**PARAMETERS, **(params or {})}
+    lookback_period = params['lookback_period']
+    close = column(data, 'Close')
+    atr = column(data, 'atr')
+    nearest_resistance = column(data, 'nearest_resistance')
+    nearest_support = column(data, 'nearest_support')
+    volume = column(data, 'Volume')
+    vwap = column(data, 'vwap')
+
+    consolidation_high = prior_window(data['High'], lookback_period, 'max')
+    consolidation_low = prior_window(data['Low'], lookback_period, 'min')
+    volume_mean = prior_window(data['Volume'], lookback_period, 'mean')
+    consolidation_range = consolidation_high - consolidation_low
+    high_volume = volume > volume_mean
+
+    bullish = ((close > nearest_resistance) & (column(data, 'High') > consolidation_high) & high_volume &
+               (close > vwap))
+    bearish = (~bullish & (close < nearest_support) & (column(data, 'Low') < consolidation_low) & high_volume &
+               (close < vwap))
+    confidence = np.where(bullish | bearish, 'HIGH', 'LOW')
+
+    stop_offset = consolidation_range * params['stop_loss_range']
+    tp = np.select([bullish, bearish],
+                   [nearest_resistance + consolidation_range, nearest_support - consolidation_range],
+                   close + params['neutral_atr'] * atr)
+    sl = np.select([bullish, bearish],
+                   [np.minimum(consolidation_low, nearest_resistance - stop_offset),
+                    np.maximum(consolidation_high, nearest_support + stop_offset)],
+                   close - params['neutral_atr'] * atr)
+    return bullish, bearish, confidence, tp, sl
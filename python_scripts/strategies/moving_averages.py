@@ -0,0 +1,89 @@
+"""Стратегия скользящих средних"""
+import numpy as np
+
+from strategies.base import atr_targets, column, crosses, empty_result
+
+KEY = 'MA'
+NAME = 'Скользящие средние'
+REQUIRED_INDICATORS = ['sma', 'ema', 'atr']
+PARAMETERS = {
+    'take_profit_atr': 3,
+    'stop_loss_atr': 1.5
+}
+WEIGHT = 1.2
+REGIME_WEIGHTS = {'TREND': 1.6, 'RANGE': 0.7, 'HIGH_VOLATILITY': 1.0}
+
+
+def analyze(data, params=None):
+    """Сигнал стратегии по последней свече"""
+    params = {**PARAMETERS, **(params or {})}
+    if len(data) < 2:
+        return empty_result(KEY)
+
+    current = data.iloc[-1]
+    prev = data.iloc[-2]
+    current_price = current['Close']
+
+    # Сигналы от SMA
+    sma_signal = "NEUTRAL"
+    if current['sma_20'] > current['sma_50'] and prev['sma_20'] <= prev['sma_50']:
+        sma_signal = "GOLDEN_CROSS_BULLISH"
+    elif current['sma_20'] < current['sma_50'] and prev['sma_20'] >= prev['sma_50']:
+        sma_signal = "DEATH_CROSS_BEARISH"
+
+    # Сигналы от EMA
+    ema_signal = "BULLISH" if current['ema_12'] > current['ema_26'] else "BEARISH"
+
+    # Общий сигнал
+    if "BULLISH" in sma_signal and ema_signal == "BULLISH":
+        direction = "BULLISH"
+        confidence = "HIGH"
+    elif "BEARISH" in sma_signal and ema_signal == "BEARISH":
+        direction = "BEARISH"
+        confidence = "HIGH"
+    else:
+        direction = "NEUTRAL"
+        confidence = "MEDIUM"
+
+    # Расчет TP/SL
+    atr = current['atr']
+
+    if direction == "BULLISH":
+        tp = current_price + (params['take_profit_atr'] * atr)
+        sl = current_price - (params['stop_loss_atr'] * atr)
+    elif direction == "BEARISH":
+        tp = current_price - (params['take_profit_atr'] * atr)
+        sl = current_price + (params['stop_loss_atr'] * atr)
+    else:
+        tp = sl = current_price
+
+    return {
+        'strategy': KEY,
+        'direction': direction,
+        'confidence': confidence,
+        'take_profit': round(tp, 6),
+        'stop_loss': round(sl, 6),
+        'current_price': round(current_price, 6),
+        'details': {
+            'sma_signal': sma_signal,
+            'ema_signal': ema_signal,
+            'sma_20': round(current['sma_20'], 6),
+            'sma_50': round(current['sma_50'], 6),
+            'atr': round(atr, 6)
+        }
+    }
+
+
+def signals(data, params=None):
+    """Векторная версия analyze для всех свечей"""
+    params = {**PARAMETERS, **(params or {})}
+    close = column(data, 'Close')
+    golden_cross, death_cross = crosses(column(data, 'sma_20'), column(data, 'sma_50'))
+    ema_bullish = column(data, 'ema_12') > column(data, 'ema_26')
+
+    bullish = golden_cross & ema_bullish
+    bearish = death_cross & ~ema_bullish
+    confidence = np.where(bullish | bearish, 'HIGH', 'MEDIUM')
+    tp, sl = atr_targets(bullish, bearish, close, column(data, 'atr'),
+                         params['take_profit_atr'], params['stop_loss_atr'])
+    return bullish, bearish, confidence, tp, sl
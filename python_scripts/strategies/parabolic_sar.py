@@ -0,0 +1,78 @@
+"""Стратегия Parabolic SAR + ADX"""
+import numpy as np
+
+from strategies.base import column, empty_result
+
+KEY = 'SAR_ADX'
+NAME = 'Parabolic SAR + ADX'
+REQUIRED_INDICATORS = ['parabolic_sar', 'adx', 'atr']
+PARAMETERS = {
+    'adx_strong': 25,
+    'adx_very_strong': 40,
+    'take_profit_atr': 4
+}
+WEIGHT = 1.1
+REGIME_WEIGHTS = {'TREND': 1.5, 'RANGE': 0.6, 'HIGH_VOLATILITY': 1.0}
+
+
+def analyze(data, params=None):
+    """Сигнал стратегии по последней свече"""
+    params = {**PARAMETERS, **(params or {})}
+    if len(data) == 0:
+        return empty_result(KEY)
+
+    current = data.iloc[-1]
+    current_price = current['Close']
+
+    # Сигналы Parabolic SAR
+    sar_signal = "BULLISH_TREND" if current_price > current['parabolic_sar'] else "BEARISH_TREND"
+    direction = "BULLISH" if current_price > current['parabolic_sar'] else "BEARISH"
+
+    # Сигналы ADX
+    adx_strength = "WEAK"
+    if current['adx'] > params['adx_very_strong']:
+        adx_strength = "VERY_STRONG"
+    elif current['adx'] > params['adx_strong']:
+        adx_strength = "STRONG"
+
+    confidence = "HIGH" if adx_strength != "WEAK" else "LOW"
+
+    # Расчет TP/SL
+    atr = current['atr']
+
+    if direction == "BULLISH":
+        tp = current_price + (params['take_profit_atr'] * atr)
+        sl = current['parabolic_sar']
+    else:
+        tp = current_price - (params['take_profit_atr'] * atr)
+        sl = current['parabolic_sar']
+
+    return {
+        'strategy': KEY,
+        'direction': direction,
+        'confidence': confidence,
+        'take_profit': round(tp, 6),
+        'stop_loss': round(sl, 6),
+        'current_price': round(current_price, 6),
+        'details': {
+            'sar_signal': sar_signal,
+            'sar_value': round(current['parabolic_sar'], 6),
+            'adx': round(current['adx'], 2),
+            'adx_strength': adx_strength,
+            'atr': round(atr, 6)
+        }
+    }
+
+
+def signals(data, params=None):
+    """Векторная версия analyze для всех свечей"""
+    params = {**PARAMETERS, **(params or {})}
+    close = column(data, 'Close')
+    atr = column(data, 'atr')
+    sar = column(data, 'parabolic_sar')
+
+    bullish = close > sar
+    bearish = ~bullish
+    confidence = np.where(column(data, 'adx') > params['adx_strong'], 'HIGH', 'LOW')
+    tp = np.where(bullish, close + params['take_profit_atr'] * atr, close - params['take_profit_atr'] * atr)
+    return bullish, bearish, confidence, tp, sar
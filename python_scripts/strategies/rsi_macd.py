@@ -0,0 +1,94 @@
+"""Стратегия RSI + MACD"""
+import numpy as np
+
+from strategies.base import atr_targets, column, crosses, empty_result
+
+KEY = 'RSI_MACD'
+NAME = 'RSI + MACD'
+REQUIRED_INDICATORS = ['rsi', 'macd', 'atr']
+PARAMETERS = {
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    'take_profit_atr': 2,
+    'stop_loss_atr': 1
+}
+WEIGHT = 1.0
+REGIME_WEIGHTS = {'TREND': 1.0, 'RANGE': 1.1, 'HIGH_VOLATILITY': 0.8}
+
+
+def analyze(data, params=None):
+    """Сигнал стратегии по последней свече"""
+    params = {**PARAMETERS, **(params or {})}
+    if len(data) < 2:
+        return empty_result(KEY)
+
+    current = data.iloc[-1]
+    prev = data.iloc[-2]
+    current_price = current['Close']
+
+    # Сигналы RSI
+    rsi_signal = "NEUTRAL"
+    if current['rsi'] < params['rsi_oversold']:
+        rsi_signal = "OVERSOLD_BULLISH"
+    elif current['rsi'] > params['rsi_overbought']:
+        rsi_signal = "OVERBOUGHT_BEARISH"
+
+    # Сигналы MACD
+    macd_signal = "NEUTRAL"
+    if current['macd'] > current['macd_signal'] and prev['macd'] <= prev['macd_signal']:
+        macd_signal = "CROSS_UP_BULLISH"
+    elif current['macd'] < current['macd_signal'] and prev['macd'] >= prev['macd_signal']:
+        macd_signal = "CROSS_DOWN_BEARISH"
+
+    # Общий сигнал
+    if "BULLISH" in rsi_signal and "BULLISH" in macd_signal:
+        direction = "BULLISH"
+        confidence = "HIGH"
+    elif "BEARISH" in rsi_signal and "BEARISH" in macd_signal:
+        direction = "BEARISH"
+        confidence = "HIGH"
+    else:
+        direction = "NEUTRAL"
+        confidence = "LOW"
+
+    # Расчет TP/SL
+    atr = current['atr']
+
+    if direction == "BULLISH":
+        tp = current_price + (params['take_profit_atr'] * atr)
+        sl = current_price - (params['stop_loss_atr'] * atr)
+    elif direction == "BEARISH":
+        tp = current_price - (params['take_profit_atr'] * atr)
+        sl = current_price + (params['stop_loss_atr'] * atr)
+    else:
+        tp = sl = current_price
+
+    return {
+        'strategy': KEY,
+        'direction': direction,
+        'confidence': confidence,
+        'take_profit': round(tp, 6),
+        'stop_loss': round(sl, 6),
+        'current_price': round(current_price, 6),
+        'details': {
+            'rsi_value': round(current['rsi'], 2),
+            'rsi_signal': rsi_signal,
+            'macd_signal': macd_signal,
+            'atr': round(atr, 6)
+        }
+    }
+
+
+def signals(data, params=None):
+    """Векторная версия analyze для всех свечей"""
+    params = {**PARAMETERS, **(params or {})}
+    close = column(data, 'Close')
+    rsi = column(data, 'rsi')
+    cross_up, cross_down = crosses(column(data, 'macd'), column(data, 'macd_signal'))
+
+    bullish = (rsi < params['rsi_oversold']) & cross_up
+    bearish = (rsi > params['rsi_overbought']) & cross_down
+    confidence = np.where(bullish | bearish, 'HIGH', 'LOW')
+    tp, sl = atr_targets(bullish, bearish, close, column(data, 'atr'),
+                         params['take_profit_atr'], params['stop_loss_atr'])
+    return bullish, bearish, confidence, tp, sl
@@ -0,0 +1,103 @@
+"""Стратегия Stochastic + EMA"""
+import numpy as np
+
+from strategies.base import atr_targets, column, crosses, empty_result
+
+KEY = 'STOCH_EMA'
+NAME = 'Stochastic + EMA'
+REQUIRED_INDICATORS = ['stochastic', 'ema', 'atr']
+PARAMETERS = {
+    'stoch_oversold': 20,
+    'stoch_overbought': 80,
+    'take_profit_atr': 2.5,
+    'stop_loss_atr': 1.2
+}
+WEIGHT = 0.9
+REGIME_WEIGHTS = {'TREND': 0.8, 'RANGE': 1.1, 'HIGH_VOLATILITY': 0.8}
+
+
+def analyze(data, params=None):
+    """Сигнал стратегии по последней свече"""
+    params = {**PARAMETERS, **(params or {})}
+    if len(data) < 2:
+        return empty_result(KEY)
+
+    current = data.iloc[-1]
+    prev = data.iloc[-2]
+    current_price = current['Close']
+    oversold, overbought = params['stoch_oversold'], params['stoch_overbought']
+
+    # Сигналы Stochastic
+    stoch_signal = "NEUTRAL"
+    if current['stoch_k'] < oversold and current['stoch_d'] < oversold:
+        stoch_signal = "OVERSOLD_BULLISH"
+    elif current['stoch_k'] > overbought and current['stoch_d'] > overbought:
+        stoch_signal = "OVERBOUGHT_BEARISH"
+    elif current['stoch_k'] > current['stoch_d'] and prev['stoch_k'] <= prev['stoch_d']:
+        stoch_signal = "CROSS_UP_BULLISH"
+    elif current['stoch_k'] < current['stoch_d'] and prev['stoch_k'] >= prev['stoch_d']:
+        stoch_signal = "CROSS_DOWN_BEARISH"
+
+    # Сигналы EMA
+    ema_signal = "BULLISH" if current['Close'] > current['ema_12'] else "BEARISH"
+
+    # Общий сигнал
+    if "BULLISH" in stoch_signal and ema_signal == "BULLISH":
+        direction = "BULLISH"
+        confidence = "HIGH"
+    elif "BEARISH" in stoch_signal and ema_signal == "BEARISH":
+        direction = "BEARISH"
+        confidence = "HIGH"
+    else:
+        direction = "NEUTRAL"
+        confidence = "MEDIUM"
+
+    # Расчет TP/SL
+    atr = current['atr']
+
+    if direction == "BULLISH":
+        tp = current_price + (params['take_profit_atr'] * atr)
+        sl = current_price - (params['stop_loss_atr'] * atr)
+    elif direction == "BEARISH":
+        tp = current_price - (params['take_profit_atr'] * atr)
+        sl = current_price + (params['stop_loss_atr'] * atr)
+    else:
+        tp = sl = current_price
+
+    return {
+        'strategy': KEY,
+        'direction': direction,
+        'confidence': confidence,
+        'take_profit': round(tp, 6),
+        'stop_loss': round(sl, 6),
+        'current_price': round(current_price, 6),
+        'details': {
+            'stoch_signal': stoch_signal,
+            'stoch_k': round(current['stoch_k'], 2),
+            'stoch_d': round(current['stoch_d'], 2),
+            'ema_signal': ema_signal,
+            'atr': round(atr, 6)
+        }
+    }
+
+
+def signals(data, params=None):
+    """Векторная версия analyze для всех свечей"""
+    params = {**PARAMETERS, **(params or {})}
+    close = column(data, 'Close')
+    stoch_k = column(data, 'stoch_k')
+    stoch_d = column(data, 'stoch_d')
+    cross_up, cross_down = crosses(stoch_k, stoch_d)
+
+    oversold = (stoch_k < params['stoch_oversold']) & (stoch_d < params['stoch_oversold'])
+    overbought = (stoch_k > params['stoch_overbought']) & (stoch_d > params['stoch_overbought'])
+    stoch_bullish = oversold | (~overbought & cross_up)
+    stoch_bearish = overbought | (~oversold & cross_down)
+    ema_bullish = close > column(data, 'ema_12')
+
+    bullish = stoch_bullish & ema_bullish
+    bearish = stoch_bearish & ~ema_bullish
+    confidence = np.where(bullish | bearish, 'HIGH', 'MEDIUM')
+    tp, sl = atr_targets(bullish, bearish, close, column(data, 'atr'),
+                         params['take_profit_atr'], params['stop_loss_atr'])
+    return bullish, bearish, confidence, tp, sl
@@ -0,0 +1,246 @@
+"""
+Уровни поддержки и сопротивления по локальным экстремумам (свингам).
+
+Свинг-максимум - свеча, максимум которой не ниже максимумов window // 2 свечей с каждой стороны
+(аналогично для минимумов). Свинг подтверждается только через window // 2 свечей,
+поэтому уровни для каждой свечи берутся из свингов, подтвержденных до ее открытия,
+и история не заглядывает в будущее.
+
+Близкие уровни объединяются в кластеры - корзины шириной в допуск по логарифму цены -
+одинаково для истории и для последней свечи: в истории для каждой свечи берутся
+кластеры уровней, подтвержденных к ее открытию.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_SWING_WINDOW = 20
+DEFAULT_CLUSTER_TOLERANCE = 0.002
+
+
+def swing_points(high, low, window=DEFAULT_SWING_WINDOW):
+    """
+    Индексы свинг-максимумов и свинг-минимумов.
+    Возвращает (индексы максимумов, индексы минимумов, задержка подтверждения в свечах).
+    """
+    order = max(window // 2, 1)
+    span = 2 * order + 1
+    high = pd.Series(np.asarray(high, dtype=np.float64))
+    low = pd.Series(np.asarray(low, dtype=np.float64))
+
+    rolling_max = high.rolling(span, center=True).max().to_numpy()
+    rolling_min = low.rolling(span, center=True).min().to_numpy()
+    swing_highs = np.flatnonzero(high.to_numpy() == rolling_max)
+    swing_lows = np.flatnonzero(low.to_numpy() == rolling_min)
+    return swing_highs, swing_lows, order
+
+
+def _bucket_ids(prices, tolerance):
+    """Номер корзины шириной tolerance по логарифму цены"""
+    return np.floor(np.log(prices) / np.log1p(tolerance)).astype(np.int64)
+
+
+def cluster_levels(prices, tolerance=DEFAULT_CLUSTER_TOLERANCE):
+    """
+    Объединяет уровни, попавшие в одну корзину шириной tolerance по логарифму цены.
+    Границы корзин не зависят от набора уровней, поэтому добавление нового уровня
+    не меняет принадлежность старых и кластеры истории считаются без заглядывания в будущее.
+    Возвращает (средние цены кластеров по возрастанию, число касаний каждого кластера).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    prices = prices[np.isfinite(prices) & (prices > 0)]
+    if not len(prices):
+        return np.empty(0), np.empty(0, dtype=np.int64)
+
+    _, index, touches = np.unique(_bucket_ids(prices, tolerance), return_inverse=True, return_counts=True)
+    levels = np.bincount(index, weights=prices) / touches
+    return levels, touches
+
+
+def _levels_per_bar(level_prices, available_from, reference, tolerance, known=()):
+    """
+    Для каждой свечи t - ближайшие к reference[t] кластеры (cluster_levels) уровней
+    с available_from <= t: среднее выше и ниже reference[t].
+    known - уровни, действующие с первой свечи. Возвращает (сопротивление, поддержка).
+    """
+    n = len(reference)
+    resistance = np.full(n, np.nan)
+    support = np.full(n, np.nan)
+    prices = np.concatenate((np.asarray(known, dtype=np.float64), np.asarray(level_prices, dtype=np.float64)))
+    available_from = np.concatenate((np.zeros(len(known), dtype=np.int64),
+                                     np.asarray(available_from, dtype=np.int64)))
+    valid = np.isfinite(prices) & (prices > 0) & (available_from < n)
+    prices, available_from = prices[valid], np.maximum(available_from[valid], 0)
+    bars = np.flatnonzero(np.isfinite(reference) & (reference > 0))
+    if not len(prices) or not len(bars):
+        return resistance, support
+
+    # Уровни по корзинам и времени подтверждения. member_means[j] - среднее корзины
+    # после подтверждения уровня j, среднее к свече t - у последнего уровня корзины с available_from <= t
+    ids = _bucket_ids(prices, tolerance)
+    order = np.lexsort((available_from, ids))
+    ids, available_from, prices = ids[order], available_from[order], prices[order]
+    buckets, starts, sizes = np.unique(ids, return_index=True, return_counts=True)
+    count = len(buckets)
+    first_available = available_from[starts]
+    keys = (ids - buckets[0]) * (n + 1) + available_from
+    member_starts = np.repeat(starts, sizes)
+    totals = np.concatenate(([0.0], np.cumsum(prices)))
+    member_means = (totals[1:] - totals[member_starts]) / (np.arange(len(prices)) - member_starts + 1)
+    arrived = np.cumsum(np.bincount(available_from, minlength=n))[bars]
+
+    def mean_at(bucket, rows):
+        """Средние корзин bucket (номер в buckets, -1 или count - нет корзины) к свечам bars[rows]"""
+        # Среднее меняется только при смене корзины или подтверждении нового уровня
+        times, confirmed = bars[rows], arrived[rows]
+        change = np.ones(len(bucket), dtype=bool)
+        change[1:] = (bucket[1:] != bucket[:-1]) | (confirmed[1:] != confirmed[:-1])
+        first = np.flatnonzero(change)
+        bucket = bucket[first]
+        valid = (bucket >= 0) & (bucket < count)
+        query = (buckets[np.clip(bucket, 0, count - 1)] - buckets[0]) * (n + 1) + times[first]
+        means = np.where(valid, member_means[np.searchsorted(keys, query, side='right') - 1], np.nan)
+        return means[np.cumsum(change) - 1]
+
+    # Номер корзины цены в buckets - по таблице на весь диапазон корзин
+    price = reference[bars]
+    table = np.searchsorted(buckets, np.arange(buckets[0] - 1, buckets[-1] + 3))
+    position = np.clip(_bucket_ids(price, tolerance) - buckets[0] + 1, 0, len(table) - 2)
+    rank = table[position]
+    has_own = table[position + 1] > rank
+
+    # Ближайшие корзины выше и ниже корзины цены среди подтвержденных: next_present[r] - первая
+    # подтвержденная корзина с номером >= r, previous_present[r] - последняя с номером < r.
+    # Массивы обновляются срезами при подтверждении каждой корзины, свечи между подтверждениями
+    # читают их одним обращением.
+    next_present = np.full(count + 1, count)
+    previous_present = np.full(count + 1, -1)
+    above = rank + has_own
+    nearest_above = np.empty(len(bars), dtype=np.int64)
+    nearest_below = np.empty(len(bars), dtype=np.int64)
+
+    def lookup(rows):
+        nearest_above[rows] = next_present[above[rows]]
+        nearest_below[rows] = previous_present[rank[rows]]
+
+    activation = np.argsort(first_available, kind='stable')
+    split = np.searchsorted(bars, first_available[activation])
+    done = 0
+    for bucket, end in zip(activation.tolist(), split.tolist()):
+        if end > done:
+            lookup(slice(done, end))
+            done = end
+        next_present[previous_present[bucket] + 1:bucket + 1] = bucket
+        previous_present[bucket + 1:next_present[bucket + 1] + 1] = bucket
+    lookup(slice(done, None))
+
+    # Корзина самой цены подходит, если ее среднее выше (ниже) цены
+    own = np.where(has_own & (first_available[np.minimum(rank, count - 1)] <= bars), rank, -1)
+    own_mean = mean_at(own, slice(None))
+    own_above = own_mean > price
+    own_below = own_mean < price
+    resistance[bars[own_above]] = own_mean[own_above]
+    support[bars[own_below]] = own_mean[own_below]
+    rows = np.flatnonzero(~own_above)
+    resistance[bars[rows]] = mean_at(nearest_above[rows], rows)
+    rows = np.flatnonzero(~own_below)
+    support[bars[rows]] = mean_at(nearest_below[rows], rows)
+    return resistance, support
+
+
+def nearest_levels_per_bar(high, low, close, window=DEFAULT_SWING_WINDOW, tolerance=DEFAULT_CLUSTER_TOLERANCE):
+    """
+    Ближайшие сопротивление и поддержка, действующие на открытии каждой свечи:
+    кластеры уровней подтвержденных к этому моменту свингов выше и ниже предыдущего закрытия.
+    Как и в current_levels, свинг-максимумы и свинг-минимумы кластеризуются вместе.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    swing_highs, swing_lows, delay = swing_points(high, low, window)
+
+    reference = np.concatenate(([np.nan], close[:-1]))
+    levels = np.concatenate((high[swing_highs], low[swing_lows]))
+    # Свинг i подтверждается закрытием свечи i + delay и действует со следующей свечи
+    available_from = np.concatenate((swing_highs, swing_lows)) + delay + 1
+    return _levels_per_bar(levels, available_from, reference, tolerance)
+
+
+class SwingLevelTracker:
+    """
+    Ближайшие уровни для истории, обрабатываемой порциями.
+
+    Порция передается вместе с хвостом прогрева предыдущих свечей (не короче window),
+    уровни подтвержденных свингов всех прошлых порций переносятся в массиве levels,
+    поэтому результат совпадает с nearest_levels_per_bar по всей истории.
+    """
+
+    def __init__(self, window=DEFAULT_SWING_WINDOW, tolerance=DEFAULT_CLUSTER_TOLERANCE):
+        self.window = window
+        self.tolerance = tolerance
+        self.order = max(window // 2, 1)
+        self.levels = np.empty(0)
+        # Первая свеча (глобальный номер), свинги с которой еще не приняты
+        self.next_swing = 0
+
+    def update(self, high, low, close, offset, first_row):
+        """
+        Уровни для свечей frame[first_row:].
+
+        Args:
+            high, low, close: свечи порции вместе с хвостом прогрева
+            offset: глобальный номер первой свечи frame
+            first_row: позиция первой новой свечи во frame (длина хвоста прогрева)
+
+        Returns:
+            (сопротивление, поддержка) для новых свечей
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        if offset and first_row < 2 * self.order:
+            raise ValueError(f"Warm-up tail must be at least {2 * self.order} candles")
+
+        swing_highs, swing_lows, delay = swing_points(high, low, self.window)
+        swing_highs = swing_highs[swing_highs + offset >= self.next_swing]
+        swing_lows = swing_lows[swing_lows + offset >= self.next_swing]
+
+        reference = np.concatenate(([np.nan], close[:-1]))[first_row:]
+        levels = np.concatenate((high[swing_highs], low[swing_lows]))
+        # Свинг i действует со свечи i + delay + 1, номера - относительно первой новой свечи
+        available_from = np.concatenate((swing_highs, swing_lows)) + delay + 1 - first_row
+        resistance, support = _levels_per_bar(levels, available_from, reference, self.tolerance,
+                                              known=self.levels)
+
+        self.levels = np.concatenate((self.levels, levels))
+        self.next_swing = offset + len(high) - self.order
+        return resistance, support
+
+
+def current_levels(high, low, close, window=DEFAULT_SWING_WINDOW, tolerance=DEFAULT_CLUSTER_TOLERANCE,
+                   extra_levels=(), count=5):
+    """
+    Кластеры уровней относительно последнего закрытия.
+
+    Args:
+        extra_levels: дополнительные кандидаты (например, POC и узлы профиля объема)
+        count: число уровней с каждой стороны
+
+    Returns:
+        dict: resistance/support - списки {'price', 'touches'} от ближайшего к дальнему
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    price = float(np.asarray(close, dtype=np.float64)[-1])
+    swing_highs, swing_lows, _ = swing_points(high, low, window)
+
+    candidates = np.concatenate((high[swing_highs], low[swing_lows], np.asarray(extra_levels, dtype=np.float64)))
+    levels, touches = cluster_levels(candidates, tolerance)
+
+    above = np.searchsorted(levels, price, side='right')
+    below = np.searchsorted(levels, price, side='left')
+    return {
+        'resistance': [{'price': round(float(levels[i]), 6), 'touches': int(touches[i])}
+                       for i in range(above, min(above + count, len(levels)))],
+        'support': [{'price': round(float(levels[i]), 6), 'touches': int(touches[i])}
+                    for i in range(below - 1, max(below - 1 - count, -1), -1)]
+    }
@@ -0,0 +1,122 @@
+"""
+Проверки PriceAlertEngine: удаленные и измененные оповещения не срабатывают по старым порогам,
+добавленные пороги вливаются в отсортированные массивы без пересортировки,
+пороги TP/SL загружаются из файла уведомлений сервера (resources/alert.json).
+
+Запуск: python3 -m pytest python_scripts/test_alert_engine.py
+"""
+import json
+import os
+
+import numpy as np
+
+from alert_engine import PriceAlertEngine, ThresholdBook, parse_signal_message
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_removed_then_readded_alert_uses_new_threshold():
+    engine = PriceAlertEngine()
+    engine.add_alert(1, 'BTC', 45000, 'below')
+    engine.on_price('BTC', 50000)
+    assert engine.remove_alert(1)
+    engine.add_alert(1, 'BTC', 60000, 'above')
+
+    assert engine.on_price('BTC', 44000) == []
+    triggered = engine.on_price('BTC', 61000)
+    assert [(alert['id'], alert['direction'], alert['triggered_price']) for alert in triggered] == \
+        [(1, 'above', 61000.0)]
+
+
+def test_edited_alert_ignores_old_threshold():
+    engine = PriceAlertEngine()
+    engine.add_alert(7, 'ETH', 3000, 'cross')
+    engine.on_price('ETH', 3100)
+    engine.on_price('ETH', 3050)
+    # Изменение цены и направления - повторная регистрация с тем же id
+    engine.add_alert(7, 'ETH', 2500, 'below')
+
+    assert engine.on_price('ETH', 2900) == []
+    assert engine.on_price('ETH', 3200) == []
+    assert [alert['price'] for alert in engine.on_price('ETH', 2400)] == [2500.0]
+    assert engine.alerts == {}
+
+
+def test_fired_cross_alert_does_not_fire_its_replacement_by_other_side():
+    engine = PriceAlertEngine()
+    engine.add_alert(3, 'SOL', 100, 'cross')
+    engine.on_price('SOL', 90)
+    assert [alert['id'] for alert in engine.on_price('SOL', 110)] == [3]
+
+    engine.add_alert(3, 'SOL', 50, 'above')
+    assert engine.on_price('SOL', 95) == []
+    assert len(engine._below['SOLUSDT']) == 0
+
+
+def test_pending_thresholds_are_inserted_in_price_order():
+    rng = np.random.default_rng(0)
+    book = ThresholdBook()
+    expected = []
+    for batch in range(5):
+        for price in np.round(rng.uniform(90, 110, 200), 1):
+            alert_id = len(expected)
+            book.add(price, alert_id)
+            expected.append((price, alert_id))
+        hit_ids = book.take_range(95.0, 96.0, True, True)
+        expected_hits = [alert_id for price, alert_id in expected if 95.0 <= price <= 96.0]
+        assert sorted(hit_ids.tolist()) == expected_hits
+        expected = [(price, alert_id) for price, alert_id in expected if not 95.0 <= price <= 96.0]
+
+        assert np.all(np.diff(book.prices) >= 0)
+        active = sorted(zip(book.prices[book.active].tolist(), book.generations[book.active].tolist()))
+        assert active == sorted(expected)
+
+
+def test_alert_added_between_ticks_fires_once():
+    engine = PriceAlertEngine()
+    for alert_id, price in enumerate(range(100, 200, 10)):
+        engine.add_alert(alert_id, 'BTC', price, 'above')
+    engine.on_price('BTC', 95)
+    assert [alert['id'] for alert in engine.on_price('BTC', 125)] == [0, 1, 2]
+
+    engine.add_alert(20, 'BTC', 130, 'above')
+    engine.add_alert(21, 'BTC', 126, 'above')
+    assert [alert['id'] for alert in engine.on_price('BTC', 130)] == [21, 3, 20]
+    assert engine.on_price('BTC', 131) == []
+
+
+def test_load_alerts_from_repo_alert_file():
+    engine = PriceAlertEngine()
+    # Три сигнала с уровнями; пустые сигналы без символа пропускаются
+    assert engine.load_alerts(os.path.join(REPO_ROOT, 'resources', 'alert.json')) == 3
+    assert engine.alerts['1047:tp'] == {
+        'id': '1047:tp', 'user_id': 'daaaa@yandex.ru', 'symbol': 'BTCUSDT', 'price': 89738.0,
+        'direction': 'above',
+        'message': '📈 БЫЧИЙ | BTC | Вероятность: 84 | ЦЕНА: 89650.7 | TP: 89738 | SL: 89516'
+    }
+    assert engine.alerts['1047:sl']['direction'] == 'below'
+
+    engine.on_price('BTC', 89650.7)
+    assert [alert['id'] for alert in engine.on_price('BTC', 89740)] == ['1047:tp']
+    assert [alert['id'] for alert in engine.on_price('BTC', 89500)] == ['1047:sl']
+
+    # В корневом alert.json только системные уведомления
+    assert PriceAlertEngine().load_alerts(os.path.join(REPO_ROOT, 'alert.json')) == 0
+
+
+def test_load_alerts_from_alert_model_fields(tmp_path):
+    path = tmp_path / 'alerts.json'
+    path.write_text(json.dumps([{
+        'id': 5, 'username': 'user@example.com', 'currency': 'SOL', 'strategy': 'ALL',
+        'text': '📉 МЕДВЕЖИЙ | SOL | Вероятность: 70 | ЦЕНА: 150 | TP: 140 | SL: 155.5'
+    }]), encoding='utf-8')
+
+    engine = PriceAlertEngine()
+    assert engine.load_alerts(path) == 1
+    assert [(alert['id'], alert['price'], alert['direction']) for alert in engine.alerts.values()] == \
+        [('5:tp', 140.0, 'below'), ('5:sl', 155.5, 'above')]
+
+
+def test_parse_signal_message_ignores_plain_notifications():
+    assert parse_signal_message('New trading features available') is None
+    assert parse_signal_message('📈 БЫЧИЙ | BTC | Вероятность: 84 | ЦЕНА: 1 | TP: 2 | SL: 0.5')['take_profit'] == 2.0
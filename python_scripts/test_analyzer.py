@@ -0,0 +1,52 @@
+"""
+Проверки экономного режима TradingStrategyAnalyzer: замер памяти не останавливает чужую
+трассировку tracemalloc, таблица вызывающей стороны не изменяется.
+
+Запуск: python3 -m pytest python_scripts/test_analyzer.py
+"""
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analysis import TradingStrategyAnalyzer
+
+
+def make_candles(n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    return pd.DataFrame({'Timestamp': np.arange(n) * 300_000, 'Open': open_,
+                         'High': np.maximum(open_, close) * 1.001, 'Low': np.minimum(open_, close) * 0.999,
+                         'Close': close, 'Volume': rng.uniform(1, 100, n)})
+
+
+def run_compact(df):
+    analyzer = TradingStrategyAnalyzer(df, compact=True)
+    assert analyzer.prepare_data()
+    return analyzer.compare_strategies()
+
+
+def test_memory_report_keeps_callers_tracing():
+    tracemalloc.start()
+    try:
+        result = run_compact(make_candles())
+        assert result['memory']['peak_mb'] > 0
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_memory_report_stops_own_tracing():
+    assert not tracemalloc.is_tracing()
+    result = run_compact(make_candles())
+    assert result['memory']['rows'] == 300
+    assert not tracemalloc.is_tracing()
+
+
+def test_compact_mode_leaves_callers_frame_untouched():
+    df = make_candles().set_index(np.arange(300) + 10)
+    before = df.copy()
+    run_compact(df)
+    assert df.equals(before)
+    assert df['Volume'].dtype == np.float64
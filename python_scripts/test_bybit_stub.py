@@ -0,0 +1,109 @@
+"""
+Проверки запросов к бирже с бюджетом времени на локальной заглушке Bybit (bybit_stub):
+дублирующий запрос при медленном ответе, переход на кеш свечей по истечении бюджета и при 503.
+
+Запуск: python3 -m pytest python_scripts/test_bybit_stub.py
+"""
+import time
+
+import pytest
+
+import analyze_script
+from bybit_stub import start_stub
+from http_transport import HttpTransport
+from kline_cache import KlineCache
+
+
+@pytest.fixture
+def stub():
+    """Запускает заглушку на свободном порту; параметры задержек - аргументы вызова"""
+    servers = []
+
+    def start(**config):
+        server = start_stub(**config)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def fetcher_for(monkeypatch, tmp_path):
+    """CryptoDataFetcher для адреса заглушки с отдельными транспортом и кешем свечей"""
+    monkeypatch.setattr(analyze_script, 'KlineCache', lambda: KlineCache(str(tmp_path)))
+    transports = []
+
+    def make(server, deadline):
+        monkeypatch.setenv('BYBIT_REST_URL', server.url)
+        fetcher = analyze_script.CryptoDataFetcher(deadline)
+        fetcher.candle_store = None
+        fetcher.session = HttpTransport()
+        transports.append(fetcher.session)
+        return fetcher
+
+    yield make
+    for transport in transports:
+        transport.close()
+
+
+def test_slow_primary_is_hedged_and_hedge_wins(stub):
+    # Запрос 1 - прогрев, запрос 2 (основной) отвечает через 2 с, запрос 3 (дубль) - сразу
+    server = stub(delay_ms=5, slow_every=2, slow_ms=2000)
+    url = f"{server.url}/v5/market/tickers"
+    transport = HttpTransport()
+    try:
+        transport.get(url, params={'symbol': 'BTCUSDT'})
+        transport.add_latency_samples(url, [0.01] * 20)
+
+        started = time.perf_counter()
+        response = transport.hedged_get(url, deadline=1.5, params={'symbol': 'BTCUSDT'})
+        elapsed = time.perf_counter() - started
+
+        assert response.status_code == 200
+        assert response.json()['result']['list'][0]['symbol'] == 'BTCUSDT'
+        assert elapsed < 1.0
+        host = server.url.split('//', 1)[1]
+        assert transport.metrics()[host]['hedges'] == 1
+        assert transport.metrics()[host]['hedge_wins'] == 1
+        assert server.config.slow == 1
+    finally:
+        transport.close()
+
+
+def test_expired_deadline_falls_back_to_kline_cache(stub, fetcher_for):
+    fresh = fetcher_for(stub(delay_ms=5), deadline=1)
+    expected = fresh.get_kline_data('BTC', '5', 100)
+    assert expected is not None and fresh.stale == []
+
+    # И основной запрос, и дубль не успевают за бюджет
+    fetcher = fetcher_for(stub(delay_ms=5, slow_every=1, slow_ms=2000), deadline=0.3)
+    started = time.perf_counter()
+    cached = fetcher.get_kline_data('BTC', '5', 100)
+
+    assert time.perf_counter() - started < 1.0
+    assert cached is not None
+    assert cached['close'].tolist() == expected['close'].tolist()
+    assert fetcher.stale == ['BTCUSDT:5']
+
+
+def test_503_falls_back_to_kline_cache(stub, fetcher_for):
+    fresh = fetcher_for(stub(delay_ms=5), deadline=1)
+    expected = fresh.get_kline_data('ETH', '60', 50)
+
+    server = stub(delay_ms=5, fail_every=1)
+    fetcher = fetcher_for(server, deadline=1)
+    assert fetcher.validate_crypto_symbol('ETH')
+    cached = fetcher.get_kline_data('ETH', '60', 50)
+
+    assert server.config.failed >= 2
+    assert cached['close'].tolist() == expected['close'].tolist()
+    assert fetcher.stale == ['ETHUSDT:60']
+
+
+def test_plain_fetch_does_not_write_kline_cache(stub, fetcher_for):
+    fetcher = fetcher_for(stub(delay_ms=5), deadline=None)
+    assert fetcher.get_kline_data('BTC', '5', 10) is not None
+    assert not fetcher.kline_cache.has_symbol('BTCUSDT')
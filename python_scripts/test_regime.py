@@ -0,0 +1,78 @@
+"""
+Проверки режима рынка: инкрементальный RegimeDetector совпадает с векторным regime_series,
+compare_strategies взвешивает стратегии набором весов текущего режима.
+
+Запуск: python3 -m pytest python_scripts/test_regime.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import TradingStrategyAnalyzer
+from indicator_kernels import adx, average_true_range
+from regime import REGIMES, RegimeDetector, regime_series
+from strategies import load_strategy, strategy_weight
+
+
+def make_candles(n=1500, seed=2):
+    """Случайное блуждание со сменой спокойных и волатильных участков и дрейфа"""
+    rng = np.random.default_rng(seed)
+    volatility = np.where((np.arange(n) // 300) % 2, 0.002, 0.008)
+    drift = 0.0003 * np.sin(np.arange(n) / 150)
+    close = 30000 * np.exp(np.cumsum(rng.normal(drift, volatility)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2)))
+    return pd.DataFrame({'Timestamp': np.arange(n) * 300_000, 'Open': open_, 'High': high, 'Low': low,
+                         'Close': close, 'Volume': rng.uniform(1, 100, n)})
+
+
+def test_detector_matches_regime_series():
+    df = make_candles()
+    atr = average_true_range(df['High'], df['Low'], df['Close'], window=14)
+    adx_values = adx(df['High'], df['Low'], df['Close'], window=14)
+    regimes, last = regime_series(df['Close'], atr, adx_values)
+
+    detector = RegimeDetector()
+    incremental = [detector.update(high, low, close) for high, low, close in
+                   zip(df['High'].tolist(), df['Low'].tolist(), df['Close'].tolist())]
+
+    assert incremental == regimes.tolist()
+    assert set(regimes) == set(REGIMES)
+    state = detector.to_dict()
+    assert {key: state[key] for key in last} == last
+
+    # Заполнение хвостом истории дает тот же режим и показатели, что и вся история
+    seeded = RegimeDetector.from_candles(df['High'], df['Low'], df['Close'], seed_candles=1000)
+    assert {key: value for key, value in seeded.to_dict().items() if key != 'candles'} == \
+        {key: value for key, value in state.items() if key != 'candles'}
+
+
+@pytest.mark.parametrize('regime', REGIMES)
+def test_compare_strategies_uses_regime_weights(regime):
+    df = make_candles()
+    analyzer = TradingStrategyAnalyzer(df)
+    assert analyzer.prepare_data()
+    analyzer.regime_detector = RegimeDetector.from_candles(df['High'], df['Low'], df['Close'])
+    analyzer.regime_detector.regime = regime
+
+    result = analyzer.compare_strategies()
+    assert result['overall']['regime']['regime'] == regime
+
+    weights = {key: strategy_weight(load_strategy(key), regime) for key in result['strategies']}
+    total = sum(weights.values())
+    bullish = sum(weight for key, weight in weights.items()
+                  if result['strategies'][key]['direction'] == 'BULLISH')
+    bearish = sum(weight for key, weight in weights.items()
+                  if result['strategies'][key]['direction'] == 'BEARISH')
+    assert result['overall']['probabilities']['bullish'] == round(bullish / total * 100, 1)
+    assert result['overall']['probabilities']['bearish'] == round(bearish / total * 100, 1)
+
+
+def test_market_regime_seeds_detector_once():
+    analyzer = TradingStrategyAnalyzer(make_candles())
+    assert analyzer.prepare_data()
+    first = analyzer.market_regime()
+    detector = analyzer.regime_detector
+    assert analyzer.market_regime() == first
+    assert analyzer.regime_detector is detector
@@ -0,0 +1,76 @@
+"""
+Работа с временем свечей.
+
+Внутри конвейера время хранится как int64 - миллисекунды Unix epoch (как отдает Bybit).
+В строки время переводится только при выводе на экран и экспорте.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Длительность свечи интервала Bybit; у месячной свечи длительность переменная,
+# здесь - верхняя граница (31 день)
+INTERVAL_MS = {
+    'D': 86_400_000,
+    'W': 7 * 86_400_000,
+    'M': 31 * 86_400_000
+}
+
+
+def now_ms():
+    """Текущее время в миллисекундах epoch"""
+    return int(time.time() * 1000)
+
+
+def interval_ms(interval):
+    """Длительность свечи интервала Bybit ('1', '5', ..., 'D', 'W', 'M') в миллисекундах"""
+    interval = str(interval)
+    if interval in INTERVAL_MS:
+        return INTERVAL_MS[interval]
+    return int(interval) * 60_000
+
+
+def datetime_to_ms(value):
+    """datetime -> миллисекунды epoch"""
+    return int(value.timestamp() * 1000)
+
+
+def to_epoch_ms(values):
+    """
+    Приводит колонку времени к int64 миллисекундам.
+    Числа считаются уже миллисекундами, строки разбираются по TIMESTAMP_FORMAT
+    (при несовпадении формата - автоматическим разбором pandas).
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_integer_dtype(values) or pd.api.types.is_float_dtype(values):
+        return values.astype(np.int64)
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = values
+    else:
+        try:
+            parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+        except (ValueError, TypeError):
+            parsed = pd.to_datetime(values)
+
+    return parsed.astype('datetime64[ms]').astype(np.int64)
+
+
+def format_epoch_ms(values, fmt=TIMESTAMP_FORMAT):
+    """int64 миллисекунды -> строки для вывода и экспорта"""
+    if np.isscalar(values):
+        return pd.Timestamp(int(values), unit='ms').strftime(fmt)
+    return pd.to_datetime(pd.Series(values), unit='ms').dt.strftime(fmt)
+
+
+def time_range_slice(data, start_ms=None, end_ms=None, column='Timestamp'):
+    """
+    Срез упорядоченных по времени свечей [start_ms, end_ms] бинарным поиском.
+    """
+    timestamps = data[column].to_numpy()
+    start = 0 if start_ms is None else np.searchsorted(timestamps, start_ms, side='left')
+    end = len(timestamps) if end_ms is None else np.searchsorted(timestamps, end_ms, side='right')
+    return data.iloc[start:end]
@@ -0,0 +1,309 @@
+"""
+Лента публичных сделок: VWAP учтенных сделок и профиль объема.
+
+Сделки загружаются через REST /v5/market/recent-trade (повторы отбрасываются по execId)
+и накапливаются инкрементально в пределах текущей сессии (сутки UTC): суммы цена*объем и объем
+для VWAP и гистограмма объема по ценовым корзинам фиксированной ширины.
+Это VWAP только полученных сделок (с first_trade_ms), а не всей сессии: для разового запроса -
+последние десятки сделок. VWAP всей сессии по свечам - session_vwap (колонка 'vwap' анализатора).
+По профилю считаются точка контроля (POC), зона стоимости (70% объема)
+и узлы высокого объема - кандидаты в уровни поддержки и сопротивления.
+
+Для истории свечей те же величины считаются векторно: session_vwap и candle_volume_profile.
+"""
+import json
+import sys
+import time
+
+import numpy as np
+
+from http_transport import shared_transport
+
+BYBIT_REST_URL = "https://api.bybit.com"
+
+SESSION_MS = 86_400_000
+VALUE_AREA_SHARE = 0.7
+
+# Ширина корзины профиля по умолчанию - доля текущей цены
+DEFAULT_BIN_SHARE = 0.001
+
+
+def session_vwap(timestamps, high, low, close, volume, session_ms=SESSION_MS):
+    """
+    VWAP от начала сессии для каждой свечи по типичной цене (High + Low + Close) / 3.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    volume = np.asarray(volume, dtype=np.float64)
+    typical = (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64) +
+               np.asarray(close, dtype=np.float64)) / 3
+    n = len(timestamps)
+    if n == 0:
+        return np.empty(0)
+
+    session = timestamps // session_ms
+    starts = np.concatenate(([True], session[1:] != session[:-1]))
+    first = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+
+    price_volume = np.cumsum(typical * volume)
+    total_volume = np.cumsum(volume)
+    price_volume -= (price_volume - typical * volume)[first]
+    total_volume -= (total_volume - volume)[first]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total_volume > 0, price_volume / total_volume, typical)
+
+
+class VolumeProfile:
+    """Гистограмма объема по ценовым корзинам фиксированной ширины"""
+
+    def __init__(self, bin_size, origin=None):
+        self.bin_size = float(bin_size)
+        self.origin = origin
+        self.volumes = np.zeros(0)
+
+    @classmethod
+    def for_price(cls, price, bin_share=DEFAULT_BIN_SHARE):
+        """Профиль с шириной корзины bin_share от цены"""
+        return cls(price * bin_share)
+
+    def _bin_indices(self, prices):
+        """Номера корзин цен; при выходе за границы гистограмма расширяется"""
+        if self.origin is None:
+            self.origin = np.floor(prices.min() / self.bin_size) * self.bin_size
+
+        indices = np.floor((prices - self.origin) / self.bin_size).astype(np.int64)
+        low = min(int(indices.min()), 0)
+        high = max(int(indices.max()) + 1, len(self.volumes))
+        if low < 0 or high > len(self.volumes):
+            volumes = np.zeros(high - low)
+            volumes[-low:-low + len(self.volumes)] = self.volumes
+            self.volumes = volumes
+            self.origin += low * self.bin_size
+            indices -= low
+        return indices
+
+    def add(self, prices, sizes):
+        """Добавляет объем сделок по их ценам"""
+        prices = np.asarray(prices, dtype=np.float64)
+        if not len(prices):
+            return
+        indices = self._bin_indices(prices)
+        self.volumes += np.bincount(indices, weights=np.asarray(sizes, dtype=np.float64),
+                                    minlength=len(self.volumes))
+
+    def add_ranges(self, lows, highs, sizes):
+        """
+        Добавляет объем свечей, равномерно распределенный по их диапазону Low-High.
+        """
+        lows = np.asarray(lows, dtype=np.float64)
+        highs = np.asarray(highs, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        valid = np.isfinite(lows) & np.isfinite(highs) & np.isfinite(sizes)
+        lows, highs, sizes = lows[valid], highs[valid], sizes[valid]
+        if not len(lows):
+            return
+
+        indices = self._bin_indices(np.concatenate((lows, highs)))
+        first, last = indices[:len(lows)], indices[len(lows):]
+        share = sizes / (last - first + 1)
+
+        # Разностный массив: +share с первой корзины, -share после последней
+        diff = np.bincount(first, weights=share, minlength=len(self.volumes) + 1)
+        diff -= np.bincount(last + 1, weights=share, minlength=len(self.volumes) + 1)
+        self.volumes += np.cumsum(diff)[:len(self.volumes)]
+
+    def bin_prices(self):
+        """Цены середин корзин"""
+        return self.origin + (np.arange(len(self.volumes)) + 0.5) * self.bin_size
+
+    def total(self):
+        return float(self.volumes.sum())
+
+    def point_of_control(self):
+        """Цена корзины с наибольшим объемом"""
+        if not self.total():
+            return None
+        return float(self.bin_prices()[np.argmax(self.volumes)])
+
+    def value_area(self, share=VALUE_AREA_SHARE):
+        """
+        Зона стоимости: от POC расширяемся в сторону большего объема,
+        пока не набрано share всего объема. Возвращает (нижняя, верхняя граница).
+        """
+        total = self.total()
+        if not total:
+            return None, None
+
+        volumes = self.volumes
+        low = high = int(np.argmax(volumes))
+        covered = volumes[low]
+        target = total * share
+        while covered < target and (low > 0 or high < len(volumes) - 1):
+            below = volumes[low - 1] if low > 0 else -1.0
+            above = volumes[high + 1] if high < len(volumes) - 1 else -1.0
+            if above >= below:
+                high += 1
+                covered += above
+            else:
+                low -= 1
+                covered += below
+
+        return float(self.origin + low * self.bin_size), float(self.origin + (high + 1) * self.bin_size)
+
+    def high_volume_nodes(self, count=5):
+        """Цены локальных максимумов профиля в порядке убывания объема"""
+        volumes = self.volumes
+        if len(volumes) < 3:
+            return []
+        peaks = np.flatnonzero((volumes[1:-1] > volumes[:-2]) & (volumes[1:-1] >= volumes[2:])) + 1
+        peaks = peaks[np.argsort(volumes[peaks])[::-1][:count]]
+        return [float(price) for price in self.bin_prices()[peaks]]
+
+    def levels(self):
+        """POC, границы зоны стоимости и узлы высокого объема"""
+        value_area_low, value_area_high = self.value_area()
+        return {
+            'poc': self.point_of_control(),
+            'value_area_high': value_area_high,
+            'value_area_low': value_area_low,
+            'high_volume_nodes': self.high_volume_nodes()
+        }
+
+
+def candle_volume_profile(high, low, volume, bin_size=None):
+    """Профиль объема по свечам (объем свечи распределяется по ее диапазону)"""
+    high = np.asarray(high, dtype=np.float64)
+    if bin_size is None:
+        bin_size = np.nanmax(high) * DEFAULT_BIN_SHARE
+    profile = VolumeProfile(bin_size)
+    profile.add_ranges(low, high, volume)
+    return profile
+
+
+class TradeTape:
+    """Инкрементальный VWAP и профиль объема по полученным сделкам текущей сессии одного символа"""
+
+    def __init__(self, symbol, bin_size=None, session_ms=SESSION_MS):
+        self.symbol = symbol
+        self.bin_size = bin_size
+        self.session_ms = session_ms
+        self.session = None
+        self.price_volume = 0.0
+        self.volume = 0.0
+        self.trades = 0
+        self.first_trade_ms = None
+        self.profile = None
+        self.last_time = 0
+        self._last_ids = set()
+
+    def _start_session(self, session, price):
+        """Сбрасывает накопленные значения в начале новой сессии"""
+        self.session = session
+        self.price_volume = 0.0
+        self.volume = 0.0
+        self.trades = 0
+        self.first_trade_ms = None
+        self.profile = (VolumeProfile(self.bin_size) if self.bin_size
+                        else VolumeProfile.for_price(price))
+
+    def add_trades(self, times, prices, sizes):
+        """Добавляет сделки (время в мс, цена, объем), упорядоченные по времени"""
+        times = np.asarray(times, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        if not len(times):
+            return
+
+        sessions = times // self.session_ms
+        # Сделки прошлых сессий не учитываются, новая сессия сбрасывает накопления
+        if self.session is None or sessions[-1] > self.session:
+            self._start_session(int(sessions[-1]), prices[-1])
+        current = sessions == self.session
+        prices, sizes = prices[current], sizes[current]
+        if self.first_trade_ms is None and current.any():
+            self.first_trade_ms = int(times[current][0])
+
+        self.price_volume += float(prices @ sizes)
+        self.volume += float(sizes.sum())
+        self.trades += len(prices)
+        self.profile.add(prices, sizes)
+
+    def add_bybit_trades(self, trades):
+        """
+        Добавляет сделки из ответа recent-trade (новые первыми); уже учтенные пропускаются.
+        """
+        fresh = [trade for trade in trades
+                 if int(trade['time']) > self.last_time
+                 or (int(trade['time']) == self.last_time and trade['execId'] not in self._last_ids)]
+        if not fresh:
+            return 0
+
+        fresh.sort(key=lambda trade: int(trade['time']))
+        times = np.array([int(trade['time']) for trade in fresh], dtype=np.int64)
+        self.add_trades(times,
+                        np.array([trade['price'] for trade in fresh], dtype=np.float64),
+                        np.array([trade['size'] for trade in fresh], dtype=np.float64))
+
+        newest = int(times[-1])
+        if newest > self.last_time:
+            self.last_time = newest
+            self._last_ids = set()
+        self._last_ids.update(trade['execId'] for trade in fresh if int(trade['time']) == newest)
+        return len(fresh)
+
+    def trades_vwap(self):
+        """VWAP полученных сделок текущей сессии (с first_trade_ms)"""
+        return self.price_volume / self.volume if self.volume else None
+
+    def features(self):
+        """VWAP полученных сделок и уровни профиля объема для анализатора"""
+        if self.profile is None:
+            return None
+        return {
+            'trades_vwap': round(self.trades_vwap(), 6) if self.volume else None,
+            'trades_volume': round(self.volume, 6),
+            'trades': self.trades,
+            'first_trade_ms': self.first_trade_ms,
+            **self.profile.levels()
+        }
+
+
+def fetch_recent_trades(symbol, limit=60, session=None, category='spot', base_url=BYBIT_REST_URL):
+    """Последние публичные сделки символа. Возвращает (список сделок, error)"""
+    session = session or shared_transport()
+    try:
+        response = session.get(f"{base_url}/v5/market/recent-trade",
+                               params={'category': category, 'symbol': symbol, 'limit': limit},
+                               timeout=10)
+        data = response.json()
+        if data['retCode'] != 0:
+            return None, data.get('retMsg', 'Unknown error')
+        return data['result']['list'], None
+    except Exception as e:
+        return None, str(e)
+
+
+def main():
+    """Опрос ленты сделок и вывод VWAP и профиля объема"""
+    if len(sys.argv) < 2:
+        print("Usage: python trade_tape.py <symbol> [interval_seconds]")
+        sys.exit(1)
+
+    symbol = sys.argv[1].upper()
+    if not symbol.endswith('USDT'):
+        symbol += 'USDT'
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    tape = TradeTape(symbol)
+    session = shared_transport()
+    while True:
+        trades, error = fetch_recent_trades(symbol, session=session)
+        if error:
+            sys.stderr.write(f"Error getting trades: {error}\n")
+        elif tape.add_bybit_trades(trades):
+            print(json.dumps(tape.features()), flush=True)
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    main()